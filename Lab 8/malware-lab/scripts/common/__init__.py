@@ -5,25 +5,56 @@
 """Convenience re‑exports so callers can simply ``import scripts.common as C``."""
 
 from .andro_utils import (
+    ApkFeatures,
     compute_sha256,
+    extract_apk_features,
     iter_api_calls,
+    iter_dex_methods,
     iter_permissions,
     iter_strings,
     load_apk,
+    load_features,
+    release_memory,
 )
-from .indicators import FamilyRule, RULES, detect
-from .report import markdown_summary, write_json
+from .indicators import FamilyRule, RULES, detect, load_mode
+from .registry import FAMILIES, Family, evidence_hook, get_families, register_family
+from .report import markdown_summary, read_report, to_pretty_json, write_compact, write_json
+from .results_store import ResultsStore
+from .string_index import StringIndex
+from .watchdog import ResourceLimits, SampleAborted, SampleOutcome, add_limit_arguments, limits_from_args, run_limited
 
 __all__ = [
+    "ApkFeatures",
     "compute_sha256",
+    "extract_apk_features",
     "iter_api_calls",
+    "iter_dex_methods",
     "iter_permissions",
     "iter_strings",
     "load_apk",
+    "load_features",
+    "release_memory",
     "FamilyRule",
     "RULES",
     "detect",
+    "load_mode",
+    "FAMILIES",
+    "Family",
+    "evidence_hook",
+    "get_families",
+    "register_family",
     "markdown_summary",
+    "read_report",
+    "ResultsStore",
+    "StringIndex",
+    "to_pretty_json",
+    "write_compact",
     "write_json",
+    "ResourceLimits",
+    "SampleAborted",
+    "SampleOutcome",
+    "add_limit_arguments",
+    "limits_from_args",
+    "run_limited",
 ]
 
@@ -11,43 +11,78 @@ module level but may be overridden by applications.
 
 from __future__ import annotations
 
+import ctypes
+import gc
+import gzip
 import hashlib
+import json
 import logging
 import os
+import tempfile
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Iterable, Iterator, List, Set, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from androguard.core.analysis.analysis import MethodAnalysis
+from androguard.core.apk import APK
+from androguard.core.dex import DEX
 from androguard.misc import AnalyzeAPK
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# glibc can hand freed heap pages back to the OS; elsewhere gc alone has to do
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):  # pragma: no cover - depends on platform
+    _malloc_trim = None
+
 
 # ----- core helpers ---------------------------------------------------------
 
-def load_apk(apk_path: os.PathLike | str):
-    """Return the (a, d, dx) triple produced by ``AnalyzeAPK``.
+# Load modes, cheapest first: manifest/zip only, + parsed Dex tables, + xrefs
+LOAD_MODES = ("apk", "dex", "full")
+
+
+def load_apk(apk_path: os.PathLike | str, mode: str = "full"):
+    """Return an (a, d, dx) triple for *apk_path*, built only as far as *mode* needs.
 
     Parameters
     ----------
     apk_path : os.PathLike | str
         Path to the APK file on disk.
+    mode : str
+        ``"apk"`` – the ``APK`` object only (permissions, files); *d* is an
+        empty list and *dx* ``None``.
+        ``"dex"`` – also the parsed ``DEX`` files (method tables, strings),
+        still without the cross‑reference ``Analysis`` (*dx* is ``None``).
+        ``"full"`` – what ``AnalyzeAPK`` returns, including the xrefs that
+        take most of the time on large apps.
 
     Raises
     ------
     FileNotFoundError
         If *apk_path* does not exist or is not a file.
+    ValueError
+        If *mode* is not one of :data:`LOAD_MODES`.
     RuntimeError
         If Androguard raises any exception while analysing the APK.
     """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"mode must be one of {LOAD_MODES}, not {mode!r}")
     apk_path = Path(apk_path)
     if not apk_path.is_file():
         raise FileNotFoundError(apk_path)
 
-    logger.debug("Loading APK: %s", apk_path)
+    logger.debug("Loading APK (%s): %s", mode, apk_path)
     try:
-        return AnalyzeAPK(str(apk_path))  # (APK, Dalvik bytecode, Analysis)
+        if mode == "full":
+            return AnalyzeAPK(str(apk_path))  # (APK, Dalvik bytecode, Analysis)
+        a = APK(str(apk_path))
+        if mode == "apk":
+            return a, [], None
+        api = a.get_target_sdk_version()
+        return a, [DEX(raw, using_api=api) for raw in a.get_all_dex()], None
     except Exception as exc:  
         logger.exception("Androguard failed on %s", apk_path)
         raise RuntimeError("Androguard analysis failure") from exc
@@ -84,6 +119,190 @@ def iter_api_calls(dx) -> Iterator[str]:
           f"{method.get_method().get_name()}"
 
 
+def build_call_index(dx) -> Dict[str, List[str]]:
+    """Map each external API (``"Lcls;->name"``) to the internal methods calling it.
+
+    Built in one pass over the cross references of the external methods, so a
+    rule can check whether the app really calls e.g.
+    ``Landroid/telephony/SmsManager;->sendTextMessage`` with a dict lookup.
+    Overloads share one key; callers are sorted ``"Lcls;->name"`` strings.
+    """
+    index: Dict[str, Set[str]] = {}
+    for method in dx.get_methods():
+        if not method.is_external():
+            continue
+        callers = {f"{caller.class_name}->{caller.name}" for _, caller, _ in method.get_xref_from()}
+        if callers:
+            index.setdefault(f"{method.class_name}->{method.name}", set()).update(callers)
+    return {api: sorted(callers) for api, callers in index.items()}
+
+
+def iter_dex_methods(d) -> Iterator[str]:
+    """Yield the ``class->name`` of every method defined in a Dex file.
+
+    Same names as :func:`iter_api_calls`, read from the class definitions, so
+    no cross‑reference analysis is needed.  (``d.get_methods()`` would also
+    list the framework methods the Dex merely references.)
+    """
+    for cls in d.get_classes():
+        for method in cls.get_methods():
+            yield f"{method.get_class_name()}->{method.get_name()}"
+
+
 def iter_strings(d) -> Iterator[str]:
     """Yield all string literals embedded in any Dex file of the APK."""
-    yield from d.get_strings()
\ No newline at end of file
+    yield from d.get_strings()
+
+
+# ----- feature cache --------------------------------------------------------
+
+FEATURES_VERSION = 1  # bump when ApkFeatures or its extraction changes
+
+
+@dataclass(slots=True)
+class ApkFeatures:
+    """Trimmed view of an ``(a, d, dx)`` analysis holding what the rules use.
+
+    Unlike the Androguard objects it is small, picklable and JSON‑serialisable,
+    so it can be cached per SHA‑256 and reloaded in milliseconds.
+    """
+
+    sha256: str = ""
+    mode: str = "dex"  # load_apk mode the features were extracted with
+    package: str = ""
+    permissions: List[str] = field(default_factory=list)
+    methods: List[str] = field(default_factory=list)  # internal "Lcls;->name", see iter_api_calls
+    strings: List[str] = field(default_factory=list)
+    natives: List[str] = field(default_factory=list)  # .so files inside the APK
+    calls: Dict[str, List[str]] = field(default_factory=dict)  # external API -> callers, "full" mode only
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ApkFeatures":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+def extract_apk_features(analysis, sha256: str = "") -> ApkFeatures:
+    """Copy the rule‑relevant parts of an ``(a, d, dx)`` triple into :class:`ApkFeatures`.
+
+    Works on every :func:`load_apk` mode: without *dx* the methods come from
+    the Dex method tables, and an ``"apk"`` triple yields no methods or strings.
+    """
+    a, d, dx = analysis
+    dexes = d if isinstance(d, (list, tuple)) else [d]
+    strings: List[str] = []
+    for dex in dexes:
+        strings.extend(iter_strings(dex))
+    if dx is not None:
+        methods, calls, mode = iter_api_calls(dx), build_call_index(dx), "full"
+    else:
+        methods, calls = (m for dex in dexes for m in iter_dex_methods(dex)), {}
+        mode = "dex" if dexes else "apk"
+    return ApkFeatures(
+        sha256=sha256,
+        mode=mode,
+        package=a.get_package() or "",
+        permissions=sorted(iter_permissions(a)),
+        methods=list(dict.fromkeys(methods)),  # overloads share a name
+        strings=strings,
+        natives=[name for name in a.get_files() if name.endswith(".so")],
+        calls=calls,
+    )
+
+
+def release_memory() -> int:
+    """Reclaim dropped Androguard objects and return the heap to the OS.
+
+    ``APK``/``DEX``/``Analysis`` objects reference each other in cycles, so
+    they outlive the last reference until the cycle collector runs; call this
+    after dropping them, between samples.  Returns the number of objects
+    collected.
+    """
+    collected = gc.collect()
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+    return collected
+
+
+def covers_mode(have: str, need: str) -> bool:
+    """True if something loaded in mode *have* provides everything of mode *need*."""
+    return LOAD_MODES.index(have) >= LOAD_MODES.index(need)
+
+
+def _features_path(cache_dir: os.PathLike | str, sha256: str) -> Path:
+    return Path(cache_dir) / f"{sha256}.features.json.gz"
+
+
+def load_cached_features(sha256: str, cache_dir: os.PathLike | str, mode: str = "dex") -> Optional[ApkFeatures]:
+    """Return the cached features of *sha256*, or ``None`` if absent, stale or
+    extracted in a cheaper mode than *mode*."""
+    path = _features_path(cache_dir, sha256)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError) as exc:
+        logger.warning("Ignoring unreadable feature cache %s: %s", path, exc)
+        return None
+    if data.get("version") != FEATURES_VERSION:
+        return None
+    features = ApkFeatures.from_dict(data["features"])
+    return features if covers_mode(features.mode, mode) else None
+
+
+def save_features(features: ApkFeatures, cache_dir: os.PathLike | str) -> Path:
+    """Write *features* to *cache_dir* (atomically) and return the file path."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = _features_path(cache_dir, features.sha256)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as fh:
+            json.dump({"version": FEATURES_VERSION, "features": features.to_dict()}, fh,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def load_features(apk_path: os.PathLike | str, cache_dir: os.PathLike | str | None = None,
+                  mode: str = "dex", release: bool = True) -> ApkFeatures:
+    """Return the :class:`ApkFeatures` of *apk_path*, via *cache_dir* if given.
+
+    On a cache miss the APK is analysed with :func:`load_apk` in *mode* and
+    the result stored under its SHA‑256, so later scans (e.g. with new rules)
+    skip Androguard entirely.  Cached features from a cheaper mode than *mode*
+    are replaced.  The Androguard objects are dropped as soon as the features
+    are copied out and, with *release*, reclaimed by :func:`release_memory`,
+    so a worker returns to its baseline memory between samples.
+
+    Raises
+    ------
+    FileNotFoundError, RuntimeError
+        As :func:`load_apk`.
+    """
+    if not Path(apk_path).is_file():
+        raise FileNotFoundError(apk_path)
+    sha256 = compute_sha256(apk_path)
+    if cache_dir is not None:
+        cached = load_cached_features(sha256, cache_dir, mode)
+        if cached is not None:
+            logger.debug("Feature cache hit for %s", apk_path)
+            return cached
+
+    analysis = load_apk(apk_path, mode=mode)
+    features = extract_apk_features(analysis, sha256)
+    del analysis
+    if release:
+        release_memory()
+    if cache_dir is not None:
+        try:
+            save_features(features, cache_dir)
+        except OSError as exc:
+            logger.warning("Could not cache features of %s: %s", apk_path, exc)
+    return features
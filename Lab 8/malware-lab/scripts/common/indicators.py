@@ -6,9 +6,13 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Dict, List, Set, Tuple
 
+from .andro_utils import ApkFeatures, extract_apk_features
+
+MAX_CALL_SITES = 5  # callers listed per matched API in the evidence
+
 
 @dataclass(slots=True)
 class FamilyRule:
@@ -20,6 +24,24 @@ class FamilyRule:
     native_contains: List[str] = field(default_factory=list)
     string_contains: List[str] = field(default_factory=list)
     threshold: int = 1  # minimal number of satisfied categories to flag sample
+    needs_xrefs: bool = False  # rule inspects call sites, so the full Analysis is built
+    # external APIs ("Lcls;->name") the app must actually call; implies xrefs.
+    # When set, only their call sites satisfy the API category – api_contains
+    # hits are still listed as evidence but no longer count on their own
+    api_calls: List[str] = field(default_factory=list)
+    # api_calls of the call-site variant only (see with_call_sites); the
+    # default rule stays on the fast Dex tables
+    call_site_apis: List[str] = field(default_factory=list)
+
+    @property
+    def uses_xrefs(self) -> bool:
+        return self.needs_xrefs or bool(self.api_calls)
+
+    def with_call_sites(self) -> "FamilyRule":
+        """Variant of this rule whose API category requires call sites of ``call_site_apis``."""
+        if not self.call_site_apis:
+            return self
+        return replace(self, api_calls=self.api_calls + self.call_site_apis, call_site_apis=[])
 
 
 RULES: Dict[str, FamilyRule] = {
@@ -27,6 +49,7 @@ RULES: Dict[str, FamilyRule] = {
         name="ZNIU",
         needs_perm={"WRITE_SECURE_SETTINGS"},
         api_contains=["Runtime.exec", " su "],
+        call_site_apis=["Ljava/lang/Runtime;->exec"],
         native_contains=["libjni_zniu.so"],
         threshold=2,
     ),
@@ -34,12 +57,14 @@ RULES: Dict[str, FamilyRule] = {
         name="ROOTSTV",
         needs_perm={"REQUEST_INSTALL_PACKAGES"},
         api_contains=["DexClassLoader", "chmod", "pm install"],
+        call_site_apis=["Ldalvik/system/DexClassLoader;-><init>"],
         threshold=2,
     ),
     "SLOCKER": FamilyRule(
         name="SLOCKER",
         needs_perm={"BIND_DEVICE_ADMIN"},
         api_contains=["Cipher.doFinal", "AES"],
+        call_site_apis=["Ljavax/crypto/Cipher;->doFinal", "Landroid/app/admin/DevicePolicyManager;->lockNow"],
         string_contains=["bitcoin", "decrypt file", "your files"],
         threshold=2,
     ),
@@ -47,12 +72,31 @@ RULES: Dict[str, FamilyRule] = {
         name="XLOADER",
         needs_perm={"READ_SMS", "SEND_SMS"},
         api_contains=["SmsManager.sendTextMessage", "AccessibilityService"],
+        call_site_apis=[
+            "Landroid/telephony/SmsManager;->sendTextMessage",
+            "Landroid/telephony/SmsManager;->sendMultipartTextMessage",
+        ],
         string_contains=["bank", "account", "login"],
         threshold=2,
     ),
 }
 
 
+def load_mode(*rules: FamilyRule) -> str:
+    """Cheapest :func:`andro_utils.load_apk` mode providing what *rules* inspect.
+
+    Permission and native‑library rules only need the ``APK`` object, API and
+    string rules the Dex tables; cross references are built only for rules
+    declaring ``needs_xrefs`` or ``api_calls`` – the built‑in rules do
+    neither unless turned into their :meth:`FamilyRule.with_call_sites` variant.
+    """
+    if any(rule.uses_xrefs for rule in rules):
+        return "full"
+    if any(rule.api_contains or rule.string_contains for rule in rules):
+        return "dex"
+    return "apk"
+
+
 def detect(sample_name: str, analysis, rule: FamilyRule):
     """Return (detected: bool, evidence: dict) for *sample* under *rule*.
 
@@ -60,12 +104,20 @@ def detect(sample_name: str, analysis, rule: FamilyRule):
     ----------
     sample_name : str
         Human‑readable identifier (filename) – used only for evidence output.
-    analysis : tuple
-        The (a, d, dx) triple returned by :func:`andro_utils.load_apk`.
+    analysis : tuple | ApkFeatures
+        The (a, d, dx) triple returned by :func:`andro_utils.load_apk` (any
+        mode; without *dx* methods come from the Dex tables), or the
+        cached :class:`andro_utils.ApkFeatures` from :func:`andro_utils.load_features`.
     rule : FamilyRule
         The heuristics corresponding to one malware family.
+
+    Raises
+    ------
+    ValueError
+        If *rule* has ``api_calls`` but *analysis* was loaded without cross
+        references (``load_mode(rule)`` gives the mode it needs).
     """
-    a, d, dx = analysis
+    features = analysis if isinstance(analysis, ApkFeatures) else extract_apk_features(analysis)
     evidence: Dict[str, List[str]] = {
         "permissions": [],
         "apis": [],
@@ -75,39 +127,43 @@ def detect(sample_name: str, analysis, rule: FamilyRule):
     score = 0
 
     # ----- permissions ------------------------------------------------------
-    perm_hit = rule.needs_perm & set(a.get_permissions())
+    perm_hit = rule.needs_perm & set(features.permissions)
     if perm_hit:
         evidence["permissions"] = list(perm_hit)
         score += 1
 
     # ----- API calls --------------------------------------------------------
-    apk_methods = [
-        f"{m.get_method().get_class_name()}->{m.get_method().get_name()}"
-        for m in dx.get_methods()
-        if not m.is_external()
-    ]
     for api_sig in rule.api_contains:
-        if any(api_sig in m for m in apk_methods):
+        if any(api_sig in m for m in features.methods):
             evidence["apis"].append(api_sig)
-    if evidence["apis"]:
+
+    # Call sites of external APIs: one lookup per signature in the call index.
+    # They alone satisfy the category – a method merely named like an API
+    # ("...SmsManager.sendTextMessage;->run") proves nothing is called
+    api_hit = bool(evidence["apis"])
+    if rule.api_calls:
+        if features.mode != "full":
+            raise ValueError(f"{sample_name}: rule {rule.name} matches call sites, which need the 'full' "
+                             f"load mode, not {features.mode!r}")
+        evidence["call_sites"] = []
+        api_hit = False
+        for api in rule.api_calls:
+            callers = features.calls.get(api)
+            if callers:
+                api_hit = True
+                evidence["apis"].append(api)
+                evidence["call_sites"].extend(f"{caller} -> {api}" for caller in callers[:MAX_CALL_SITES])
+    if api_hit:
         score += 1
 
     # ----- native libraries -------------------------------------------------
-    natives = [name for name, _ in a.get_files_types().items() if name.endswith(".so")]
-    native_hit = [n for n in natives if any(sig in n for sig in rule.native_contains)]
+    native_hit = [n for n in features.natives if any(sig in n for sig in rule.native_contains)]
     if native_hit:
         evidence["natives"] = native_hit
         score += 1
 
     # ----- string literals --------------------------------------------------
-    string_literals: list[str] = []
-    if isinstance(d, (list, tuple)):
-        for dex in d:
-            string_literals.extend(dex.get_strings())
-    else:
-        string_literals.extend(d.get_strings())
-
-    for lit in string_literals:
+    for lit in features.strings:
         for sig in rule.string_contains:
             if sig.lower() in lit.lower():
                 evidence["strings"].append(sig)
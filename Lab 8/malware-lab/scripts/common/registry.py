@@ -0,0 +1,94 @@
+# ---------------------------------------------------------------------------
+# scripts/common/registry.py
+# ---------------------------------------------------------------------------
+
+"""Registry of the malware families the scanner runtime knows about.
+
+A family is a :class:`FamilyRule` plus optional *evidence hooks*: callables
+``hook(features, evidence)`` that run after :func:`detect` on the sample's
+:class:`ApkFeatures`, may add their own lists to *evidence* and return
+``True`` to flag the sample even when the rule alone does not.  Adding a
+family is one call::
+
+    register_family(FamilyRule("JOKER", needs_perm={"RECEIVE_SMS"}, ...),
+                    description="Static detector for the Joker billing-fraud family.")
+
+    @evidence_hook("JOKER")
+    def _premium_sms(features, evidence):
+        evidence["premium_numbers"] = [s for s in features.strings if s.startswith("+")]
+        return bool(evidence["premium_numbers"])
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .andro_utils import ApkFeatures
+from .indicators import RULES, FamilyRule
+
+EvidenceHook = Callable[[ApkFeatures, Dict[str, List[str]]], Optional[bool]]
+
+
+@dataclass(slots=True)
+class Family:
+    """A registered family: its rule, evidence hooks and CLI description."""
+
+    rule: FamilyRule
+    hooks: List[EvidenceHook] = field(default_factory=list)
+    description: str = ""
+
+    @property
+    def name(self) -> str:
+        return self.rule.name
+
+
+FAMILIES: Dict[str, Family] = {}
+
+
+def register_family(rule: FamilyRule, *hooks: EvidenceHook, description: str = "") -> Family:
+    """Register (or replace) the family of *rule* and return it."""
+    family = Family(rule, list(hooks), description or f"Static detector for the {rule.name} family.")
+    FAMILIES[rule.name.upper()] = family
+    return family
+
+
+def evidence_hook(name: str) -> Callable[[EvidenceHook], EvidenceHook]:
+    """Decorator adding the function as an evidence hook of family *name*."""
+
+    def decorator(hook: EvidenceHook) -> EvidenceHook:
+        get_families([name])[0].hooks.append(hook)
+        return hook
+
+    return decorator
+
+
+def get_families(names: Iterable[str] | None = None) -> List[Family]:
+    """Families by name (case-insensitive), or all of them in registration order.
+
+    Raises
+    ------
+    ValueError
+        For a name that is not registered.
+    """
+    if names is None:
+        return list(FAMILIES.values())
+    families = []
+    for name in names:
+        try:
+            family = FAMILIES[name.upper()]
+        except KeyError:
+            raise ValueError(f"unknown family {name!r} (known: {', '.join(FAMILIES)})") from None
+        if family not in families:
+            families.append(family)
+    return families
+
+
+# ---------------------------------------------------------------------------
+# Built-in families
+# ---------------------------------------------------------------------------
+
+register_family(RULES["ZNIU"], description="Static detector for the ZNIU Android malware family.")
+register_family(RULES["ROOTSTV"], description="Static detector for the ROOTSTV Android malware family.")
+register_family(RULES["SLOCKER"], description="Static detector for the Slocker Android ransomware family.")
+register_family(RULES["XLOADER"], description="Static detector for the XLoader / MoqHao Android banker.")
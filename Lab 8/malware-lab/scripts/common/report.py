@@ -14,6 +14,8 @@ from typing import Any, Dict, List
 from rich.console import Console
 from rich.table import Table
 
+from .report_codec import compact_suffix, compress, decode_json, decompress, encode_json
+
 console = Console()
 
 
@@ -40,3 +42,41 @@ def markdown_summary(rows: List[Dict[str, Any]]) -> str:
             f"| {row['sample']} | {row['family']} | {row['detected']} | {', '.join(ev_keys)} |"
         )
     return header + "\n".join(lines) + "\n"
+
+
+# ----- compact reports (format in :mod:`report_codec`) ------------------------
+
+def encode_compact(data: Dict[str, Any]) -> bytes:
+    """Return *data* as compact JSON, compressed (see :mod:`report_codec`)."""
+    return compress(encode_json(data))
+
+
+def write_compact(out_dir: Path | str, sample: str, data: Dict[str, Any]) -> Path:
+    """Write *data* as compressed compact JSON in *out_dir*; return the path."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tgt = out_dir / f"{sample}{compact_suffix()}"
+    tgt.write_bytes(encode_compact(data))
+    console.print(f"[green]✔ Compact report saved → {tgt}")
+    return tgt
+
+
+def read_report(path: Path | str) -> Dict[str, Any]:
+    """Load a report written by :func:`write_json` or :func:`write_compact`.
+
+    The format is detected from the file's magic bytes, so plain, gzip and
+    zstd reports can be mixed in the same directory.
+
+    Raises
+    ------
+    ImportError
+        If the report is zstd-compressed and *zstandard* is not installed.
+    ValueError
+        If the file does not contain valid JSON.
+    """
+    return decode_json(decompress(Path(path).read_bytes()))
+
+
+def to_pretty_json(path: Path | str) -> str:
+    """Return the report at *path* as indented, human-readable JSON."""
+    return json.dumps(read_report(path), indent=2, ensure_ascii=False)
@@ -0,0 +1,86 @@
+# ---------------------------------------------------------------------------
+# scripts/common/report_codec.py
+# ---------------------------------------------------------------------------
+
+"""Encoding of compact reports, the one copy both labs write and read with.
+
+:mod:`report` of this lab and Lab 5's ``src/report_codec.py`` (which loads
+this file by path, so it depends on the standard library only) produce the
+same files: compact JSON, zstd‑compressed when *zstandard* is installed and
+gzip‑compressed otherwise.  Readers detect the format from the magic bytes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+from typing import Any, Dict, Optional
+
+# Optional speed-ups; stdlib json/gzip are the fallback.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+
+def compact_suffix() -> str:
+    """Return the suffix of compact reports (``.json.zst`` if zstd is installed, else ``.json.gz``)."""
+    return ".json.zst" if zstandard is not None else ".json.gz"
+
+
+def _default(value: Any) -> str:
+    # Dates and times as orjson writes them natively, anything else (Path, ...) as str()
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def encode_json(data: Dict[str, Any]) -> bytes:
+    """Return *data* as compact UTF‑8 JSON (orjson when available).
+
+    Values JSON has no type for are written as strings: dates and times
+    in ISO 8601, anything else (``Path``, ...) as its ``str()``.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(raw: bytes) -> Dict[str, Any]:
+    """Decode JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def compress(raw: bytes, level: Optional[int] = None) -> bytes:
+    """Compress *raw* with zstd if *zstandard* is installed, gzip otherwise."""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level if level is not None else ZSTD_LEVEL).compress(raw)
+    return gzip.compress(raw, compresslevel=level if level is not None else GZIP_LEVEL)
+
+
+def decompress(raw: bytes) -> bytes:
+    """Decompress zstd or gzip data, detected from the magic bytes; plain data is returned unchanged.
+
+    Raises
+    ------
+    ImportError
+        If the data is zstd-compressed and *zstandard* is not installed.
+    """
+    if raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst reports (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    if raw.startswith(GZIP_MAGIC):
+        return gzip.decompress(raw)
+    return raw
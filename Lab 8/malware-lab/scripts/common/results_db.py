@@ -0,0 +1,172 @@
+# ---------------------------------------------------------------------------
+# scripts/common/results_db.py
+# ---------------------------------------------------------------------------
+
+"""Schema of the results database, the one copy both labs write with.
+
+The family scanners of this lab and Lab 5's ``analyse_apk.py --db`` record
+into the same database.  Lab 5's ``src/results_store.py`` loads this file by
+path, so it depends on the standard library only.  Evidence rows carry the
+*source* that recorded them, so re‑recording a sample replaces only that
+tool's rows.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Set, Tuple
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sha256        TEXT PRIMARY KEY,
+    sample        TEXT NOT NULL,
+    package_name  TEXT,
+    analysed_at   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS families (
+    sha256    TEXT NOT NULL,
+    family    TEXT NOT NULL,
+    detected  INTEGER NOT NULL,
+    PRIMARY KEY (sha256, family)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS permissions (
+    sha256      TEXT NOT NULL,
+    permission  TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    PRIMARY KEY (sha256, source, permission)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS api_hits (
+    sha256  TEXT NOT NULL,
+    api     TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    PRIMARY KEY (sha256, source, api)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS string_hits (
+    sha256  TEXT NOT NULL,
+    value   TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    PRIMARY KEY (sha256, source, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sample_status (
+    sha256       TEXT NOT NULL,
+    source       TEXT NOT NULL,
+    sample       TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    error        TEXT,
+    recorded_at  TEXT NOT NULL,
+    PRIMARY KEY (sha256, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_families_family ON families (family, detected, sha256);
+CREATE INDEX IF NOT EXISTS idx_permissions_permission ON permissions (permission, sha256);
+CREATE INDEX IF NOT EXISTS idx_api_hits_api ON api_hits (api, sha256);
+CREATE INDEX IF NOT EXISTS idx_string_hits_value ON string_hits (value, sha256);
+CREATE INDEX IF NOT EXISTS idx_sample_status_status ON sample_status (status, sha256);
+"""
+
+# Trigram index over every string seen in the corpus (see :mod:`string_index`)
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ioc_strings (
+    id     INTEGER PRIMARY KEY,
+    value  TEXT NOT NULL UNIQUE,
+    kind   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ioc_postings (
+    string_id  INTEGER NOT NULL,
+    sha256     TEXT NOT NULL,
+    PRIMARY KEY (string_id, sha256)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ioc_trigrams (
+    gram       TEXT NOT NULL,
+    string_id  INTEGER NOT NULL,
+    PRIMARY KEY (gram, string_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ioc_postings_sha256 ON ioc_postings (sha256, string_id);
+"""
+
+MIN_LENGTH = 4  # shorter literals are noise for IOC hunting
+MAX_LENGTH = 512  # longer blobs (certificates, base64 payloads) are not indexed
+
+_URL_RE = re.compile(r"^[a-z][a-z0-9+.\-]*://", re.IGNORECASE)
+_IP_RE = re.compile(r"(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.])")
+
+# SQLite's default limit on host parameters is far above this
+CHUNK = 500
+
+PERMISSION_PREFIX = "android.permission."
+
+# evidence table -> value column
+EVIDENCE_TABLES = {
+    "permissions": "permission",
+    "api_hits": "api",
+    "string_hits": "value",
+}
+
+
+def normalise_permission(name: str) -> str:
+    """Strip the ``android.permission.`` prefix so short and full names match."""
+    return name[len(PERMISSION_PREFIX):] if name.startswith(PERMISSION_PREFIX) else name
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Create the tables (results and IOC index) that do not exist yet."""
+    conn.executescript(SCHEMA)
+    conn.executescript(INDEX_SCHEMA)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+
+def replace_evidence(conn: sqlite3.Connection, table: str, keys: Iterable[Tuple[str, str]],
+                     rows: Iterable[Tuple[str, str, str]]) -> None:
+    """Replace the *table* rows of each ``(sha256, source)`` in *keys* by *rows*."""
+    column = EVIDENCE_TABLES[table]
+    conn.executemany(f"DELETE FROM {table} WHERE sha256 = ? AND source = ?", keys)
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (sha256, {column}, source) VALUES (?, ?, ?)", rows)
+
+
+def classify(value: str) -> str:
+    """Return ``"url"``, ``"ip"`` or ``"string"`` for *value*."""
+    if _URL_RE.match(value):
+        return "url"
+    if _IP_RE.search(value):
+        return "ip"
+    return "string"
+
+
+def trigrams(value: str) -> Set[str]:
+    """Return the set of lower‑cased 3‑character grams of *value*."""
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _known_ids(conn: sqlite3.Connection, values: Iterable[str]) -> Dict[str, int]:
+    values = list(values)
+    known: Dict[str, int] = {}
+    for start in range(0, len(values), CHUNK):
+        chunk = values[start:start + CHUNK]
+        marks = ",".join("?" * len(chunk))
+        known.update(conn.execute(f"SELECT value, id FROM ioc_strings WHERE value IN ({marks})", chunk))
+    return known
+
+
+def index_strings(conn: sqlite3.Connection, sha256: str, strings: Iterable[str]) -> int:
+    """Make *strings* the IOC index entries of *sha256*; return the number of strings kept.
+
+    Postings from an earlier indexing of the sample are removed, so a
+    re‑analysed sample is no longer found by strings it does not contain.
+    Trigrams are only generated for strings the index has never seen.  Call
+    it inside the caller's transaction.
+    """
+    values = {s for s in strings if MIN_LENGTH <= len(s) <= MAX_LENGTH}
+    conn.execute("DELETE FROM ioc_postings WHERE sha256 = ?", (sha256,))
+    ids = _known_ids(conn, values)
+    grams: List[Tuple[str, int]] = []
+    for value in values - ids.keys():
+        cursor = conn.execute("INSERT INTO ioc_strings (value, kind) VALUES (?, ?)", (value, classify(value)))
+        ids[value] = cursor.lastrowid
+        grams.extend((gram, cursor.lastrowid) for gram in trigrams(value))
+    conn.executemany("INSERT OR IGNORE INTO ioc_trigrams (gram, string_id) VALUES (?, ?)", grams)
+    conn.executemany("INSERT INTO ioc_postings (string_id, sha256) VALUES (?, ?)",
+                     ((string_id, sha256) for string_id in ids.values()))
+    return len(values)
@@ -0,0 +1,257 @@
+# ---------------------------------------------------------------------------
+# scripts/common/results_store.py
+# ---------------------------------------------------------------------------
+
+"""SQLite store for scan results, indexed for corpus‑wide queries.
+
+One database can be shared by the family scanners of this lab and by the
+Lab 5 ``analyse_apk.py`` pipeline (``--db``); both write the same schema.
+Every evidence table is keyed by the sample's SHA‑256 and carries a reverse
+index on the value, so a question such as *"which samples use DexClassLoader
+and request SEND_SMS"* is a handful of index lookups instead of a scan over
+every JSON report.  ``sample_status`` records how each tool's last analysis
+of a sample ended (a :class:`~scripts.common.watchdog.SampleOutcome` status),
+so samples that timed out or crashed can be found and re‑run.  The schema
+itself is defined once, in :mod:`results_db`.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .results_db import EVIDENCE_TABLES, create_schema, normalise_permission, replace_evidence
+
+
+def scan_source(family: Optional[str]) -> str:
+    """Evidence source of a family scanner's results (``scan:<FAMILY>``)."""
+    return f"scan:{family.upper()}" if family else "scan"
+
+
+def _status_row(sha256: str, outcome, source: str) -> Tuple[str, ...]:
+    now = datetime.now(tz=timezone.utc).isoformat()
+    return (sha256, source, os.path.basename(outcome.sample), outcome.status, outcome.error or None, now)
+
+
+def record_outcome(conn: sqlite3.Connection, sha256: str, outcome, source: str) -> None:
+    """Record (immediately) how *source*'s last analysis of *sha256* ended."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO sample_status (sha256, source, sample, status, error, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            _status_row(sha256, outcome, source),
+        )
+
+
+def connect(db_path: os.PathLike | str) -> sqlite3.Connection:
+    """Open *db_path* in WAL mode and make sure the (current) schema exists."""
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    create_schema(conn)
+    return conn
+
+
+class ResultsStore:
+    """Batched writer / reader around the results database.
+
+    Rows are buffered and written in a single transaction every *batch_size*
+    samples (and on :meth:`flush` / context exit), which keeps inserts fast
+    when a batch driver records thousands of samples.
+    """
+
+    def __init__(self, db_path: os.PathLike | str, batch_size: int = 200):
+        self.conn = connect(db_path)
+        self.batch_size = batch_size
+        self._pending_samples = 0
+        self._rows: Dict[str, List[Tuple[Any, ...]]] = {
+            "samples": [], "families": [], "permissions": [], "api_hits": [], "string_hits": [],
+            "sample_status": [],
+        }
+        self._replaced: Set[Tuple[str, str]] = set()  # (sha256, source) whose evidence is rewritten
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ----- writing ----------------------------------------------------------
+
+    def add_sample(
+        self,
+        sha256: str,
+        sample: str,
+        *,
+        package_name: Optional[str] = None,
+        family: Optional[str] = None,
+        detected: Optional[bool] = None,
+        permissions: Iterable[str] = (),
+        apis: Iterable[str] = (),
+        strings: Iterable[str] = (),
+        source: Optional[str] = None,
+    ) -> None:
+        """Queue one sample's results; evidence values are de‑duplicated.
+
+        The evidence replaces whatever *source* (default: ``scan:<family>``)
+        recorded for the sample before, so re‑scanning after a rule change
+        leaves no stale hits; other tools' evidence is kept.
+        """
+        now = datetime.now(tz=timezone.utc).isoformat()
+        source = source if source is not None else scan_source(family)
+        key = (sha256, source)
+        if key in self._replaced:  # queued twice in one batch: the last one wins
+            for table in EVIDENCE_TABLES:
+                self._rows[table] = [row for row in self._rows[table] if (row[0], row[2]) != key]
+        self._replaced.add(key)
+        self._rows["samples"].append((sha256, sample, package_name, now))
+        if family is not None:
+            self._rows["families"].append((sha256, family, int(bool(detected))))
+        self._rows["permissions"].extend(
+            (sha256, p, source) for p in {normalise_permission(p) for p in permissions}
+        )
+        self._rows["api_hits"].extend((sha256, a, source) for a in set(apis))
+        self._rows["string_hits"].extend((sha256, s, source) for s in set(strings))
+        self._pending_samples += 1
+        if self._pending_samples >= self.batch_size:
+            self.flush()
+
+    def add_scan_result(self, sha256: str, result) -> None:
+        """Queue a family scanner :class:`ScanResult`."""
+        evidence = result.evidence or {}
+        self.add_sample(
+            sha256,
+            result.apk_path.name,
+            family=result.rule.name,
+            detected=result.detected,
+            permissions=evidence.get("permissions", []),
+            apis=evidence.get("apis", []),
+            strings=evidence.get("strings", []),
+        )
+
+    def add_outcome(self, sha256: str, outcome, source: str = "scan") -> None:
+        """Queue the status of a :class:`SampleOutcome`; see :func:`record_outcome`."""
+        self._rows["sample_status"].append(_status_row(sha256, outcome, source))
+        self._pending_samples += 1
+        if self._pending_samples >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all queued rows in one transaction."""
+        if not self._pending_samples:
+            return
+        with self.conn:
+            # COALESCE keeps a package name recorded by another tool
+            self.conn.executemany(
+                "INSERT INTO samples (sha256, sample, package_name, analysed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET sample=excluded.sample, "
+                "package_name=COALESCE(excluded.package_name, samples.package_name), "
+                "analysed_at=excluded.analysed_at",
+                self._rows["samples"],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO families (sha256, family, detected) VALUES (?, ?, ?)",
+                self._rows["families"],
+            )
+            for table in EVIDENCE_TABLES:
+                replace_evidence(self.conn, table, self._replaced, self._rows[table])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sample_status (sha256, source, sample, status, error, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._rows["sample_status"],
+            )
+        for rows in self._rows.values():
+            rows.clear()
+        self._replaced.clear()
+        self._pending_samples = 0
+
+    def close(self) -> None:
+        """Flush pending rows and close the connection."""
+        self.flush()
+        self.conn.close()
+
+    # ----- querying ---------------------------------------------------------
+
+    def query(
+        self,
+        *,
+        permissions: Sequence[str] = (),
+        apis: Sequence[str] = (),
+        strings: Sequence[str] = (),
+        families: Sequence[str] = (),
+        detected_only: bool = True,
+        contains: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, str, Optional[str]]]:
+        """Return ``(sha256, sample, package_name)`` rows matching **all** criteria.
+
+        Parameters
+        ----------
+        permissions, apis, strings : sequence of str
+            Values that must all be present for a sample.
+        families : sequence of str
+            Family names the sample must have been scanned for (and flagged
+            as, when *detected_only* is true).
+        contains : bool
+            Match API and string values as substrings instead of exactly.
+            Exact matches use the indexes; substring matches scan them.
+        """
+        self.flush()
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        def add(table: str, column: str, value: str, substring: bool) -> None:
+            if substring:
+                clauses.append(f"s.sha256 IN (SELECT sha256 FROM {table} WHERE {column} LIKE ? ESCAPE '\\')")
+                escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+            else:
+                clauses.append(f"s.sha256 IN (SELECT sha256 FROM {table} WHERE {column} = ?)")
+                params.append(value)
+
+        for perm in permissions:
+            add("permissions", "permission", normalise_permission(perm), False)
+        for api in apis:
+            add("api_hits", "api", api, contains)
+        for value in strings:
+            add("string_hits", "value", value, contains)
+        for family in families:
+            detected = " AND detected = 1" if detected_only else ""
+            clauses.append(f"s.sha256 IN (SELECT sha256 FROM families WHERE family = ?{detected})")
+            params.append(family.upper())
+
+        sql = "SELECT s.sha256, s.sample, s.package_name FROM samples s"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY s.sample"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def failures(self, source: Optional[str] = None) -> List[Tuple[str, str, str, str, str]]:
+        """Return ``(sha256, sample, source, status, error)`` of every analysis that did not end ``ok``."""
+        self.flush()
+        sql = "SELECT sha256, sample, source, status, error FROM sample_status WHERE status != 'ok'"
+        params: List[Any] = []
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        return self.conn.execute(sql + " ORDER BY recorded_at", params).fetchall()
+
+    def evidence(self, sha256: str) -> Dict[str, List[str]]:
+        """Return every recorded evidence value for one sample."""
+        self.flush()
+        result: Dict[str, List[str]] = {}
+        for table, column in EVIDENCE_TABLES.items():
+            rows = self.conn.execute(
+                f"SELECT DISTINCT {column} FROM {table} WHERE sha256 = ? ORDER BY {column}", (sha256,)
+            )
+            result[table] = [row[0] for row in rows]
+        rows = self.conn.execute(
+            "SELECT family FROM families WHERE sha256 = ? AND detected = 1 ORDER BY family", (sha256,)
+        )
+        result["families"] = [row[0] for row in rows]
+        return result
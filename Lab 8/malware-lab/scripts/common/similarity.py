@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------
+# scripts/common/similarity.py
+# ---------------------------------------------------------------------------
+
+"""MinHash / LSH similarity index for clustering samples into families.
+
+Each sample is reduced to a feature set (internal method signatures, Dex
+string literals, permissions and native library names) and summarised by a
+fixed‑size MinHash signature whose agreement rate estimates the Jaccard
+similarity of two feature sets.  The signature is cut into *bands*; samples
+sharing any band bucket become candidates, so a lookup touches a handful of
+buckets instead of comparing against the whole corpus.
+
+Signatures and buckets are kept in the results database (see
+:mod:`results_store`) next to the scan results.  ``numpy`` speeds up
+signature computation when installed; the pure‑Python path gives identical
+signatures.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import struct
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .andro_utils import ApkFeatures, iter_api_calls, iter_permissions, iter_strings
+from .results_store import connect
+
+# Optional vectorised path; the pure‑Python fallback is always available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SIM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sim_params (
+    num_perm  INTEGER NOT NULL,
+    bands     INTEGER NOT NULL,
+    seed      INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sim_signatures (
+    sha256     TEXT PRIMARY KEY,
+    sample     TEXT NOT NULL,
+    label      TEXT,
+    signature  BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sim_buckets (
+    band    INTEGER NOT NULL,
+    bucket  INTEGER NOT NULL,
+    sha256  TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, sha256)
+) WITHOUT ROWID;
+"""
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+MIN_STRING_LENGTH = 4
+
+
+def extract_features(analysis) -> Set[str]:
+    """Return the prefixed feature set of an ``(a, d, dx)`` triple or :class:`ApkFeatures`.
+
+    Tokens are ``api:``, ``str:``, ``perm:`` and ``lib:`` prefixed so that a
+    permission name never collides with an identical string literal.
+    """
+    if isinstance(analysis, ApkFeatures):
+        features = {f"api:{m}" for m in analysis.methods}
+        features.update(f"str:{s}" for s in analysis.strings if len(s) >= MIN_STRING_LENGTH)
+        features.update(f"perm:{p}" for p in analysis.permissions)
+        features.update(f"lib:{os.path.basename(name)}" for name in analysis.natives)
+        return features
+    a, d, dx = analysis
+    features: Set[str] = {f"api:{m}" for m in iter_api_calls(dx)}
+    for dex in d if isinstance(d, (list, tuple)) else [d]:
+        features.update(f"str:{s}" for s in iter_strings(dex) if len(s) >= MIN_STRING_LENGTH)
+    features.update(f"perm:{p}" for p in iter_permissions(a))
+    features.update(f"lib:{os.path.basename(name)}" for name in a.get_files() if name.endswith(".so"))
+    return features
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8", "surrogatepass"), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """Computes *num_perm*‑value MinHash signatures of string sets.
+
+    The permutations are ``(a·x + b) mod p`` with 31‑bit *a*, *b* and 32‑bit
+    token hashes *x*, so every intermediate fits in an unsigned 64‑bit
+    integer and the numpy and pure‑Python paths agree bit for bit.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, 1 << 31) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, 1 << 31) for _ in range(num_perm)]
+
+    def signature(self, features: Iterable[str]) -> List[int]:
+        hashes = [_token_hash(token) for token in set(features)]
+        if not hashes:
+            return [_MASK32] * self.num_perm
+        if np is not None:
+            hv = np.asarray(hashes, dtype=np.uint64)
+            a = np.asarray(self.a, dtype=np.uint64)[:, None]
+            b = np.asarray(self.b, dtype=np.uint64)[:, None]
+            values = ((a * hv + b) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MASK32)
+            return [int(v) for v in values.min(axis=1)]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MASK32 for h in hashes)
+            for a, b in zip(self.a, self.b)
+        ]
+
+
+def estimate_similarity(sig1: Sequence[int], sig2: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: the fraction of agreeing MinHash values."""
+    return sum(x == y for x, y in zip(sig1, sig2)) / len(sig1)
+
+
+@dataclass(slots=True)
+class Neighbour:
+    """One known sample returned by :meth:`SimilarityIndex.nearest`."""
+
+    sha256: str
+    sample: str
+    similarity: float
+    family: Optional[str]
+
+
+class SimilarityIndex:
+    """Persistent LSH index of MinHash signatures.
+
+    With the defaults (128 permutations in 32 bands of 4 rows) a pair with
+    Jaccard similarity 0.5 becomes a candidate with ≈ 87 % probability and a
+    pair at 0.2 with ≈ 5 %.
+    """
+
+    def __init__(self, db_path: os.PathLike | str, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.conn = connect(db_path)
+        self.conn.executescript(SIM_SCHEMA)
+        stored = self.conn.execute("SELECT num_perm, bands, seed FROM sim_params").fetchone()
+        if stored is None:
+            with self.conn:
+                self.conn.execute("INSERT INTO sim_params VALUES (?, ?, ?)", (num_perm, bands, seed))
+        elif stored != (num_perm, bands, seed):
+            raise ValueError(f"Index was built with (num_perm, bands, seed) = {stored}")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+
+    def __enter__(self) -> "SimilarityIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _buckets(self, signature: Sequence[int]) -> List[int]:
+        buckets = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{self.rows}I", *chunk), digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, "little", signed=True))  # SQLite integers are signed
+        return buckets
+
+    def add(self, sha256: str, sample: str, features: Iterable[str], label: Optional[str] = None) -> None:
+        """Index one sample; re‑adding a sample replaces its signature."""
+        signature = self.hasher.signature(features)
+        with self.conn:
+            self.conn.execute("DELETE FROM sim_buckets WHERE sha256 = ?", (sha256,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sim_signatures (sha256, sample, label, signature) VALUES (?, ?, ?, ?)",
+                (sha256, sample, label.upper() if label else None, array("I", signature).tobytes()),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sim_buckets (band, bucket, sha256) VALUES (?, ?, ?)",
+                ((band, bucket, sha256) for band, bucket in enumerate(self._buckets(signature))),
+            )
+
+    def _family(self, sha256: str, label: Optional[str]) -> Optional[str]:
+        if label:
+            return label
+        # fall back to the verdicts recorded by the family scanners (--db)
+        row = self.conn.execute(
+            "SELECT family FROM families WHERE sha256 = ? AND detected = 1 ORDER BY family LIMIT 1", (sha256,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def nearest(
+        self,
+        features: Iterable[str],
+        *,
+        top: int = 5,
+        min_similarity: float = 0.3,
+        exclude: Optional[str] = None,
+    ) -> List[Neighbour]:
+        """Return up to *top* indexed samples most similar to *features*."""
+        signature = self.hasher.signature(features)
+        candidates: Set[str] = set()
+        for band, bucket in enumerate(self._buckets(signature)):
+            rows = self.conn.execute(
+                "SELECT sha256 FROM sim_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            )
+            candidates.update(row[0] for row in rows)
+        candidates.discard(exclude)
+
+        neighbours: List[Neighbour] = []
+        for sha256 in candidates:
+            sample, label, blob = self.conn.execute(
+                "SELECT sample, label, signature FROM sim_signatures WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            similarity = estimate_similarity(signature, array("I", blob))
+            if similarity >= min_similarity:
+                neighbours.append(Neighbour(sha256, sample, similarity, self._family(sha256, label)))
+        neighbours.sort(key=lambda n: (-n.similarity, n.sample))
+        return neighbours[:top]
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM sim_signatures").fetchone()[0]
+
+
+def candidate_family(neighbours: Sequence[Neighbour]) -> Optional[str]:
+    """Similarity‑weighted vote over the labelled neighbours (``None`` if none)."""
+    votes: Dict[str, float] = Counter()
+    for n in neighbours:
+        if n.family:
+            votes[n.family] += n.similarity
+    return max(votes, key=votes.get) if votes else None
@@ -0,0 +1,129 @@
+# ---------------------------------------------------------------------------
+# scripts/common/string_index.py
+# ---------------------------------------------------------------------------
+
+"""Persistent trigram index over every string seen in the analysed corpus.
+
+Strings (string literals, URLs, IP addresses…) are stored once in
+``ioc_strings``; ``ioc_postings`` maps each string to the samples that
+contain it and ``ioc_trigrams`` maps every lower‑cased 3‑character gram to
+the strings containing it.  A substring search intersects the posting lists
+of the query's trigrams and only verifies the few surviving candidates, so
+looking up a new C2 domain or wallet address across the whole history never
+re‑opens an APK and never scans the full string table.
+
+The tables live in the results database (see :mod:`results_db`) and share
+its ``samples`` table; Lab 5's ``analyse_apk.py --db`` feeds them as well.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .results_db import CHUNK, index_strings, trigrams
+from .results_store import connect
+
+# Grams intersected to select candidates; SQLite caps compound SELECTs at 500
+# terms, and the substring check verifies whatever the sample leaves out
+MAX_QUERY_GRAMS = 32
+
+
+class StringIndex:
+    """Writer / searcher for the IOC trigram index.
+
+    Each :meth:`add_strings` call is one transaction; trigrams are only
+    generated for strings the index has never seen, so re‑indexing a
+    family of near‑identical samples mostly adds postings.
+    """
+
+    def __init__(self, db_path: os.PathLike | str):
+        self.conn = connect(db_path)
+
+    def __enter__(self) -> "StringIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ----- writing ----------------------------------------------------------
+
+    def add_strings(
+        self,
+        sha256: str,
+        sample: str,
+        strings: Iterable[str],
+        *,
+        package_name: Optional[str] = None,
+    ) -> int:
+        """Index *strings* for one sample, replacing what was indexed for it before.
+
+        Returns the number of strings kept.
+        """
+        now = datetime.now(tz=timezone.utc).isoformat()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO samples (sha256, sample, package_name, analysed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET "
+                "package_name=COALESCE(excluded.package_name, samples.package_name)",
+                (sha256, sample, package_name, now),
+            )
+            return index_strings(self.conn, sha256, strings)
+
+    # ----- searching --------------------------------------------------------
+
+    def _candidates(self, query: str, exact: bool) -> List[Tuple[int, str, str]]:
+        if exact:
+            return self.conn.execute("SELECT id, value, kind FROM ioc_strings WHERE value = ?", (query,)).fetchall()
+        grams = sorted(trigrams(query))
+        if len(grams) > MAX_QUERY_GRAMS:
+            step = len(grams) / MAX_QUERY_GRAMS
+            grams = [grams[int(i * step)] for i in range(MAX_QUERY_GRAMS)]
+        if not grams:
+            # too short for the trigram index; fall back to a table scan
+            rows = self.conn.execute("SELECT id, value, kind FROM ioc_strings")
+        else:
+            intersect = " INTERSECT ".join(["SELECT string_id FROM ioc_trigrams WHERE gram = ?"] * len(grams))
+            rows = self.conn.execute(f"SELECT id, value, kind FROM ioc_strings WHERE id IN ({intersect})", grams)
+        needle = query.lower()
+        # trigrams only prove the grams occur somewhere; verify the substring
+        return [row for row in rows if needle in row[1].lower()]
+
+    def search(
+        self,
+        query: str,
+        *,
+        kind: Optional[str] = None,
+        exact: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, str, str, str]]:
+        """Return ``(value, kind, sha256, sample)`` rows whose value contains *query*.
+
+        Matching is case‑insensitive.  With *exact* the value must equal
+        *query* (case‑sensitive).  *kind* restricts the hits to ``"url"``,
+        ``"ip"`` or ``"string"``.
+        """
+        candidates = [row for row in self._candidates(query, exact) if kind is None or row[2] == kind]
+        hits: List[Tuple[str, str, str, str]] = []
+        for start in range(0, len(candidates), CHUNK):
+            chunk = {row[0]: row for row in candidates[start:start + CHUNK]}
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                "SELECT p.string_id, p.sha256, s.sample FROM ioc_postings p "
+                f"JOIN samples s ON s.sha256 = p.sha256 WHERE p.string_id IN ({marks})",
+                list(chunk),
+            )
+            hits.extend((chunk[string_id][1], chunk[string_id][2], sha256, sample) for string_id, sha256, sample in rows)
+        hits.sort(key=lambda hit: (hit[0], hit[3]))
+        return hits[:limit] if limit is not None else hits
+
+    def stats(self) -> Dict[str, int]:
+        """Return row counts of the index tables."""
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("ioc_strings", "ioc_postings", "ioc_trigrams")
+        }
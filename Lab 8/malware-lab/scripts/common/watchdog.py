@@ -0,0 +1,257 @@
+# ---------------------------------------------------------------------------
+# scripts/common/watchdog.py
+# ---------------------------------------------------------------------------
+
+"""Run one sample's analysis in a child process under resource limits.
+
+A pathological APK can keep ``AnalyzeAPK`` busy for an hour or eat all the
+RAM of the machine, and an exception handler cannot stop either.
+:func:`run_limited` calls ``func(apk_path, **kwargs)`` (e.g. a scanner's
+``scan_file`` or :func:`~scripts.common.andro_utils.load_features`) in a
+child process with an address-space limit (``RLIMIT_AS``), a CPU-time limit
+(``RLIMIT_CPU``) and a wall-clock watchdog, and reports how it ended as a
+:class:`SampleOutcome` instead of raising, so a batch moves on to the next
+sample::
+
+    outcome = run_limited(scan_file, apk, ResourceLimits(wall_seconds=600, memory_mb=4096))
+    if outcome.ok:
+        print(outcome.result.detected)
+    else:
+        print(outcome.status, outcome.error)    # e.g. "timeout", "oom"
+
+The rlimits need the POSIX :mod:`resource` module; elsewhere only the
+wall-clock watchdog applies.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# SampleOutcome.status values
+OK = "ok"
+ERROR = "error"          # func raised an exception
+TIMEOUT = "timeout"      # wall-clock limit, the child was killed
+CPU_LIMIT = "cpu_limit"  # RLIMIT_CPU, the kernel sent SIGXCPU
+OOM = "oom"              # MemoryError under RLIMIT_AS, or SIGKILL (kernel OOM killer)
+CRASHED = "crashed"      # any other death of the child, e.g. a segfault in a native parser
+
+# Seconds a child that already sent its result gets to exit before it is killed
+_EXIT_GRACE = 5.0
+
+
+@dataclass(slots=True, frozen=True)
+class ResourceLimits:
+    """Per-sample limits; ``None`` leaves the resource unlimited."""
+
+    wall_seconds: float | None = None
+    cpu_seconds: int | None = None
+    memory_mb: int | None = None
+
+    @property
+    def isolated(self) -> bool:
+        """Whether any limit is set, i.e. whether a child process is needed."""
+        return any(v is not None for v in (self.wall_seconds, self.cpu_seconds, self.memory_mb))
+
+
+@dataclass(slots=True)
+class SampleOutcome:
+    """How one call of :func:`run_limited` ended."""
+
+    sample: str
+    status: str
+    result: Any = None
+    error: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+    @property
+    def aborted(self) -> bool:
+        """True when a limit (or a crash) ended the analysis rather than an exception."""
+        return self.status not in (OK, ERROR)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Everything but the result, for reports and batch summaries."""
+        return {
+            "sample": self.sample,
+            "status": self.status,
+            "error": self.error,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+    def unwrap(self) -> Any:
+        """Return the result, or raise :class:`SampleAborted` for any other outcome."""
+        if not self.ok:
+            raise SampleAborted(self)
+        return self.result
+
+
+class SampleAborted(RuntimeError):
+    """Raised by :meth:`SampleOutcome.unwrap` for a failed sample."""
+
+    def __init__(self, outcome: SampleOutcome):
+        super().__init__(f"{outcome.status}: {outcome.error}" if outcome.aborted else outcome.error)
+        self.outcome = outcome
+
+
+def _mp_context():
+    # fork keeps the parent's imports (and test monkeypatches) and starts in
+    # milliseconds; spawn is the portable fallback
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods and sys.platform != "darwin" else "spawn")
+
+
+def _apply_limits(limits: ResourceLimits) -> None:
+    if resource is None:
+        return
+    if limits.memory_mb is not None:
+        size = limits.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    if limits.cpu_seconds is not None:
+        # SIGXCPU at the soft limit; the hard limit (SIGKILL) is only a backstop
+        resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 5))
+
+
+def _describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+
+
+def _child(conn, func: Callable[..., Any], apk_path, limits: ResourceLimits, kwargs: Dict[str, Any]) -> None:
+    try:
+        _apply_limits(limits)
+        message = (OK, func(apk_path, **kwargs), "")
+    except MemoryError:
+        gc.collect()  # free what the failed analysis held so the reply can be sent
+        message = (OOM, None, f"MemoryError under a {limits.memory_mb} MB address-space limit")
+    except Exception as exc:
+        message = (ERROR, None, _describe(exc))
+    try:
+        conn.send(message)
+    except Exception as exc:  # e.g. an unpicklable result
+        conn.send((ERROR, None, f"cannot return the result: {_describe(exc)}"))
+    finally:
+        conn.close()
+
+
+def _exit_status(exitcode: int | None, limits: ResourceLimits) -> tuple[str, str]:
+    if exitcode == -getattr(signal, "SIGXCPU", -1):
+        return CPU_LIMIT, f"exceeded the {limits.cpu_seconds} s CPU-time limit"
+    if exitcode == -getattr(signal, "SIGKILL", -1):
+        return OOM, "killed by SIGKILL (most likely the kernel OOM killer)"
+    return CRASHED, f"analysis process died with exit code {exitcode}"
+
+
+def run_limited(func: Callable[..., Any], apk_path, limits: ResourceLimits | None = None,
+                **kwargs: Any) -> SampleOutcome:
+    """Call ``func(apk_path, **kwargs)`` under *limits* and report how it ended.
+
+    Parameters
+    ----------
+    func : callable
+        Module-level function taking the sample path first; its return value
+        must be picklable.
+    apk_path : path-like
+        The sample.
+    limits : ResourceLimits, optional
+        Without limits (or with all of them ``None``) *func* runs in this
+        process and only exceptions are turned into an outcome.
+    **kwargs
+        Passed on to *func*.
+
+    Returns
+    -------
+    SampleOutcome
+        ``status`` is one of ``ok``, ``error``, ``timeout``, ``cpu_limit``,
+        ``oom`` or ``crashed``; ``result`` is set only when it is ``ok``.
+        ``KeyboardInterrupt`` is not caught.
+    """
+    sample = str(apk_path)
+    start = time.monotonic()
+    if limits is None or not limits.isolated:
+        try:
+            return SampleOutcome(sample, OK, func(apk_path, **kwargs), elapsed=time.monotonic() - start)
+        except MemoryError:
+            return SampleOutcome(sample, OOM, error="MemoryError", elapsed=time.monotonic() - start)
+        except Exception as exc:
+            return SampleOutcome(sample, ERROR, error=_describe(exc), elapsed=time.monotonic() - start)
+
+    ctx = _mp_context()
+    reader, writer = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(writer, func, apk_path, limits, kwargs), daemon=True)
+    process.start()
+    writer.close()  # so a dead child shows up as EOF on the reader
+    message, timed_out = None, False
+    try:
+        if reader.poll(limits.wall_seconds):
+            message = reader.recv()
+        else:
+            timed_out = True
+    except EOFError:
+        pass
+    except BaseException:
+        process.kill()
+        process.join()
+        raise
+    finally:
+        reader.close()
+
+    if timed_out:
+        process.kill()
+        process.join()
+        outcome = SampleOutcome(sample, TIMEOUT, error=f"exceeded the {limits.wall_seconds:g} s wall-clock limit")
+    else:
+        process.join(_EXIT_GRACE)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        if message is not None:
+            status, result, error = message
+            outcome = SampleOutcome(sample, status, result, error)
+        else:
+            status, error = _exit_status(process.exitcode, limits)
+            outcome = SampleOutcome(sample, status, error=error)
+    outcome.elapsed = time.monotonic() - start
+    if outcome.aborted:
+        logger.warning("%s: %s (%s)", sample, outcome.status, outcome.error)
+    return outcome
+
+
+# ---------------------------------------------------------------------------
+# CLI helpers
+# ---------------------------------------------------------------------------
+
+
+def add_limit_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add ``--timeout``, ``--max-cpu`` and ``--max-memory`` to *parser*."""
+    group = parser.add_argument_group(
+        "resource limits", "Any of these runs each sample in a child process that is stopped at the limit"
+    )
+    group.add_argument("--timeout", type=float, default=None, metavar="SECONDS",
+                       help="Wall-clock limit per sample")
+    group.add_argument("--max-cpu", type=int, default=None, metavar="SECONDS",
+                       help="CPU-time limit per sample (POSIX only)")
+    group.add_argument("--max-memory", type=int, default=None, metavar="MB",
+                       help="Address-space limit per sample (POSIX only)")
+
+
+def limits_from_args(args: argparse.Namespace) -> ResourceLimits | None:
+    """The :class:`ResourceLimits` requested on the command line, or ``None``."""
+    limits = ResourceLimits(wall_seconds=args.timeout, cpu_seconds=args.max_cpu, memory_mb=args.max_memory)
+    return limits if limits.isolated else None
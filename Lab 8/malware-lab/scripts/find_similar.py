@@ -0,0 +1,95 @@
+# ---------------------------------------------------------------------------
+# scripts/find_similar.py  –  Nearest known samples / candidate family
+# ---------------------------------------------------------------------------
+"""Command‑line utility around the MinHash/LSH similarity index.
+
+Usage (from repo root) ::
+
+    # index labelled reference samples
+    python -m scripts.find_similar reports/results.db --add data/samples/xloader*.apk --label XLOADER
+
+    # nearest known samples for an unknown APK
+    python -m scripts.find_similar reports/results.db data/samples/unknown.apk
+
+Unlabelled samples fall back to the family verdicts recorded by the
+scanners' ``--db`` option.  A sample that cannot be loaded is reported as a
+JSON outcome on stderr and its status recorded in the database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+from scripts.common import add_limit_arguments, compute_sha256, limits_from_args, load_features, run_limited
+from scripts.common.results_store import record_outcome
+from scripts.common.similarity import SimilarityIndex, candidate_family, extract_features
+
+SOURCE = "find_similar"  # sample_status source of this tool
+
+
+def _cli(argv: List[str] | None = None) -> None:
+    """Parse CLI args and index or look up the given APKs."""
+
+    parser = argparse.ArgumentParser(
+        prog="find_similar",
+        description="Find the nearest known samples (and a candidate family) for APKs.",
+    )
+    parser.add_argument("db", type=Path, help="Path to the results database")
+    parser.add_argument("apk", type=Path, nargs="+", help="APK file(s)")
+    parser.add_argument("--add", action="store_true", help="Index the APKs instead of looking them up")
+    parser.add_argument("--label", help="With --add, family label of the APKs")
+    parser.add_argument("--top", type=int, default=5, help="Number of neighbours to print")
+    parser.add_argument("--cache", type=Path, default=None, metavar="DIR",
+                        help="Feature cache directory (see the scanners' --cache)")
+    parser.add_argument(
+        "--min-similarity",
+        type=float,
+        default=0.3,
+        help="Minimum estimated Jaccard similarity of reported neighbours",
+    )
+
+    add_limit_arguments(parser)
+
+    args = parser.parse_args(argv)
+    limits = limits_from_args(args)
+
+    failures = 0
+    with SimilarityIndex(args.db) as index:
+        for apk_path in args.apk:
+            outcome = run_limited(load_features, apk_path, limits, cache_dir=args.cache)
+            if not outcome.ok:  # report and keep going with the remaining APKs
+                print(json.dumps(outcome.to_dict()), file=sys.stderr)
+                if apk_path.is_file():
+                    record_outcome(index.conn, compute_sha256(apk_path), outcome, SOURCE)
+                failures += 1
+                continue
+            features = extract_features(outcome.result)
+            sha256 = outcome.result.sha256
+            record_outcome(index.conn, sha256, outcome, SOURCE)
+
+            if args.add:
+                index.add(sha256, apk_path.name, features, label=args.label)
+                print(f"[+] {apk_path.name}: indexed {len(features)} feature(s)")
+                continue
+
+            neighbours = index.nearest(
+                features, top=args.top, min_similarity=args.min_similarity, exclude=sha256
+            )
+            family = candidate_family(neighbours)
+            print(f"{apk_path.name}: candidate family = {family or 'unknown'}")
+            for n in neighbours:
+                print(f"    {n.similarity:.2f}  {n.sample}  {n.family or '-'}  {n.sha256}")
+    if failures:
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# When executed directly
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    _cli()
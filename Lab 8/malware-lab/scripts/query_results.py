@@ -0,0 +1,93 @@
+# ---------------------------------------------------------------------------
+# scripts/query_results.py  –  Query the SQLite results database
+# ---------------------------------------------------------------------------
+"""Command‑line utility that answers corpus‑wide questions from the results DB.
+
+Usage (from repo root) ::
+
+    python -m scripts.query_results reports/results.db --api DexClassLoader --perm SEND_SMS
+    python -m scripts.query_results reports/results.db --family XLOADER --string bank
+    python -m scripts.query_results reports/results.db --show <sha256>
+    python -m scripts.query_results reports/results.db --failed
+
+All criteria must match (logical AND).  The database is filled by the family
+scanners (``--db``) and by Lab 5's ``analyse_apk.py --db``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from scripts.common.results_store import ResultsStore
+
+
+def _cli(argv: List[str] | None = None) -> None:
+    """Parse CLI args and run the query."""
+
+    parser = argparse.ArgumentParser(
+        prog="query_results",
+        description="Query scan results stored in the SQLite results database.",
+    )
+    parser.add_argument("db", type=Path, help="Path to the results database")
+    parser.add_argument("--perm", action="append", default=[], help="Requested permission (repeatable)")
+    parser.add_argument("--api", action="append", default=[], help="API hit (repeatable)")
+    parser.add_argument("--string", action="append", default=[], help="String hit (repeatable)")
+    parser.add_argument("--family", action="append", default=[], help="Detected family (repeatable)")
+    parser.add_argument(
+        "--any-verdict",
+        action="store_true",
+        help="With --family, also list samples scanned for the family but not flagged",
+    )
+    parser.add_argument(
+        "--contains",
+        action="store_true",
+        help="Match --api/--string as substrings (slower, cannot use the indexes)",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of rows to print")
+    parser.add_argument("--show", metavar="SHA256", help="Print all evidence recorded for one sample")
+    parser.add_argument("--failed", action="store_true",
+                        help="List samples whose last analysis errored, timed out or crashed")
+
+    args = parser.parse_args(argv)
+
+    if not args.db.is_file():
+        print(f"[!] Error: database not found: {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    with ResultsStore(args.db) as store:
+        if args.show:
+            for table, values in store.evidence(args.show).items():
+                print(f"{table}: {', '.join(values) if values else '-'}")
+            return
+        if args.failed:
+            for sha256, sample, source, status, error in store.failures():
+                print(f"{sha256}  {sample}  {source}  {status}  {error or '-'}")
+            return
+
+        start = time.perf_counter()
+        rows = store.query(
+            permissions=args.perm,
+            apis=args.api,
+            strings=args.string,
+            families=args.family,
+            detected_only=not args.any_verdict,
+            contains=args.contains,
+            limit=args.limit,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for sha256, sample, package_name in rows:
+        print(f"{sha256}  {sample}  {package_name or '-'}")
+    print(f"[+] {len(rows)} sample(s) matched in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# When executed directly
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,254 @@
+# ---------------------------------------------------------------------------
+# scripts/scan.py  –  Registry-driven scanner for every known malware family
+# ---------------------------------------------------------------------------
+"""Command‑line utility that checks APKs against all registered families at once.
+
+Usage (from repo root) ::
+
+    python -m scripts.scan PATH/TO/*.apk [--family XLOADER --family ZNIU] [--json-dir DIR] [--call-sites]
+
+Each APK is loaded once – with the cheapest :func:`scripts.common.load_apk`
+mode that the selected rules need – and its :class:`ApkFeatures` are handed to
+every family of :mod:`scripts.common.registry` (rule, then evidence hooks).
+The built‑in rules match on the Dex tables; ``--call-sites`` switches them to
+their call‑site variants, whose API category only counts APIs the app really
+calls – this builds Androguard's cross references (slow).
+``scan_zniu`` & co. are aliases of this runtime restricted to one family.
+
+The module can also be imported programmatically::
+
+    from scripts.scan import scan_file
+    for result in scan_file(Path("sample.apk"), ["ROOTSTV", "SLOCKER"]):
+        print(result.rule.name, result.detected, result.evidence)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from scripts.common import (
+    FAMILIES,
+    ApkFeatures,
+    Family,
+    FamilyRule,
+    ResultsStore,
+    SampleAborted,
+    SampleOutcome,
+    add_limit_arguments,
+    compute_sha256,
+    detect,
+    get_families,
+    limits_from_args,
+    load_features,
+    load_mode,
+    run_limited,
+    write_compact,
+)
+
+# ---------------------------------------------------------------------------
+# Data container
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ScanResult:
+    """Lightweight container returned by :func:`scan_file`, one per family."""
+
+    apk_path: Path
+    detected: bool
+    evidence: Dict[str, Any]
+    rule: FamilyRule
+    sha256: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sample": self.apk_path.name,
+            "family": self.rule.name,
+            "detected": self.detected,
+            "evidence": self.evidence,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------------
+# Core logic
+# ---------------------------------------------------------------------------
+
+
+def _rule(family: Family, call_sites: bool) -> FamilyRule:
+    return family.rule.with_call_sites() if call_sites else family.rule
+
+
+def scan_features(apk_path: Path, features: ApkFeatures, families: Iterable[Family],
+                  call_sites: bool = False) -> List[ScanResult]:
+    """Run each family's rule and evidence hooks on already loaded *features*."""
+    results = []
+    for family in families:
+        rule = _rule(family, call_sites)
+        detected, evidence = detect(str(apk_path), features, rule)
+        for hook in family.hooks:
+            detected = bool(hook(features, evidence)) or detected
+        results.append(ScanResult(apk_path, detected, evidence, rule, features.sha256))
+    return results
+
+
+def scan_file(apk_path: Path, families: Iterable[str] | None = None,
+              cache_dir: Path | None = None, call_sites: bool = False) -> List[ScanResult]:
+    """Analyse *apk_path* once and return a :class:`ScanResult` per family.
+
+    *families* selects registered families by name (default: all).  With
+    *cache_dir*, the trimmed features are loaded from (or stored in) the
+    per‑SHA‑256 feature cache instead of re‑running Androguard.  With
+    *call_sites*, a rule's API category is only satisfied by real call sites
+    of its ``call_site_apis`` (name matches are kept as evidence), which
+    needs the (slow) ``"full"`` load mode.
+    """
+    selected = get_families(families)
+    if not apk_path.is_file():
+        raise FileNotFoundError(apk_path)
+
+    features = load_features(apk_path, cache_dir, mode=load_mode(*(_rule(f, call_sites) for f in selected)))
+    return scan_features(apk_path, features, selected, call_sites)
+
+
+# ---------------------------------------------------------------------------
+# CLI entry‑point
+# ---------------------------------------------------------------------------
+
+
+def _save(data: Dict[str, Any], json_dir: Path, stem: str, compact: bool) -> Path:
+    report_stem = f"{stem}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+    if compact:
+        return write_compact(json_dir, report_stem, data)
+    report_path = json_dir / f"{report_stem}.json"
+    report_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    return report_path
+
+
+def _write_report(result: ScanResult, json_dir: Path, compact: bool) -> Path:
+    return _save(result.to_dict(), json_dir, f"{result.apk_path.stem}_{result.rule.name.lower()}", compact)
+
+
+def _write_failure(outcome: SampleOutcome, apk_path: Path, families: List[str], json_dir: Path,
+                   compact: bool) -> Path:
+    """Write the report of a sample whose scan did not finish (``status`` tells why)."""
+    data = {**outcome.to_dict(), "families": families}
+    return _save(data, json_dir, f"{apk_path.stem}_{outcome.status}", compact)
+
+
+def _sha256_of(apk_path: Path) -> str | None:
+    try:
+        return compute_sha256(apk_path)
+    except OSError:  # e.g. a missing file: nothing to key the database row by
+        return None
+
+
+def _cli(argv: List[str] | None = None, families: List[str] | None = None, prog: str = "scan") -> None:
+    """Parse CLI args and scan every APK; *families* fixes the families of an alias."""
+
+    if families is None:
+        description = "Static detector for all registered Android malware families."
+    else:
+        description = get_families(families)[0].description
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument("apk", type=Path, nargs="+", help="Path to the target .apk file(s)")
+    if families is None:
+        parser.add_argument(
+            "--family",
+            action="append",
+            type=str.upper,
+            choices=list(FAMILIES),
+            help="Only check this family (repeatable; default: all registered families)",
+        )
+    parser.add_argument(
+        "--json-dir",
+        type=Path,
+        default=Path("reports/json"),
+        help="Directory where JSON reports will be written (created if absent)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write compressed compact reports (orjson/zstd when installed)",
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="Also record the results in this SQLite results database",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="Feature cache directory: reuse the Androguard results of samples seen before",
+    )
+    parser.add_argument(
+        "--call-sites",
+        action="store_true",
+        help="Count the API indicators only for key APIs the app really calls, not for name matches "
+             "(builds cross references; several times slower)",
+    )
+    add_limit_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if families is None:
+        families = args.family
+    limits = limits_from_args(args)
+    family_names = [f.name for f in get_families(families)]
+
+    json_dir: Path = args.json_dir
+    json_dir.mkdir(parents=True, exist_ok=True)
+    store = ResultsStore(args.db) if args.db is not None else None
+    failures = 0
+    try:
+        for apk_path in args.apk:
+            outcome = run_limited(scan_file, apk_path, limits, families=families, cache_dir=args.cache,
+                                  call_sites=args.call_sites)
+            if not outcome.ok:  # report and keep going with the remaining APKs
+                print(f"[!] Error: {apk_path}: {SampleAborted(outcome)}", file=sys.stderr)
+                print(f"[+] Failure report saved to => "
+                      f"{_write_failure(outcome, apk_path, family_names, json_dir, args.compact)}")
+                sha256 = _sha256_of(apk_path)
+                if store is not None and sha256 is not None:
+                    store.add_outcome(sha256, outcome)
+                failures += 1
+                continue
+
+            for result in outcome.result:
+                # ------------------------------------------------------
+                # Emit human‑readable verdict and write the JSON report
+                # ------------------------------------------------------
+                tick = "✅" if result.detected else "❌"
+                print(f"{tick} {result.rule.name} detection – {apk_path.name} – evidence = {len(result.evidence)}")
+                print(f"[+] JSON report saved to => {_write_report(result, json_dir, args.compact)}")
+                if store is not None:
+                    store.add_scan_result(result.sha256 or compute_sha256(apk_path), result)
+            if store is not None and outcome.result:
+                store.add_outcome(outcome.result[0].sha256 or compute_sha256(apk_path), outcome)
+    except KeyboardInterrupt:
+        print("[!] Aborted by user", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if store is not None:
+            store.close()
+            print(f"[+] Results recorded in => {args.db}")
+
+    if failures:
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# When executed directly
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    _cli()
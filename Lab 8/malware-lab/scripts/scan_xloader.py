@@ -1,123 +1,42 @@
 # ---------------------------------------------------------------------------
 # scripts/scan_xloader.py  –  Static scanner for the **XLOADER** malware family
 # ---------------------------------------------------------------------------
-"""Command-line utility that detects XLoader / MoqHao banker traits in an APK.
+"""Command‑line utility that detects XLoader / MoqHao banker traits in APKs.
 
 Usage (from repo root) ::
 
     python -m scripts.scan_xloader PATH/TO/app.apk [--json-dir DIR]
 
-The scanner performs static analysis only, using helpers in ``scripts.common``.
+Thin alias of :mod:`scripts.scan` restricted to the XLOADER family, whose rule
+lives in :mod:`scripts.common.indicators`.  The module can also be imported
+programmatically::
+
+    from scripts.scan_xloader import scan_file
+    result = scan_file(Path("sample.apk"))
+    print(result.detected, result.evidence)
 """
 
 from __future__ import annotations
 
-import argparse
-import json
-import sys
-from dataclasses import dataclass
-from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
-
-from scripts.common import RULES, FamilyRule, detect, load_apk
-
-# ---------------------------------------------------------------------------
-# Data container
-# ---------------------------------------------------------------------------
-
+from typing import List
 
-@dataclass
-class ScanResult:
-    """Lightweight container returned by :func:`scan_file`."""
-
-    apk_path: Path
-    detected: bool
-    evidence: Dict[str, Any]
-    rule: FamilyRule
-
-    def to_json(self) -> str:
-        return json.dumps(
-            {
-                "sample": self.apk_path.name,
-                "family": self.rule.name,
-                "detected": self.detected,
-                "evidence": self.evidence,
-            },
-            indent=2,
-            ensure_ascii=False,
-        )
-
-
-# ---------------------------------------------------------------------------
-# Core logic
-# ---------------------------------------------------------------------------
+from scripts import scan
+from scripts.common import RULES, FamilyRule
+from scripts.scan import ScanResult  # noqa: F401 – re-exported for callers of this module
 
 FAMILY_NAME = "XLOADER"
 RULE: FamilyRule = RULES[FAMILY_NAME]
 
 
-def scan_file(apk_path: Path) -> ScanResult:
-    """Analyse *apk_path* and return a :class:`ScanResult`."""
-
-    if not apk_path.is_file():
-        raise FileNotFoundError(apk_path)
-
-    a, d, dx = load_apk(apk_path)  # Androguard triple
-    detected, evidence = detect(str(apk_path), (a, d, dx), RULE)
-
-    return ScanResult(apk_path=apk_path, detected=detected, evidence=evidence, rule=RULE)
-
-
-# ---------------------------------------------------------------------------
-# CLI entry-point
-# ---------------------------------------------------------------------------
-
-
-def _cli(argv: list[str] | None = None) -> None:  # noqa: D401 – internal helper
-    """Parse CLI args and run the scan."""
-
-    parser = argparse.ArgumentParser(
-        prog="scan_xloader",
-        description="Static detector for the XLoader / MoqHao Android banker.",
-    )
-    parser.add_argument("apk", type=Path, help="Path to the target .apk file")
-    parser.add_argument(
-        "--json-dir",
-        type=Path,
-        default=Path("reports/json"),
-        help="Directory where JSON report will be written (created if absent)",
-    )
-
-    args = parser.parse_args(argv)
-
-    try:
-        result = scan_file(args.apk)
-    except KeyboardInterrupt:
-        print("[!] Aborted by user", file=sys.stderr)
-        sys.exit(130)
-    except Exception as exc:  # catch-all for CLI robustness
-        print(f"[!] Error: {exc}", file=sys.stderr)
-        sys.exit(1)
+def scan_file(apk_path: Path, cache_dir: Path | None = None, call_sites: bool = False) -> ScanResult:
+    """Analyse *apk_path* for XLOADER only; see :func:`scripts.scan.scan_file`."""
+    return scan.scan_file(apk_path, [FAMILY_NAME], cache_dir, call_sites)[0]
 
-    # ------------------------------------------------------------------
-    # Emit human-readable verdict
-    # ------------------------------------------------------------------
-    tick = "✅" if result.detected else "❌"
-    print(
-        f"{tick} {FAMILY_NAME} detection – "
-        f"{result.apk_path.name} – evidence = {len(result.evidence)}"
-    )
 
-    # ------------------------------------------------------------------
-    # Write JSON report
-    # ------------------------------------------------------------------
-    json_dir: Path = args.json_dir
-    json_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    report_path = json_dir / f"{result.apk_path.stem}_{FAMILY_NAME.lower()}_{timestamp}.json"
-    report_path.write_text(result.to_json(), encoding="utf-8")
-    print(f"[+] JSON report saved to => {report_path}")
+def _cli(argv: List[str] | None = None) -> None:
+    """Run the :mod:`scripts.scan` CLI for XLOADER only."""
+    scan._cli(argv, families=[FAMILY_NAME], prog="scan_xloader")
 
 
 # ---------------------------------------------------------------------------
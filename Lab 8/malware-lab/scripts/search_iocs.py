@@ -0,0 +1,129 @@
+# ---------------------------------------------------------------------------
+# scripts/search_iocs.py  –  Search / fill the IOC string index
+# ---------------------------------------------------------------------------
+"""Command‑line utility that searches every string ever extracted from a sample.
+
+Usage (from repo root) ::
+
+    python -m scripts.search_iocs reports/results.db evil-c2.example.com
+    python -m scripts.search_iocs reports/results.db 185.220. --kind ip
+    python -m scripts.search_iocs reports/results.db --add-apk samples/*.apk
+    python -m scripts.search_iocs reports/results.db --add-report ../../Lab5/Analyzer/analysis_reports/*.json
+
+``--add-apk`` indexes all Dex string literals of the given APKs; ``--add-report``
+indexes the ``interesting_strings`` of Lab 5 reports (which must carry a
+``sha256``).  Lab 5's ``analyse_apk.py --db`` fills the index automatically.
+An APK that cannot be loaded is reported as a JSON outcome on stderr and its
+status recorded in the database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from scripts.common import (
+    ResourceLimits,
+    StringIndex,
+    add_limit_arguments,
+    compute_sha256,
+    limits_from_args,
+    load_features,
+    read_report,
+    run_limited,
+)
+from scripts.common.results_store import record_outcome
+
+SOURCE = "search_iocs"  # sample_status source of this tool
+
+
+def _add_apks(index: StringIndex, paths: List[Path], cache_dir: Path | None = None,
+              limits: ResourceLimits | None = None) -> None:
+    for path in paths:
+        outcome = run_limited(load_features, path, limits, cache_dir=cache_dir)
+        if not outcome.ok:  # report and keep indexing the remaining samples
+            print(json.dumps(outcome.to_dict()), file=sys.stderr)
+            if path.is_file():
+                record_outcome(index.conn, compute_sha256(path), outcome, SOURCE)
+            continue
+        features = outcome.result
+        count = index.add_strings(features.sha256, path.name, features.strings,
+                                  package_name=features.package or None)
+        record_outcome(index.conn, features.sha256, outcome, SOURCE)
+        print(f"[+] {path.name}: {count} string(s) indexed")
+
+
+def _add_reports(index: StringIndex, paths: List[Path]) -> None:
+    for path in paths:
+        try:
+            report = read_report(path)
+        except Exception as exc:
+            print(f"[!] {path}: {exc}", file=sys.stderr)
+            continue
+        strings = report.get("interesting_strings")
+        if not report.get("sha256") or not isinstance(strings, list):
+            print(f"[!] {path}: not a Lab 5 report with sha256 and interesting_strings", file=sys.stderr)
+            continue
+        manifest = report.get("manifest_info")
+        package_name = manifest.get("package_name") if isinstance(manifest, dict) else None
+        count = index.add_strings(report["sha256"], report.get("apk_file", path.name), strings,
+                                  package_name=package_name)
+        print(f"[+] {path.name}: {count} string(s) indexed")
+
+
+def _cli(argv: List[str] | None = None) -> None:
+    """Parse CLI args and search (or fill) the index."""
+
+    parser = argparse.ArgumentParser(
+        prog="search_iocs",
+        description="Substring search over all strings, URLs and IPs of the analysed corpus.",
+    )
+    parser.add_argument("db", type=Path, help="Path to the results database")
+    parser.add_argument("query", nargs="?", help="Substring to look for (case-insensitive)")
+    parser.add_argument("--kind", choices=("url", "ip", "string"), help="Only report this kind of string")
+    parser.add_argument("--exact", action="store_true", help="Match the whole string, case-sensitively")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of hits to print")
+    parser.add_argument("--add-apk", type=Path, nargs="+", default=[], metavar="APK", help="Index these APKs")
+    parser.add_argument("--add-report", type=Path, nargs="+", default=[], metavar="REPORT",
+                        help="Index the strings of these Lab 5 reports")
+    parser.add_argument("--stats", action="store_true", help="Print index size")
+    parser.add_argument("--cache", type=Path, default=None, metavar="DIR",
+                        help="Feature cache directory for --add-apk (see the scanners' --cache)")
+
+    add_limit_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    if args.query is None and not (args.add_apk or args.add_report or args.stats):
+        parser.error("nothing to do: give a query, --add-apk, --add-report or --stats")
+
+    with StringIndex(args.db) as index:
+        _add_apks(index, args.add_apk, args.cache, limits_from_args(args))
+        _add_reports(index, args.add_report)
+
+        if args.stats:
+            for table, count in index.stats().items():
+                print(f"{table}: {count}")
+
+        if args.query is None:
+            return
+
+        start = time.perf_counter()
+        hits = index.search(args.query, kind=args.kind, exact=args.exact, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for value, kind, sha256, sample in hits:
+        print(f"{sha256}  {sample}  [{kind}]  {value}")
+    print(f"[+] {len(hits)} hit(s) in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# When executed directly
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,219 @@
+# ---------------------------------------------------------------------------
+# tests/test_andro_utils.py  – feature extraction and the per-SHA-256 cache
+# ---------------------------------------------------------------------------
+"""Tests for :class:`ApkFeatures`, :func:`load_features` and ``detect`` on
+cached features.  Androguard objects are replaced by tiny fakes.
+"""
+
+from __future__ import annotations
+
+import weakref
+from pathlib import Path
+
+import pytest
+
+from scripts.common import andro_utils
+from scripts.common import (
+    RULES,
+    ApkFeatures,
+    FamilyRule,
+    detect,
+    extract_apk_features,
+    load_features,
+    load_mode,
+    release_memory,
+)
+
+
+class FakeMethod:
+    def __init__(self, cls: str, name: str, external: bool = False, callers=()):
+        self.class_name, self.name, self.external = cls, name, external
+        self.callers = callers
+
+    def is_external(self):
+        return self.external
+
+    def get_method(self):
+        return self
+
+    def get_class_name(self):
+        return self.class_name
+
+    def get_name(self):
+        return self.name
+
+    def get_xref_from(self):
+        return {(None, caller, 0) for caller in self.callers}
+
+
+class FakeAPK:
+    def get_package(self):
+        return "com.example.bank"
+
+    def get_permissions(self):
+        return ["SEND_SMS", "READ_SMS", "INTERNET"]
+
+    def get_files(self):
+        return ["classes.dex", "lib/arm64-v8a/libjni_zniu.so", "res/raw/a.png"]
+
+
+class FakeDex:
+    def __init__(self, strings, methods=()):
+        self.strings = strings
+        self.methods = [FakeMethod(cls, name) for cls, name in methods]
+
+    def get_strings(self):
+        return self.strings
+
+    def get_classes(self):
+        return [self]  # one class holding all defined methods
+
+    def get_methods(self):
+        return self.methods
+
+
+class FakeAnalysis:
+    def get_methods(self):
+        run = FakeMethod("Lcom/example/SmsManager.sendTextMessage;", "run")
+        return [
+            run,
+            FakeMethod("Landroid/telephony/SmsManager;", "sendTextMessage", external=True, callers=[run]),
+            FakeMethod("Landroid/telephony/SmsManager;", "getDefault", external=True),
+        ]
+
+
+@pytest.fixture()
+def triple():
+    dexes = [FakeDex(["Bank login"], [("Lcom/example/SmsManager.sendTextMessage;", "run")]), FakeDex(["your account"])]
+    return FakeAPK(), dexes, FakeAnalysis()
+
+
+def test_extract_apk_features(triple) -> None:
+    features = extract_apk_features(triple, sha256="ab" * 32)
+    assert features.package == "com.example.bank"
+    assert features.permissions == ["INTERNET", "READ_SMS", "SEND_SMS"]
+    assert features.methods == ["Lcom/example/SmsManager.sendTextMessage;->run"]
+    assert features.strings == ["Bank login", "your account"]
+    assert features.natives == ["lib/arm64-v8a/libjni_zniu.so"]
+    assert features.mode == "full"
+    assert features.calls == {
+        "Landroid/telephony/SmsManager;->sendTextMessage": ["Lcom/example/SmsManager.sendTextMessage;->run"]
+    }
+    assert ApkFeatures.from_dict(features.to_dict()) == features
+
+
+def test_features_without_xrefs(triple) -> None:
+    """The "dex" mode reads the same internal methods from the Dex method tables."""
+    a, d, dx = triple
+    dex_only = extract_apk_features((a, d, None))
+    assert dex_only.mode == "dex"
+    assert dex_only.methods == extract_apk_features(triple).methods
+    assert dex_only.calls == {}
+    apk_only = extract_apk_features((a, [], None))
+    assert apk_only.mode == "apk" and apk_only.methods == apk_only.strings == []
+    assert apk_only.permissions == dex_only.permissions
+
+
+def test_overloads_are_stored_once() -> None:
+    dex = FakeDex([], [("La;", "run"), ("La;", "run"), ("Lb;", "run")])
+    assert extract_apk_features((FakeAPK(), [dex], None)).methods == ["La;->run", "Lb;->run"]
+
+
+def test_load_features_releases_androguard_objects(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The triple is dropped right after extraction and its cycles collected."""
+    apk = tmp_path / "sample.apk"
+    apk.write_bytes(b"PK\x03\x04")
+    refs, released = [], []
+
+    def fake_load_apk(path, mode):
+        a = FakeAPK()
+        a.self = a  # a reference cycle, like Androguard's objects
+        refs.append(weakref.ref(a))
+        return a, [FakeDex(["Bank login"])], None
+
+    monkeypatch.setattr(andro_utils, "load_apk", fake_load_apk)
+    monkeypatch.setattr(andro_utils, "release_memory", lambda: release_memory() and released.append(refs[-1]()))
+
+    assert load_features(apk).package == "com.example.bank"
+    assert released == [None]  # nothing but the collector held on to the triple
+
+    load_features(apk, release=False)
+    assert len(released) == 1
+
+
+def test_load_mode() -> None:
+    assert load_mode(FamilyRule("P", needs_perm={"SEND_SMS"}, native_contains=["libx.so"])) == "apk"
+    assert load_mode(FamilyRule("S", api_contains=["Cipher.doFinal"], string_contains=["bitcoin"])) == "dex"
+    assert load_mode(FamilyRule("X", needs_xrefs=True)) == "full"
+    assert load_mode(*RULES.values()) == "dex"  # built-in rules stay on the Dex tables...
+    assert load_mode(RULES["XLOADER"].with_call_sites()) == "full"  # ...unless call sites are asked for
+    assert RULES["XLOADER"].with_call_sites().api_calls == RULES["XLOADER"].call_site_apis
+    assert RULES["XLOADER"].call_site_apis and not RULES["XLOADER"].api_calls
+
+
+def test_detect_call_sites(triple) -> None:
+    rule = FamilyRule(
+        "SMS",
+        api_calls=["Landroid/telephony/SmsManager;->sendTextMessage", "Ljava/lang/Runtime;->exec"],
+    )
+    detected, evidence = detect("x.apk", triple, rule)
+    assert detected is True
+    assert evidence["apis"] == ["Landroid/telephony/SmsManager;->sendTextMessage"]
+    assert evidence["call_sites"] == [
+        "Lcom/example/SmsManager.sendTextMessage;->run -> Landroid/telephony/SmsManager;->sendTextMessage"
+    ]
+
+    # Without xrefs there are no call sites to match
+    a, d, _ = triple
+    with pytest.raises(ValueError, match="'full' load mode"):
+        detect("x.apk", (a, d, None), rule)
+
+
+def test_call_sites_replace_name_matches(triple) -> None:
+    """A method merely named like the API does not satisfy a call-site rule."""
+    names = FamilyRule("RUN", api_contains=["SmsManager.sendTextMessage"])
+    assert detect("x.apk", triple, names)[0] is True  # the internal ...SmsManager.sendTextMessage;->run
+
+    calls = FamilyRule("RUN", api_contains=["SmsManager.sendTextMessage"], api_calls=["Ljava/lang/Runtime;->exec"])
+    detected, evidence = detect("x.apk", triple, calls)
+    assert detected is False
+    assert evidence["apis"] == ["SmsManager.sendTextMessage"] and evidence["call_sites"] == []
+
+
+@pytest.mark.parametrize("family", list(RULES))
+def test_detect_same_on_features(triple, family) -> None:
+    assert detect("x.apk", extract_apk_features(triple), RULES[family]) == detect("x.apk", triple, RULES[family])
+    rule = RULES[family].with_call_sites()
+    assert detect("x.apk", extract_apk_features(triple), rule) == detect("x.apk", triple, rule)
+
+
+def test_load_features_uses_cache(tmp_path: Path, triple, monkeypatch: pytest.MonkeyPatch) -> None:
+    apk = tmp_path / "sample.apk"
+    apk.write_bytes(b"PK\x03\x04")
+    calls = []
+    monkeypatch.setattr(andro_utils, "load_apk", lambda p, mode: calls.append(mode) or triple)
+
+    first = load_features(apk, tmp_path / "cache")
+    second = load_features(apk, tmp_path / "cache")
+    assert len(calls) == 1
+    assert second == first and second.sha256 == andro_utils.compute_sha256(apk)
+
+    # Unreadable or outdated entries are ignored and rewritten
+    path = next((tmp_path / "cache").glob("*.features.json.gz"))
+    path.write_bytes(b"garbage")
+    assert load_features(apk, tmp_path / "cache") == first
+    assert len(calls) == 2
+
+    # Without a cache directory nothing is stored
+    load_features(apk)
+    assert len(calls) == 3
+
+    # Features from a cheaper mode are not reused for a richer one
+    a, d, dx = triple
+    monkeypatch.setattr(andro_utils, "load_apk", lambda p, mode: calls.append(mode) or (a, [], None))
+    other = tmp_path / "other.apk"
+    other.write_bytes(b"PK\x05\x06")
+    assert load_features(other, tmp_path / "cache", mode="apk").mode == "apk"
+    load_features(other, tmp_path / "cache", mode="apk")
+    load_features(other, tmp_path / "cache", mode="dex")
+    assert calls[3:] == ["apk", "dex"]
@@ -0,0 +1,65 @@
+# ---------------------------------------------------------------------------
+# tests/test_report.py  – round-trip tests for the compact report format
+# ---------------------------------------------------------------------------
+"""The compact writer must produce smaller files that load back unchanged,
+with or without the optional *orjson* / *zstandard* packages installed.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from scripts.common import read_report, to_pretty_json, write_compact
+from scripts.common import report_codec
+
+SAMPLE = {
+    "sample": "xloader.apk",
+    "family": "XLOADER",
+    "detected": True,
+    "evidence": {
+        "permissions": ["RECEIVE_SMS"],
+        "apis": ["AccessibilityService"],
+        "natives": [],
+        "strings": ["login"] * 500,
+    },
+}
+
+
+def test_compact_round_trip(tmp_path: Path) -> None:
+    path = write_compact(tmp_path, "xloader_report", SAMPLE)
+    assert path.name.startswith("xloader_report.json.")
+    assert read_report(path) == SAMPLE
+    assert path.stat().st_size < len(json.dumps(SAMPLE, indent=2))
+
+
+@pytest.mark.parametrize("missing", ["orjson", "zstandard"])
+def test_compact_without_optional_deps(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, missing: str) -> None:
+    monkeypatch.setattr(report_codec, missing, None)
+    path = write_compact(tmp_path, "xloader_report", SAMPLE)
+    assert read_report(path) == SAMPLE
+
+
+@pytest.mark.parametrize("missing", [None, "orjson"])
+def test_compact_writes_paths_and_datetimes_as_strings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+                                                       missing: str | None) -> None:
+    if missing:
+        monkeypatch.setattr(report_codec, missing, None)
+    when = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    path = write_compact(tmp_path, "xloader_report", dict(SAMPLE, apk=tmp_path / "x.apk", analysed_at=when))
+    assert read_report(path) == dict(SAMPLE, apk=str(tmp_path / "x.apk"), analysed_at=when.isoformat())
+
+
+def test_pretty_json_from_compact(tmp_path: Path) -> None:
+    path = write_compact(tmp_path, "xloader_report", SAMPLE)
+    assert json.loads(to_pretty_json(path)) == SAMPLE
+    assert to_pretty_json(path).startswith("{\n  ")
+
+
+def test_read_existing_plain_report() -> None:
+    reports = sorted((Path(__file__).resolve().parent.parent / "reports" / "json").glob("*.json"))
+    assert reports, "bundled example reports are missing"
+    assert "family" in read_report(reports[0])
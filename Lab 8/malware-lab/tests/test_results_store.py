@@ -0,0 +1,134 @@
+# ---------------------------------------------------------------------------
+# tests/test_results_store.py  – SQLite results database
+# ---------------------------------------------------------------------------
+"""Checks batching, corpus queries and index usage of :class:`ResultsStore`."""
+
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from scripts.common import RULES, ResultsStore, SampleOutcome
+from scripts.common import results_db
+from scripts.query_results import _cli as query_cli
+from scripts.scan_xloader import ScanResult
+
+
+@pytest.fixture()
+def store(tmp_path: Path):
+    with ResultsStore(tmp_path / "results.db", batch_size=2) as db:
+        db.add_sample("a" * 64, "dropper.apk", package_name="com.drop",
+                      permissions=["android.permission.SEND_SMS"], apis=["DexClassLoader"])
+        db.add_sample("b" * 64, "clean.apk", permissions=["INTERNET"], apis=["Class.forName"])
+        db.add_sample("c" * 64, "banker.apk", permissions=["SEND_SMS", "READ_SMS"],
+                      apis=["DexClassLoader"], strings=["bank", "login"])
+        yield db
+
+
+def test_wal_mode(store: ResultsStore) -> None:
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_query_all_criteria(store: ResultsStore) -> None:
+    rows = store.query(apis=["DexClassLoader"], permissions=["SEND_SMS"])
+    assert [r[1] for r in rows] == ["banker.apk", "dropper.apk"]
+    assert [r[1] for r in store.query(apis=["DexClassLoader"], strings=["bank"])] == ["banker.apk"]
+    assert store.query(permissions=["android.permission.READ_SMS"], apis=["Class.forName"]) == []
+
+
+def test_substring_match(store: ResultsStore) -> None:
+    assert store.query(apis=["ClassLoader"]) == []
+    assert len(store.query(apis=["ClassLoader"], contains=True)) == 2
+
+
+def test_scan_result_and_family_query(store: ResultsStore, tmp_path: Path) -> None:
+    result = ScanResult(
+        apk_path=tmp_path / "banker.apk",
+        detected=True,
+        evidence={"permissions": ["SEND_SMS"], "apis": ["AccessibilityService"], "natives": [], "strings": ["login"]},
+        rule=RULES["XLOADER"],
+    )
+    store.add_scan_result("c" * 64, result)
+    assert [r[1] for r in store.query(families=["xloader"], apis=["AccessibilityService"])] == ["banker.apk"]
+    assert store.query(families=["ZNIU"]) == []
+    assert store.evidence("c" * 64)["families"] == ["XLOADER"]
+    assert "AccessibilityService" in store.evidence("c" * 64)["api_hits"]
+
+
+def test_lookups_use_indexes(store: ResultsStore) -> None:
+    plan = " ".join(
+        str(row) for row in store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT sha256 FROM permissions WHERE permission = ?", ("SEND_SMS",)
+        )
+    )
+    assert "idx_permissions_permission" in plan
+
+
+def test_query_cli(store: ResultsStore, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    store.flush()
+    query_cli([str(tmp_path / "results.db"), "--api", "DexClassLoader", "--perm", "SEND_SMS"])
+    out = capsys.readouterr().out
+    assert "banker.apk" in out and "dropper.apk" in out and "clean.apk" not in out
+
+
+def test_package_name_kept_across_tools(store: ResultsStore, tmp_path: Path) -> None:
+    result = ScanResult(apk_path=tmp_path / "dropper.apk", detected=False,
+                        evidence={}, rule=RULES["ROOTSTV"])
+    store.add_scan_result("a" * 64, result)
+    rows = store.query(families=["ROOTSTV"], detected_only=False)
+    assert rows == [("a" * 64, "dropper.apk", "com.drop")]
+
+
+def test_rescan_replaces_stale_evidence(store: ResultsStore, tmp_path: Path) -> None:
+    def scan(apis, family="XLOADER"):
+        return ScanResult(apk_path=tmp_path / "banker.apk", detected=bool(apis), rule=RULES[family],
+                          evidence={"permissions": [], "apis": apis, "natives": [], "strings": []})
+
+    store.add_scan_result("c" * 64, scan(["SmsManager.sendTextMessage"]))
+    store.add_scan_result("c" * 64, scan(["Runtime.exec"], "ZNIU"))
+    store.flush()
+    store.add_scan_result("c" * 64, scan(["AccessibilityService"]))  # after a rule change
+    assert store.query(apis=["SmsManager.sendTextMessage"]) == []
+    assert [r[1] for r in store.query(apis=["AccessibilityService"])] == ["banker.apk"]
+    assert [r[1] for r in store.query(apis=["Runtime.exec"])] == ["banker.apk"]  # ZNIU's rows are kept
+    # rows recorded by add_sample() without a family (the fixture) are another source
+    assert [r[1] for r in store.query(apis=["DexClassLoader"], strings=["bank"])] == ["banker.apk"]
+
+
+def test_failures_are_recorded(store: ResultsStore, capsys: pytest.CaptureFixture) -> None:
+    store.add_outcome("d" * 64, SampleOutcome("/samples/huge.apk", "timeout", error="exceeded the 600 s limit"))
+    store.add_outcome("a" * 64, SampleOutcome("dropper.apk", "ok"))
+    assert store.failures() == [("d" * 64, "huge.apk", "scan", "timeout", "exceeded the 600 s limit")]
+    assert store.failures(source="find_similar") == []
+
+    # A later successful run of the same tool clears the failure
+    store.add_outcome("d" * 64, SampleOutcome("/samples/huge.apk", "ok"))
+    assert store.failures() == []
+
+
+LAB5_STORE = Path(__file__).resolve().parents[3] / "Lab5" / "Analyzer" / "src" / "results_store.py"
+
+
+@pytest.mark.skipif(not LAB5_STORE.is_file(), reason="Lab 5 is not checked out next to Lab 8")
+def test_lab5_records_into_the_same_schema(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Lab 5 loads scripts/common/results_db.py; what it records is queryable here."""
+    monkeypatch.syspath_prepend(str(LAB5_STORE.parent))  # Lab 5's modules import each other from src/
+    spec = importlib.util.spec_from_file_location("lab5_results_store", LAB5_STORE)
+    lab5 = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(lab5)
+    assert lab5.RESULTS_DB_PATH == str(Path(results_db.__file__).resolve())
+
+    with lab5.ResultsStore(str(tmp_path / "results.db")) as lab5_store:
+        lab5_store.add_report({
+            "apk_file": "loader.apk",
+            "sha256": "e" * 64,
+            "manifest_info": {"package_name": "com.loader", "permissions": [{"name": "android.permission.SEND_SMS"}]},
+            "reflection_dynamic_loading": {"dynamic_loading": [{"type": "DexClassLoader"}]},
+            "interesting_strings": [],
+        })
+        lab5_store.add_failure("f" * 64, "broken.apk", "Unpacking failed")
+    with ResultsStore(tmp_path / "results.db") as store:
+        assert store.query(apis=["DexClassLoader"], permissions=["SEND_SMS"]) == [("e" * 64, "loader.apk", "com.loader")]
+        assert store.failures() == [("f" * 64, "broken.apk", "analyse_apk", "error", "Unpacking failed")]
@@ -1,21 +1,26 @@
 # ---------------------------------------------------------------------------
-# tests/test_scanners.py  – unit tests for all four family scanners
+# tests/test_scanners.py  – unit tests for the scanner runtime and its aliases
 # ---------------------------------------------------------------------------
-"""Pytest smoke‑tests that the *scan_file()* helper in each family scanner
-returns a valid *ScanResult* object and that monkey‑patching works.
+"""Pytest smoke‑tests that *scan_file()* of the runtime and of each family
+alias returns valid *ScanResult* objects and that monkey‑patching works.
 
-The tests deliberately patch *load_apk* and *detect* to avoid the heavy
-Androguard dependency and make the unit tests finish in milliseconds.
+The tests deliberately patch *load_features* and *detect* in
+:mod:`scripts.scan` to avoid the heavy Androguard dependency and make the unit
+tests finish in milliseconds.
 """
 
 from __future__ import annotations
 
 import importlib
+import json
 from pathlib import Path
-from typing import Tuple, Any, Dict
+from typing import Any, Dict, List, Tuple
 
 import pytest
 
+from scripts import scan
+from scripts.common import FAMILIES, RULES, ApkFeatures, FamilyRule, Family, ResultsStore, load_mode
+
 # ---------------------------------------------------------------------------
 # Helper fixtures
 # ---------------------------------------------------------------------------
@@ -30,6 +35,20 @@ def dummy_apk(tmp_path: Path) -> Path:
     return apk_path
 
 
+@pytest.fixture()
+def loads(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    """Patch load_features() in the runtime; record every call."""
+
+    calls: List[Dict[str, Any]] = []
+
+    def fake_load_features(p, cache_dir=None, mode="dex"):
+        calls.append({"path": p, "cache_dir": cache_dir, "mode": mode})
+        return ApkFeatures(sha256="ab" * 32, mode=mode, strings=["hello"])
+
+    monkeypatch.setattr(scan, "load_features", fake_load_features)
+    return calls
+
+
 # ---------------------------------------------------------------------------
 # Parameters: (module import path, family name expected)
 # ---------------------------------------------------------------------------
@@ -48,34 +67,115 @@ SCANNERS: Tuple[Tuple[str, str], ...] = (
 
 
 @pytest.mark.parametrize("module_path,family", SCANNERS)
-def test_scan_file_no_detection(monkeypatch: pytest.MonkeyPatch, dummy_apk: Path, module_path: str, family: str) -> None:
+def test_scan_file_no_detection(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path, module_path: str,
+                                family: str) -> None:
     """Verify scan_file() returns *detected=False* when detect() is patched.
 
     This keeps the test independent of real APK samples and Androguard.
     """
 
     module = importlib.import_module(module_path)
-
-    # Patch the heavyweight helpers with stubs.
-    monkeypatch.setattr(module, "load_apk", lambda p: ("APK", ["DEX"], "DX"))
-    monkeypatch.setattr(module, "detect", lambda sample, analysis, rule: (False, {}))
+    monkeypatch.setattr(scan, "detect", lambda sample, analysis, rule: (False, {}))
 
     result = module.scan_file(dummy_apk)
     assert result.detected is False
     assert result.rule.name == family
     assert result.apk_path == dummy_apk
+    assert result.sha256 == "ab" * 32
+    assert loads[0]["mode"] == load_mode(RULES[family]) and loads[0]["cache_dir"] is None
 
 
 @pytest.mark.parametrize("module_path,family", SCANNERS)
-def test_scan_file_positive(monkeypatch: pytest.MonkeyPatch, dummy_apk: Path, module_path: str, family: str) -> None:
+def test_scan_file_positive(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path, module_path: str,
+                            family: str) -> None:
     """Patch detect() to *True* to ensure ScanResult reflects detection."""
 
     module = importlib.import_module(module_path)
-
-    monkeypatch.setattr(module, "load_apk", lambda p: ("APK", ["DEX"], "DX"))
-    monkeypatch.setattr(module, "detect", lambda sample, analysis, rule: (True, {"dummy": ["hit"]}))
+    monkeypatch.setattr(scan, "detect", lambda sample, analysis, rule: (True, {"dummy": ["hit"]}))
 
     result = module.scan_file(dummy_apk)
     assert result.detected is True
     assert result.evidence["dummy"] == ["hit"]
     assert result.rule.name == family
+
+
+@pytest.mark.parametrize("module_path,family", SCANNERS)
+def test_scan_file_uses_feature_cache(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path, module_path: str,
+                                      family: str) -> None:
+    """*cache_dir* is handed on to load_features()."""
+
+    module = importlib.import_module(module_path)
+    monkeypatch.setattr(scan, "detect", lambda sample, analysis, rule: (True, {"cached": [analysis.sha256]}))
+
+    result = module.scan_file(dummy_apk, cache_dir=dummy_apk.parent / "cache")
+    assert loads[0]["cache_dir"] == dummy_apk.parent / "cache"
+    assert result.detected is True and result.rule.name == family
+
+
+def test_all_families_share_one_load(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path) -> None:
+    seen: List[Tuple[int, str]] = []
+    monkeypatch.setattr(scan, "detect", lambda sample, analysis, rule: seen.append((id(analysis), rule.name))
+                        or (rule.name == "SLOCKER", {}))
+
+    results = scan.scan_file(dummy_apk)
+    assert len(loads) == 1 and loads[0]["mode"] == load_mode(*RULES.values())
+    assert [r.rule.name for r in results] == list(FAMILIES)
+    assert len({analysis for analysis, _ in seen}) == 1
+    assert [r.rule.name for r in results if r.detected] == ["SLOCKER"]
+
+    # Call sites are opt-in: they need the full analysis
+    loads.clear()
+    results = scan.scan_file(dummy_apk, call_sites=True)
+    assert loads[0]["mode"] == "full" and all(r.rule.api_calls for r in results)
+
+    # A subset, by case-insensitive name, in the requested order
+    assert [r.rule.name for r in scan.scan_file(dummy_apk, ["xloader", "ZNIU"])] == ["XLOADER", "ZNIU"]
+    with pytest.raises(ValueError, match="unknown family"):
+        scan.scan_file(dummy_apk, ["NOPE"])
+
+
+def test_evidence_hooks(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path) -> None:
+    def hook(features: ApkFeatures, evidence: Dict[str, List[str]]) -> bool:
+        evidence["greetings"] = [s for s in features.strings if s.startswith("hello")]
+        return bool(evidence["greetings"])
+
+    monkeypatch.setitem(FAMILIES, "HELLO", Family(FamilyRule("HELLO", string_contains=["nothing"]), [hook]))
+    (result,) = scan.scan_file(dummy_apk, ["HELLO"])
+    assert result.detected is True
+    assert result.evidence["greetings"] == ["hello"] and result.evidence["strings"] == []
+
+
+def test_cli_scans_every_apk(monkeypatch: pytest.MonkeyPatch, loads, dummy_apk: Path, tmp_path: Path,
+                             capsys: pytest.CaptureFixture) -> None:
+    """A failing sample is reported and the batch carries on; exit status is 1."""
+
+    def fake_detect(sample, analysis, rule):
+        if "broken" in sample:
+            raise ValueError("corrupt dex")
+        return rule.name == "ROOTSTV", {}
+
+    monkeypatch.setattr(scan, "detect", fake_detect)
+    json_dir = tmp_path / "reports"
+    broken = tmp_path / "broken.apk"
+    broken.write_bytes(b"PK\x05\x06")
+
+    with pytest.raises(SystemExit) as exc:
+        scan._cli([str(tmp_path / "missing.apk"), str(broken), str(dummy_apk), "--family", "rootstv",
+                   "--family", "zniu", "--json-dir", str(json_dir), "--db", str(tmp_path / "results.db")])
+    assert exc.value.code == 1
+    out, err = capsys.readouterr()
+    assert "missing.apk" in err and "FileNotFoundError" in err
+    assert "✅ ROOTSTV detection – dummy.apk" in out and "❌ ZNIU detection – dummy.apk" in out
+
+    reports = {json.loads(p.read_text(encoding="utf-8"))["family"] for p in json_dir.glob("dummy_*.json")}
+    assert reports == {"ROOTSTV", "ZNIU"}
+    assert len(loads) == 2
+
+    # Failed samples get a report of their outcome too, and a status in the database
+    (failure,) = [json.loads(p.read_text(encoding="utf-8")) for p in json_dir.glob("broken_*.json")]
+    assert failure["status"] == "error" and failure["error"] == "ValueError: corrupt dex"
+    assert failure["families"] == ["ROOTSTV", "ZNIU"]
+    assert json.loads(next(json_dir.glob("missing_error_*.json")).read_text(encoding="utf-8"))["status"] == "error"
+    with ResultsStore(tmp_path / "results.db") as store:
+        assert [(f[1], f[3]) for f in store.failures()] == [("broken.apk", "error")]
+        assert store.conn.execute("SELECT COUNT(*) FROM sample_status WHERE status = 'ok'").fetchone()[0] == 1
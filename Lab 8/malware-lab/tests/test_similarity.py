@@ -0,0 +1,70 @@
+# ---------------------------------------------------------------------------
+# tests/test_similarity.py  – MinHash / LSH similarity index
+# ---------------------------------------------------------------------------
+"""Checks signature stability, similarity estimates and LSH lookups."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+import scripts.common.similarity as sim
+from scripts.common import ResultsStore
+from scripts.common.similarity import MinHasher, SimilarityIndex, candidate_family, estimate_similarity
+
+
+def family_features(family: str, variant: int, size: int = 400) -> set[str]:
+    """Feature set sharing ~90 % of its tokens with other variants of *family*."""
+    core = {f"api:L{family}/Core;->m{i}" for i in range(size)}
+    extra = {f"str:{family}-{variant}-{i}" for i in range(size // 20)}
+    return core | extra
+
+
+def test_numpy_and_python_paths_agree(monkeypatch: pytest.MonkeyPatch) -> None:
+    features = family_features("x", 0, 50)
+    hasher = MinHasher(num_perm=64)
+    expected = hasher.signature(features)
+    monkeypatch.setattr(sim, "np", None)
+    assert hasher.signature(features) == expected
+    assert MinHasher(num_perm=64).signature(features) == expected
+
+
+def test_similarity_estimate() -> None:
+    hasher = MinHasher(num_perm=256)
+    left = {f"t{i}" for i in range(1000)}
+    right = {f"t{i}" for i in range(500, 1500)}  # Jaccard = 1/3
+    assert estimate_similarity(hasher.signature(left), hasher.signature(right)) == pytest.approx(1 / 3, abs=0.08)
+    assert estimate_similarity(hasher.signature(left), hasher.signature(left)) == 1.0
+
+
+def test_nearest_returns_same_family(tmp_path: Path) -> None:
+    with SimilarityIndex(tmp_path / "results.db") as index:
+        for v in range(3):
+            index.add(f"x{v}".ljust(64, "0"), f"xloader{v}.apk", family_features("xloader", v), label="xloader")
+            index.add(f"s{v}".ljust(64, "0"), f"slocker{v}.apk", family_features("slocker", v), label="SLOCKER")
+        assert len(index) == 6
+
+        neighbours = index.nearest(family_features("xloader", 99), top=5)
+        assert sorted(n.sample for n in neighbours) == ["xloader0.apk", "xloader1.apk", "xloader2.apk"]
+        assert all(n.similarity > 0.7 for n in neighbours)
+        assert candidate_family(neighbours) == "XLOADER"
+
+        assert index.nearest(family_features("unrelated", 0)) == []
+
+
+def test_family_falls_back_to_scanner_verdicts(tmp_path: Path) -> None:
+    db = tmp_path / "results.db"
+    with ResultsStore(db) as store:
+        store.add_sample("a" * 64, "zniu.apk", family="ZNIU", detected=True)
+    with SimilarityIndex(db) as index:
+        index.add("a" * 64, "zniu.apk", family_features("zniu", 0))
+        index.add("b" * 64, "zniu-copy.apk", family_features("zniu", 0))
+        neighbours = index.nearest(family_features("zniu", 1), exclude="b" * 64)
+    assert [(n.sample, n.family) for n in neighbours] == [("zniu.apk", "ZNIU")]
+
+
+def test_parameters_are_persisted(tmp_path: Path) -> None:
+    SimilarityIndex(tmp_path / "results.db").close()
+    with pytest.raises(ValueError):
+        SimilarityIndex(tmp_path / "results.db", num_perm=64, bands=16)
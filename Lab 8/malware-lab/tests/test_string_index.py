@@ -0,0 +1,108 @@
+# ---------------------------------------------------------------------------
+# tests/test_string_index.py  – trigram IOC index
+# ---------------------------------------------------------------------------
+"""Checks indexing, substring search and kind filtering of :class:`StringIndex`."""
+
+from __future__ import annotations
+
+import base64
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from scripts import search_iocs
+from scripts.common import ResultsStore, StringIndex
+from scripts.common.results_db import classify, trigrams
+from scripts.search_iocs import _cli as search_cli
+
+
+@pytest.fixture()
+def index(tmp_path: Path):
+    with StringIndex(tmp_path / "results.db") as idx:
+        idx.add_strings("a" * 64, "dropper.apk", ["https://Evil-C2.example.com/gate.php", "Landroid/app/Activity;", "ok"])
+        idx.add_strings("b" * 64, "banker.apk", ["https://evil-c2.example.com/gate.php", "http://10.0.0.7:8080/"])
+        idx.add_strings("c" * 64, "clean.apk", ["https://www.google.com/", "bc1qxy2kgdygjrsqtzq2n0yrf2493p83kkfjhx0wlh"])
+        yield idx
+
+
+def test_classify_and_trigrams() -> None:
+    assert classify("http://10.0.0.7/") == "url"
+    assert classify("10.0.0.7") == "ip"
+    assert classify("v1.2.3.4.5") == "string"
+    assert trigrams("AbcD") == {"abc", "bcd"}
+
+
+def test_short_strings_are_not_indexed(index: StringIndex) -> None:
+    assert index.search("ok") == []
+    assert index.stats()["ioc_strings"] == 6
+
+
+def test_substring_search_is_case_insensitive(index: StringIndex) -> None:
+    hits = index.search("evil-c2.example")
+    assert sorted(hit[3] for hit in hits) == ["banker.apk", "dropper.apk"]
+    assert {hit[1] for hit in hits} == {"url"}
+    assert [hit[3] for hit in index.search("2KGDYGJ")] == ["clean.apk"]
+    assert index.search("evil-c3") == []
+
+
+def test_long_queries(index: StringIndex) -> None:
+    """Base64 blobs and certificates: far more trigrams than SQLite allows compound terms."""
+    blob = base64.b64encode(random.Random(7).randbytes(381)).decode()  # 508 chars, ~500 distinct trigrams
+    index.add_strings("d" * 64, "payload.apk", [blob])
+    assert [h[3] for h in index.search(blob[2:])] == ["payload.apk"]
+    assert index.search(blob[2:-1] + "#") == []  # grams left out of the sample are still verified
+    assert index.search(base64.b64encode(random.Random(8).randbytes(525)).decode()) == []  # 700 chars
+
+
+def test_exact_and_kind_filters(index: StringIndex) -> None:
+    assert [h[3] for h in index.search("https://evil-c2.example.com/gate.php", exact=True)] == ["banker.apk"]
+    assert index.search("10.0.0.7", kind="ip") == []
+    assert [h[3] for h in index.search("10.0.0.7", kind="url")] == ["banker.apk"]
+
+
+def test_known_strings_only_add_postings(index: StringIndex) -> None:
+    before = index.stats()
+    index.add_strings("d" * 64, "variant.apk", ["https://www.google.com/"])
+    after = index.stats()
+    assert after["ioc_trigrams"] == before["ioc_trigrams"]
+    assert after["ioc_postings"] == before["ioc_postings"] + 1
+
+
+def test_reindexing_replaces_postings(index: StringIndex) -> None:
+    index.add_strings("e" * 64, "s.apk", ["http://evil.example.com/x"])
+    assert [h[3] for h in index.search("evil.example")] == ["s.apk"]
+    index.add_strings("e" * 64, "s.apk", ["http://benign.example.org/y"])
+    assert index.search("evil.example") == []
+    assert [h[3] for h in index.search("benign.example")] == ["s.apk"]
+
+
+def test_cli_indexes_lab5_reports(tmp_path: Path, capsys) -> None:
+    report = tmp_path / "app_report.json"
+    report.write_text(json.dumps({
+        "apk_file": "app.apk",
+        "sha256": "e" * 64,
+        "manifest_info": {"package_name": "com.app"},
+        "interesting_strings": ["wss://panel.badhost.net/ws"],
+    }), encoding="utf-8")
+    db = tmp_path / "results.db"
+    search_cli([str(db), "--add-report", str(report)])
+    search_cli([str(db), "badhost"])
+    assert "app.apk  [url]  wss://panel.badhost.net/ws" in capsys.readouterr().out
+
+
+def test_cli_records_unloadable_apks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+                                     capsys: pytest.CaptureFixture) -> None:
+    def fake_load_features(path, cache_dir=None):
+        raise RuntimeError("Androguard could not parse the APK")
+
+    monkeypatch.setattr(search_iocs, "load_features", fake_load_features)
+    apk = tmp_path / "broken.apk"
+    apk.write_bytes(b"PK\x05\x06")
+    search_cli([str(tmp_path / "results.db"), "--add-apk", str(apk), "--stats"])
+
+    outcome = json.loads(capsys.readouterr().err.splitlines()[0])
+    assert outcome["sample"] == str(apk) and outcome["status"] == "error"
+    with ResultsStore(tmp_path / "results.db") as store:
+        assert [(f[1], f[2], f[3]) for f in store.failures()] == [("broken.apk", "search_iocs", "error")]
@@ -0,0 +1,94 @@
+# ---------------------------------------------------------------------------
+# tests/test_watchdog.py  – per-sample resource limits and the watchdog
+# ---------------------------------------------------------------------------
+"""Tests for :func:`run_limited`: each way a child can end becomes a status."""
+
+from __future__ import annotations
+
+import faulthandler
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts.common import ResourceLimits, SampleAborted, run_limited
+from scripts.common import watchdog
+
+posix_only = pytest.mark.skipif(watchdog.resource is None or sys.platform != "linux",
+                                reason="rlimits and signals need Linux")
+
+
+def _echo(path, **kwargs):
+    return {"path": str(path), "pid": os.getpid(), **kwargs}
+
+
+def _fail(path):
+    raise ValueError("not an APK")
+
+
+def _sleep(path):
+    time.sleep(30)
+
+
+def _spin(path):
+    while True:
+        pass
+
+
+def _allocate(path):
+    return len(bytearray(8 * 1024 ** 3))
+
+
+def _segfault(path):
+    faulthandler.disable()  # pytest's handler would dump the child's stack
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+
+def test_without_limits_runs_in_process(tmp_path: Path) -> None:
+    outcome = run_limited(_echo, tmp_path / "a.apk", None, cache_dir="c")
+    assert outcome.ok and outcome.result == {"path": str(tmp_path / "a.apk"), "pid": os.getpid(), "cache_dir": "c"}
+
+    failed = run_limited(_fail, tmp_path / "a.apk")
+    assert failed.status == "error" and failed.error == "ValueError: not an APK" and not failed.aborted
+    with pytest.raises(SampleAborted, match="not an APK"):
+        failed.unwrap()
+
+
+@posix_only
+def test_child_result_and_error(tmp_path: Path) -> None:
+    limits = ResourceLimits(wall_seconds=30)
+    outcome = run_limited(_echo, tmp_path / "a.apk", limits, cache_dir="c")
+    assert outcome.ok and outcome.result["cache_dir"] == "c"
+    assert outcome.result["pid"] != os.getpid()
+    assert run_limited(_fail, tmp_path / "a.apk", limits).to_dict()["status"] == "error"
+
+
+@posix_only
+def test_wall_clock_timeout(tmp_path: Path) -> None:
+    start = time.monotonic()
+    outcome = run_limited(_sleep, tmp_path / "slow.apk", ResourceLimits(wall_seconds=0.5))
+    assert time.monotonic() - start < 10
+    assert outcome.status == "timeout" and outcome.aborted
+    with pytest.raises(SampleAborted, match="timeout"):
+        outcome.unwrap()
+
+
+@posix_only
+def test_cpu_limit(tmp_path: Path) -> None:
+    outcome = run_limited(_spin, tmp_path / "loop.apk", ResourceLimits(wall_seconds=30, cpu_seconds=1))
+    assert outcome.status == "cpu_limit"
+
+
+@posix_only
+def test_memory_limit(tmp_path: Path) -> None:
+    outcome = run_limited(_allocate, tmp_path / "big.apk", ResourceLimits(wall_seconds=30, memory_mb=4096))
+    assert outcome.status == "oom"
+
+
+@posix_only
+def test_crash_is_reported(tmp_path: Path) -> None:
+    outcome = run_limited(_segfault, tmp_path / "bad.apk", ResourceLimits(wall_seconds=30))
+    assert outcome.status == "crashed" and str(-signal.SIGSEGV) in outcome.error
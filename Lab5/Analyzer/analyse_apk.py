@@ -1,9 +1,8 @@
 import os
 import sys
 import json
+import argparse
 import logging
-import shutil
-import tempfile
 from datetime import datetime
 
 # --- Get the Base Directory ---
@@ -21,12 +20,22 @@ if SRC_DIR not in sys.path:
 
 # --- Import your analysis functions (from 'src' directory) ---
 try:
-    from unpacker import unpack_apk, UnpackError
-    from manifest_parser import parse_manifest
+    from unpacker import (compute_sha256, SubprocessDecoder, UnpackError, ALL_DETECTORS, FULL,
+                          choose_decode_profile)
+    from manifest_parser import parse_manifest, parse_manifest_from_apk
     from androguard_hook import analyze_apk as analyze_with_androguard, is_androguard_available
     from native_detector import list_native_libs, analyze_native_function_usage
     from reflection_detector import detect_reflection
-    from strings_extractor import extract_strings
+    from strings_extractor import extract_strings, extract_strings_bounded, extract_apk_resource_strings
+    from smali_walker import PackageFilter, LIBRARY_PACKAGES
+    from report_sink import NDJSONReportSink, load_ndjson_report
+    from report_codec import write_compact_report
+    from results_store import ResultsStore
+    from patterns import load_pattern_config
+    from string_ranker import StringRanker, DEFAULT_TOP_K
+    from decompile_cache import DecompileCache, DEFAULT_CACHE_MB
+    from workspace import (WorkspaceManager, DEFAULT_QUOTA_MB, default_manager as default_workspace_manager,
+                           expected_tree_size, set_default_manager)
 except ImportError as e:
     print(f"Error importing analysis modules from '{SRC_DIR}': {e}")
     print("Ensure all required .py files are present in the 'src' directory and dependencies are installed.")
@@ -36,100 +45,231 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 os.makedirs(REPORTS_DIR, exist_ok=True) # Ensure reports directory exists
 
-# --- Main Analysis Function (No changes needed inside) ---
-def run_analysis(apk_path):
-    """Runs all analysis steps for a given APK."""
+# --- Main Analysis Function and its Stages (start_report, unpack_for_analysis, analyse_decompiled) ---
+def run_analysis(apk_path, package_filter=None, app_only=False, max_workers=None, sink=None,
+                 top_strings=DEFAULT_TOP_K, bounded_strings=None, detectors=ALL_DETECTORS,
+                 only_main_classes=False, cache=None):
+    """
+    Runs all analysis steps for a given APK.
+
+    package_filter limits which smali packages the detectors scan. With
+    app_only, the filter is further restricted to the manifest package name.
+    max_workers caps how many smali directories are scanned in parallel.
+    top_strings is how many strings per category the ranking stage keeps.
+    With bounded_strings (a maximum number of retained strings), string
+    extraction runs in bounded-memory mode and only keeps interesting ones.
+    detectors selects the analysis steps ("manifest", "native", "reflection",
+    "strings", "androguard"); apktool only decodes what they need (see
+    choose_decode_profile), and with only_main_classes it skips DEX files
+    outside the APK root. With a DecompileCache, a tree decoded before (same
+    APK, apktool version and profile) is restored instead of running apktool.
+
+    If a sink (e.g. NDJSONReportSink) is given, every section is streamed to
+    it as soon as its detector finishes and is not kept in the returned
+    report, which then only holds the header fields and any fatal error.
+
+    The two stages, unpack_for_analysis (apktool) and analyse_decompiled
+    (Python detectors), can also be run separately, e.g. overlapped across
+    many samples by batch_analyse.py.
+    """
     if not os.path.isfile(apk_path):
         logging.error(f"APK file not found: {apk_path}")
         return None
 
-    apk_filename = os.path.basename(apk_path)
-    report = {"apk_file": apk_filename, "analysis_timestamp": datetime.now().isoformat()}
+    report = start_report(apk_path, sink)
     decompile_dir = None
+    try:
+        # 1. Unpack APK using apktool (only what the enabled detectors need)
+        profile = choose_decode_profile(detectors, only_main_classes)
+        decompile_dir = unpack_for_analysis(apk_path, profile=profile, cache=cache, sha256=report["sha256"])
+        analyse_decompiled(apk_path, decompile_dir, report, package_filter=package_filter, app_only=app_only,
+                           max_workers=max_workers, sink=sink, top_strings=top_strings,
+                           bounded_strings=bounded_strings, detectors=detectors)
+    except UnpackError as e:
+        logging.error(f"Failed to unpack {report['apk_file']}: {e}")
+        report["error"] = f"Unpacking failed: {e}"
+    except Exception as e:
+        logging.exception(f"An unexpected error occurred during analysis for {report['apk_file']}") # Log stack trace
+        report["error"] = f"Unexpected analysis error: {e}"
+    finally:
+        cleanup_decompiled(decompile_dir)
 
+    if sink is not None and "error" in report:
+        sink.emit("error", report["error"])
+
+    return report
+
+def start_report(apk_path, sink=None):
+    """Create the report header (file name, timestamp, SHA-256) and write it to the sink, if any."""
+    report = {"apk_file": os.path.basename(apk_path), "analysis_timestamp": datetime.now().isoformat(),
+              "sha256": compute_sha256(apk_path)}
+    if sink is not None:
+        sink.write_header(report["apk_file"], report["analysis_timestamp"], sha256=report["sha256"])
+    return report
+
+def unpack_for_analysis(apk_path, profile=FULL, workspaces=None, cache=None, backend=None, sha256=None):
+    """
+    Stage 1: decode the APK with apktool (as much as the DecodeProfile asks
+    for) into a fresh directory from the WorkspaceManager (default: the
+    process-wide one, which prefers tmpfs). backend decodes (default: a
+    SubprocessDecoder, i.e. unpack_apk; ApktoolPool for warm JVMs). With a
+    DecompileCache, a tree cached under the apktool version the backend
+    would decode with is extracted instead, and a new decode is stored
+    under the version the backend reports for it (sha256, if already
+    computed, saves hashing the APK again).
+    Raises UnpackError on failure, including a decoded tree over the
+    workspace quota: the quota is watched during the decode, which is
+    stopped as soon as the tree outgrows it, and an APK expected to decode
+    to more than the quota is not placed on a RAM disk at all.
+    """
+    workspaces = workspaces or default_workspace_manager()
+    backend = backend or SubprocessDecoder()
+    apk_filename = os.path.basename(apk_path)
+    logging.info(f"Unpacking {apk_filename} (decode profile: {profile.name})...")
+    decompile_dir = workspaces.acquire(os.path.splitext(apk_filename)[0] + "_decompiled",
+                                       expected_bytes=expected_tree_size(apk_path))
+    use_cache = cache is not None and profile.runs_apktool
+    if use_cache:
+        sha256 = sha256 or compute_sha256(apk_path)
     try:
-        # 1. Unpack APK using apktool
-        logging.info(f"Unpacking {apk_filename}...")
-        temp_base = os.path.splitext(apk_filename)[0] + "_decompiled"
-        decompile_dir = os.path.join(tempfile.gettempdir(), temp_base + "_" + str(os.getpid()))
-        if os.path.exists(decompile_dir):
-             shutil.rmtree(decompile_dir)
-
-        unpack_apk(apk_path, out_dir=decompile_dir)
-        logging.info(f"APK decompiled to temporary directory: {decompile_dir}")
-
-        # 2. Parse Manifest (from decompiled dir)
-        logging.info("Parsing AndroidManifest.xml...")
+        if use_cache and cache.get(cache.key(apk_path, profile, backend.version, sha256), decompile_dir):
+            workspaces.check_quota(decompile_dir)
+            return decompile_dir
+        version = backend.decode(apk_path, decompile_dir, profile, watch=workspaces.quota_watch())
+        workspaces.check_quota(decompile_dir)
+        if use_cache:
+            cache.put(cache.key(apk_path, profile, version, sha256), decompile_dir)
+    except Exception:
+        cleanup_decompiled(decompile_dir, workspaces)
+        raise
+    logging.info(f"APK decompiled to temporary directory: {decompile_dir}")
+    return decompile_dir
+
+def cleanup_decompiled(decompile_dir, workspaces=None):
+    """Release a directory from unpack_for_analysis; it is deleted in the background (errors are logged)."""
+    if decompile_dir:
+        logging.info(f"Cleaning up temporary directory: {decompile_dir}")
         try:
-            manifest_data = parse_manifest(decompile_dir)
-            # Convert dataclasses/namedtuples to dicts for JSON serialization
-            report["manifest_info"] = manifest_data.__dict__
-            report["manifest_info"]["components"] = [comp.__dict__ for comp in manifest_data.components]
-            report["manifest_info"]["permissions"] = [perm.__dict__ for perm in manifest_data.permissions]
+            (workspaces or default_workspace_manager()).release(decompile_dir)
         except Exception as e:
-            logging.error(f"Manifest parsing failed: {e}")
-            report["manifest_info"] = {"error": str(e)}
+            logging.error(f"Failed to remove temporary directory {decompile_dir}: {e}")
+
+def analyse_decompiled(apk_path, decompile_dir, report=None, package_filter=None, app_only=False,
+                       max_workers=None, sink=None, top_strings=DEFAULT_TOP_K, bounded_strings=None,
+                       detectors=ALL_DETECTORS):
+    """
+    Stage 2: run the enabled detectors (steps 2-6 of run_analysis) on an unpacked APK.
+
+    report is the dict from start_report (created if None); sections are
+    added to it, or streamed to sink. Unexpected errors are stored in
+    report["error"] instead of being raised. Returns the report.
+    """
+    if report is None:
+        report = start_report(apk_path, sink)
+    apk_filename = report["apk_file"]
+
+    def record(section, data):
+        # Stream the section if a sink is attached, otherwise keep it in the report
+        if sink is not None:
+            sink.emit(section, data)
+        else:
+            report[section] = data
+
+    try:
+        # 2. Parse Manifest (binary AXML from the APK, decoded XML as fallback)
+        if "manifest" in detectors:
+            logging.info("Parsing AndroidManifest.xml...")
+            try:
+                try:
+                    manifest_data = parse_manifest_from_apk(apk_path)
+                except (FileNotFoundError, ValueError) as e:
+                    logging.warning(f"Binary manifest parsing failed ({e}), using the decoded manifest.")
+                    manifest_data = parse_manifest(decompile_dir)
+                # Convert dataclasses/namedtuples to dicts for JSON serialization
+                manifest_info = dict(manifest_data.__dict__)
+                manifest_info["components"] = [comp.__dict__ for comp in manifest_data.components]
+                manifest_info["permissions"] = [perm.__dict__ for perm in manifest_data.permissions]
+                record("manifest_info", manifest_info)
+                if app_only:
+                    package_filter = (package_filter or PackageFilter()).restrict_to(manifest_data.package_name)
+            except Exception as e:
+                logging.error(f"Manifest parsing failed: {e}")
+                record("manifest_info", {"error": str(e)})
+                if app_only:
+                    logging.warning("Package name unknown, scanning all packages.")
+
+        if package_filter is not None and not package_filter.is_empty:
+            logging.info(f"Restricting smali scan with package filter: {package_filter.to_dict()}")
+            record("package_filter", package_filter.to_dict())
 
         # 3. Detect Native Libs (from decompiled dir)
-        logging.info("Detecting native libraries...")
-        try:
-            native_libs = list_native_libs(decompile_dir)
-            report["native_libraries"] = [lib._asdict() for lib in native_libs] # Use _asdict() for NamedTuple
-            lib_usage = analyze_native_function_usage(decompile_dir)
-            report["native_library_usage"] = lib_usage
-        except Exception as e:
-            logging.error(f"Native library detection failed: {e}")
-            report["native_libraries"] = {"error": str(e)}
+        if "native" in detectors:
+            logging.info("Detecting native libraries...")
+            try:
+                native_libs = list_native_libs(decompile_dir)
+                record("native_libraries", [lib._asdict() for lib in native_libs]) # Use _asdict() for NamedTuple
+                lib_usage = analyze_native_function_usage(decompile_dir, package_filter, max_workers)
+                record("native_library_usage", lib_usage)
+            except Exception as e:
+                logging.error(f"Native library detection failed: {e}")
+                record("native_libraries", {"error": str(e)})
 
         # 4. Detect Reflection/Dynamic Loading (from decompiled dir)
-        logging.info("Detecting reflection and dynamic loading...")
-        try:
-            reflection_data = detect_reflection(decompile_dir)
-            report["reflection_dynamic_loading"] = reflection_data.__dict__
-        except Exception as e:
-            logging.error(f"Reflection detection failed: {e}")
-            report["reflection_dynamic_loading"] = {"error": str(e)}
-
-        # 5. Extract Strings (from decompiled dir)
-        logging.info("Extracting strings...")
-        try:
-            interesting_strings = extract_strings(decompile_dir)
-            report["interesting_strings"] = interesting_strings
-        except Exception as e:
-            logging.error(f"String extraction failed: {e}")
-            report["interesting_strings"] = {"error": str(e)}
+        if "reflection" in detectors:
+            logging.info("Detecting reflection and dynamic loading...")
+            try:
+                reflection_data = detect_reflection(decompile_dir, package_filter, max_workers)
+                record("reflection_dynamic_loading", reflection_data.__dict__)
+            except Exception as e:
+                logging.error(f"Reflection detection failed: {e}")
+                record("reflection_dynamic_loading", {"error": str(e)})
 
-        # 6. Analyze with Androguard (optional, on original APK)
-        if is_androguard_available():
-            logging.info("Analyzing with Androguard...")
+        # 5. Extract Strings (resources of every locale from resources.arsc, smali from decompiled dir)
+        if "strings" in detectors:
+            logging.info("Extracting strings...")
             try:
-                androguard_data = analyze_with_androguard(apk_path)
-                report["androguard_info"] = androguard_data.__dict__
+                resource_strings = extract_apk_resource_strings(apk_path)
+                all_resource_strings = None
+                if resource_strings is not None:
+                    record("resource_strings", resource_strings)
+                    all_resource_strings = set().union(*resource_strings.values())
+                # Bounded top-K per category (URLs, IPs, keys, high-entropy blobs, ...), fed during extraction
+                ranker = StringRanker(top_strings)
+                if bounded_strings:
+                    interesting_strings, string_stats = extract_strings_bounded(
+                        decompile_dir, package_filter, max_workers, max_retained=bounded_strings,
+                        resource_strings=all_resource_strings, ranker=ranker)
+                    record("string_statistics", string_stats)
+                else:
+                    interesting_strings = extract_strings(decompile_dir, package_filter, max_workers,
+                                                          resource_strings=all_resource_strings, ranker=ranker)
+                record("interesting_strings", interesting_strings)
+                record("ranked_strings", ranker.ranked())
             except Exception as e:
-                logging.error(f"Androguard analysis failed: {e}")
-                report["androguard_info"] = {"error": str(e)}
-        else:
-            logging.warning("Androguard not available, skipping Androguard analysis.")
-            report["androguard_info"] = {"status": "Skipped (Androguard not installed)"}
+                logging.error(f"String extraction failed: {e}")
+                record("interesting_strings", {"error": str(e)})
+
+        # 6. Analyze with Androguard (optional, on original APK)
+        if "androguard" in detectors:
+            if is_androguard_available():
+                logging.info("Analyzing with Androguard...")
+                try:
+                    androguard_data = analyze_with_androguard(apk_path)
+                    record("androguard_info", androguard_data.__dict__)
+                except Exception as e:
+                    logging.error(f"Androguard analysis failed: {e}")
+                    record("androguard_info", {"error": str(e)})
+            else:
+                logging.warning("Androguard not available, skipping Androguard analysis.")
+                record("androguard_info", {"status": "Skipped (Androguard not installed)"})
 
-    except UnpackError as e:
-        logging.error(f"Failed to unpack {apk_filename}: {e}")
-        report["error"] = f"Unpacking failed: {e}"
     except Exception as e:
         logging.exception(f"An unexpected error occurred during analysis for {apk_filename}") # Log stack trace
         report["error"] = f"Unexpected analysis error: {e}"
-    finally:
-        # Clean up the decompiled directory
-        if decompile_dir and os.path.exists(decompile_dir):
-            logging.info(f"Cleaning up temporary directory: {decompile_dir}")
-            try:
-                shutil.rmtree(decompile_dir)
-            except Exception as e:
-                logging.error(f"Failed to remove temporary directory {decompile_dir}: {e}")
 
     return report
 
-# --- Report Generation Function (No changes needed inside) ---
+# --- Report Generation Function ---
 def format_report(report_data, output_format="txt"):
     """Formats the analysis data into a human-readable report."""
     if not report_data:
@@ -241,8 +381,30 @@ def format_report(report_data, output_format="txt"):
 
     # Interesting Strings
     strings = report_data.get('interesting_strings', [])
+    ranked = report_data.get('ranked_strings')
     lines.append("\n--- Interesting Strings ---")
-    if isinstance(strings, list) and strings:
+    resource_strings = report_data.get('resource_strings')
+    if isinstance(resource_strings, dict) and resource_strings:
+         locales = ", ".join(f"{locale or 'default'} ({len(values)})" for locale, values in resource_strings.items())
+         lines.append(f"Resource strings per locale: {locales}")
+    string_stats = report_data.get('string_statistics')
+    if isinstance(string_stats, dict):
+         lines.append(f"Bounded mode: ~{string_stats.get('distinct_estimate')} distinct strings, "
+                      f"{string_stats.get('retained')} interesting kept "
+                      f"({string_stats.get('dropped_over_cap', 0)} dropped over the cap)")
+    if isinstance(ranked, dict) and ranked.get("total"):
+         # Highest scoring strings first, per category; "other" is only counted
+         lines.append(f"{ranked['total']} strings ranked by category (entropy, URL/IP/key patterns, base64):")
+         counts = ranked.get("counts", {})
+         for category, entries in ranked.items():
+             if category in ("total", "counts", "other") or not isinstance(entries, list) or not entries:
+                 continue
+             lines.append(f"\n  {category} ({counts.get(category, len(entries))} found, top {len(entries)}):")
+             for entry in entries:
+                 lines.append(f"  - {entry.get('value')} (entropy {entry.get('entropy')})")
+         if counts.get("other"):
+             lines.append(f"\n  ... and {counts['other']} other strings (see the JSON report).")
+    elif isinstance(strings, list) and strings:
          limit = 50
          for s in strings[:limit]:
              lines.append(f"- {s}")
@@ -278,11 +440,20 @@ def format_report(report_data, output_format="txt"):
     return "\n".join(lines)
 
 
+def parse_detectors(value):
+    """argparse type for --detectors: 'manifest,strings' -> ('manifest', 'strings')."""
+    detectors = tuple(name.strip() for name in value.split(",") if name.strip())
+    try:
+        choose_decode_profile(detectors)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return detectors
+
 # --- Script Execution ---
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         # Updated usage message
-        print(f"Usage: python {os.path.basename(__file__)} <apk_filename>")
+        print(f"Usage: python {os.path.basename(__file__)} <apk_filename> [--app-only] [--skip-libraries] [--include PATTERN] [--exclude PATTERN] [--workers N] [--ndjson [PATH]] [--compact] [--db PATH] [--patterns JSON] [--top-strings N] [--bounded-strings [N]] [--detectors LIST] [--main-classes-only] [--workspace DIR] [--workspace-quota MB] [--cache DIR] [--cache-max-mb MB]")
         print(f"       (Run this script from the '{os.path.basename(BASE_DIR)}' directory)")
         print(f"       (Place the APK file inside the '{os.path.basename(APK_DIR)}/' subdirectory)")
         print(f"       (Reports will be saved in the '{os.path.basename(REPORTS_DIR)}/' subdirectory)")
@@ -303,7 +474,66 @@ if __name__ == "__main__":
             print(f"  Error listing APKs: {e}")
         sys.exit(1)
 
-    target_apk_name = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Static analysis of an APK from the APK/ directory.")
+    parser.add_argument("apk", help="APK filename inside the APK/ directory")
+    parser.add_argument("--app-only", action="store_true",
+                        help="Only scan smali packages under the manifest package name")
+    parser.add_argument("--skip-libraries", action="store_true",
+                        help="Skip common bundled library packages (androidx, kotlin, ...)")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="Only scan packages matching PATTERN, e.g. 'com/example/**' (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="Skip packages matching PATTERN, e.g. 'androidx/**' (repeatable)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Max smali directories (DEX files) scanned in parallel (default: CPU count)")
+    parser.add_argument("--ndjson", nargs="?", const="", default=None, metavar="PATH",
+                        help="Stream results as NDJSON records instead of writing .txt/.json reports "
+                             "(default path: analysis_reports/<apk>_report.ndjson, '-' for stdout)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write the JSON data compact and compressed (orjson + zstd when installed) "
+                             "instead of pretty-printed; convert back with convert_report.py")
+    parser.add_argument("--db", metavar="PATH", default=None,
+                        help="Also record the results in this SQLite results database")
+    parser.add_argument("--top-strings", type=int, default=DEFAULT_TOP_K, metavar="N",
+                        help=f"Strings kept per category by the ranking stage (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--bounded-strings", nargs="?", type=int, const=50_000, default=None, metavar="N",
+                        help="Bounded-memory string extraction (Bloom filter + HyperLogLog) keeping at most "
+                             "N interesting strings (default N: 50000)")
+    parser.add_argument("--patterns", metavar="JSON", default=None,
+                        help="Extra detector regexes: {\"group\": {\"name\": \"regex\"}} (e.g. dynamic_loading)")
+    parser.add_argument("--detectors", type=parse_detectors, default=ALL_DETECTORS, metavar="LIST",
+                        help=f"Comma-separated analysis steps to run (default: {','.join(ALL_DETECTORS)}); "
+                             f"apktool only decodes what they need, e.g. 'manifest,androguard' skips it")
+    parser.add_argument("--main-classes-only", action="store_true",
+                        help="Only disassemble classes*.dex in the APK root (apktool --only-main-classes)")
+    parser.add_argument("--workspace", metavar="DIR", default=None,
+                        help="Preferred directory for the decoded tree, e.g. a tmpfs mount "
+                             "(default: /dev/shm when there is room, else the temp directory)")
+    parser.add_argument("--workspace-quota", type=int, default=DEFAULT_QUOTA_MB, metavar="MB",
+                        help=f"Maximum size of a decoded tree (default: {DEFAULT_QUOTA_MB})")
+    parser.add_argument("--cache", metavar="DIR", default=None,
+                        help="Reuse decoded trees stored in DIR (keyed by APK SHA-256, apktool version "
+                             "and decode profile) instead of re-running apktool")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MB, metavar="MB",
+                        help=f"Size bound of --cache; least recently used entries are evicted "
+                             f"(default: {DEFAULT_CACHE_MB})")
+    args = parser.parse_args()
+    cache = DecompileCache(args.cache, args.cache_max_mb) if args.cache else None
+
+    if args.workspace or args.workspace_quota != DEFAULT_QUOTA_MB:
+        set_default_manager(WorkspaceManager(args.workspace, args.workspace_quota))
+
+    if args.patterns:
+        try:
+            load_pattern_config(args.patterns)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    deny = args.exclude + (LIBRARY_PACKAGES if args.skip_libraries else [])
+    cli_filter = PackageFilter(allow=args.include, deny=deny)
+
+    target_apk_name = args.apk
     # Construct the full path to the target APK inside the APK_DIR
     target_apk_path = os.path.join(APK_DIR, target_apk_name)
 
@@ -313,8 +543,32 @@ if __name__ == "__main__":
         print(f"Error: The specified APK file '{target_apk_name}' was not found in the '{APK_DIR}' directory.")
         sys.exit(1)
 
+    # Streaming mode: emit NDJSON records as each detector finishes
+    if args.ndjson is not None:
+        ndjson_path = args.ndjson or os.path.join(REPORTS_DIR, f"{os.path.splitext(target_apk_name)[0]}_report.ndjson")
+        sink = NDJSONReportSink(sys.stdout) if ndjson_path == "-" else NDJSONReportSink.open(ndjson_path)
+        with sink:
+            streamed = run_analysis(target_apk_path, package_filter=cli_filter, app_only=args.app_only,
+                                    max_workers=args.workers, sink=sink, top_strings=args.top_strings,
+                                    bounded_strings=args.bounded_strings, detectors=args.detectors,
+                                    only_main_classes=args.main_classes_only, cache=cache)
+        if streamed is None or "error" in streamed:
+            logging.error("Analysis failed. Please check the logs for errors.")
+            sys.exit(1)
+        if ndjson_path != "-":
+            logging.info(f"NDJSON report ({sink.records_written} records) saved to: {ndjson_path}")
+            if args.db:
+                with ResultsStore(args.db) as store:
+                    store.add_report(load_ndjson_report(ndjson_path))
+        elif args.db:
+            logging.warning("--db is ignored when streaming NDJSON to stdout.")
+        sys.exit(0)
+
     # Run the main analysis pipeline
-    analysis_results = run_analysis(target_apk_path)
+    analysis_results = run_analysis(target_apk_path, package_filter=cli_filter, app_only=args.app_only,
+                                    max_workers=args.workers, top_strings=args.top_strings,
+                                    bounded_strings=args.bounded_strings, detectors=args.detectors,
+                                    only_main_classes=args.main_classes_only, cache=cache)
 
     # Process results and generate reports
     if analysis_results:
@@ -334,15 +588,28 @@ if __name__ == "__main__":
 
         # Write the JSON data
         try:
-            with open(report_json_path, "w", encoding="utf-8") as f:
-                # Use default=str to handle potential non-serializable types like dataclasses if conversion failed
-                json.dump(analysis_results, f, indent=2, default=str)
+            if args.compact:
+                report_json_path = write_compact_report(
+                    analysis_results, os.path.join(REPORTS_DIR, f"{report_filename_base}_report"))
+            else:
+                with open(report_json_path, "w", encoding="utf-8") as f:
+                    # Use default=str to handle potential non-serializable types like dataclasses if conversion failed
+                    json.dump(analysis_results, f, indent=2, default=str)
             logging.info(f"JSON data saved to: {report_json_path}")
         except IOError as e:
             logging.error(f"Failed to write JSON report file: {e}")
         except TypeError as e:
              logging.error(f"Failed to serialize results to JSON: {e}. Check data structures.")
 
+        # Record the results in the corpus database
+        if args.db:
+            try:
+                with ResultsStore(args.db) as store:
+                    store.add_report(analysis_results)
+                logging.info(f"Results recorded in database: {args.db}")
+            except Exception as e:
+                logging.error(f"Failed to record results in database: {e}")
+
     else:
         logging.error("Analysis failed or produced no results. No report generated.")
         print("Analysis failed. Please check the logs for errors.")
\ No newline at end of file
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import argparse
+import logging
+from functools import partial
+
+# analyse_apk puts 'src' on the search path and configures logging
+from analyse_apk import (APK_DIR, REPORTS_DIR, analyse_decompiled, cleanup_decompiled, parse_detectors,
+                         start_report, unpack_for_analysis)
+from apktool_server import ApktoolPool
+from decompile_cache import DecompileCache, DEFAULT_CACHE_MB
+from pipeline import AnalysisPipeline, DEFAULT_DETECTOR_WORKERS, DEFAULT_MIN_FREE_MB, DEFAULT_UNPACK_WORKERS
+from report_codec import write_compact_report
+from results_store import ResultsStore
+from smali_walker import PackageFilter, LIBRARY_PACKAGES
+from string_ranker import DEFAULT_TOP_K
+from unpacker import ALL_DETECTORS, choose_decode_profile, compute_sha256
+from workspace import WorkspaceManager, DEFAULT_QUOTA_MB
+
+def collect_apks(paths):
+    """Expand the given files and directories (non-recursive) into a sorted list of APK paths."""
+    apks = []
+    for path in paths:
+        if os.path.isdir(path):
+            apks.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".apk"))
+        elif os.path.isfile(path):
+            apks.append(path)
+        else:
+            logging.warning(f"Skipping {path}: not a file or directory")
+    return apks
+
+def analyse_stage(apk_path, decompile_dir, **options):
+    return analyse_decompiled(apk_path, decompile_dir, start_report(apk_path), **options)
+
+def write_report(item, out_dir, compact=False, store=None):
+    """Write one pipeline result as <apk>_report.json (or the compact format) and record its outcome in store."""
+    report = item.report
+    if report is None:
+        report = {"apk_file": os.path.basename(item.apk_path), "error": item.error}
+    path_base = os.path.join(out_dir, f"{os.path.splitext(os.path.basename(item.apk_path))[0]}_report")
+    if compact:
+        path = write_compact_report(report, path_base)
+    else:
+        path = path_base + ".json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    if store is not None:
+        if item.error:
+            store.add_failure(report.get("sha256") or compute_sha256(item.apk_path), item.apk_path, item.error)
+        else:
+            store.add_report(report)
+    logging.info(f"{report['apk_file']}: unpack {item.unpack_seconds:.1f}s, analyse {item.analyse_seconds:.1f}s"
+                 f" -> {path}")
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Analyse many APKs, overlapping apktool decoding with the Python detectors.")
+    parser.add_argument("paths", nargs="*", default=[APK_DIR],
+                        help="APK files or directories of APKs (default: the APK/ directory)")
+    parser.add_argument("--unpack-workers", type=int, default=DEFAULT_UNPACK_WORKERS, metavar="N",
+                        help=f"Concurrent apktool decodes (default: {DEFAULT_UNPACK_WORKERS})")
+    parser.add_argument("--detector-workers", type=int, default=DEFAULT_DETECTOR_WORKERS, metavar="N",
+                        help=f"Samples analysed concurrently (default: {DEFAULT_DETECTOR_WORKERS})")
+    parser.add_argument("--queue-size", type=int, default=None, metavar="N",
+                        help="Decoded samples allowed to wait for a detector (default: --detector-workers)")
+    parser.add_argument("--min-free-mb", type=int, default=DEFAULT_MIN_FREE_MB, metavar="MB",
+                        help=f"Pause decoding below this much free space in the work directory "
+                             f"(default: {DEFAULT_MIN_FREE_MB})")
+    parser.add_argument("--work-dir", default=None, metavar="DIR",
+                        help="Preferred directory for decoded samples, e.g. a tmpfs mount "
+                             "(default: /dev/shm when there is room, else the temp directory)")
+    parser.add_argument("--workspace-quota", type=int, default=DEFAULT_QUOTA_MB, metavar="MB",
+                        help=f"Maximum size of one decoded sample (default: {DEFAULT_QUOTA_MB})")
+    parser.add_argument("--cache", metavar="DIR", default=None,
+                        help="Reuse decoded trees stored in DIR instead of re-running apktool "
+                             "(see analyse_apk.py --cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MB, metavar="MB",
+                        help=f"Size bound of --cache (default: {DEFAULT_CACHE_MB})")
+    parser.add_argument("--warm-jvm", nargs="?", type=int, const=1, default=0, metavar="N",
+                        help="Decode in N long-lived apktool JVMs (default N: 1) instead of one JVM per APK; "
+                             "needs java and apktool.jar ($APKTOOL_JAR), else falls back")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Max smali directories scanned in parallel per sample "
+                             "(default: CPU count / --detector-workers)")
+    parser.add_argument("--out", default=REPORTS_DIR, metavar="DIR",
+                        help="Report directory (default: analysis_reports/)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write compact compressed reports (see analyse_apk.py --compact)")
+    parser.add_argument("--db", metavar="PATH", default=None,
+                        help="Also record the results in this SQLite results database")
+    parser.add_argument("--app-only", action="store_true",
+                        help="Only scan smali packages under the manifest package name")
+    parser.add_argument("--skip-libraries", action="store_true",
+                        help="Skip common bundled library packages (androidx, kotlin, ...)")
+    parser.add_argument("--top-strings", type=int, default=DEFAULT_TOP_K, metavar="N",
+                        help=f"Strings kept per category by the ranking stage (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--bounded-strings", nargs="?", type=int, const=50_000, default=None, metavar="N",
+                        help="Bounded-memory string extraction keeping at most N interesting strings")
+    parser.add_argument("--detectors", type=parse_detectors, default=ALL_DETECTORS, metavar="LIST",
+                        help=f"Comma-separated analysis steps to run (default: {','.join(ALL_DETECTORS)})")
+    parser.add_argument("--main-classes-only", action="store_true",
+                        help="Only disassemble classes*.dex in the APK root (apktool --only-main-classes)")
+    args = parser.parse_args()
+
+    apks = collect_apks(args.paths)
+    if not apks:
+        print("Error: no APK files found.")
+        sys.exit(1)
+    os.makedirs(args.out, exist_ok=True)
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+
+    max_workers = args.workers or max(1, (os.cpu_count() or 1) // args.detector_workers)
+    package_filter = PackageFilter(deny=LIBRARY_PACKAGES if args.skip_libraries else [])
+    profile = choose_decode_profile(args.detectors, args.main_classes_only)
+    workspaces = WorkspaceManager(args.work_dir, args.workspace_quota)
+    jvm_pool = ApktoolPool(args.warm_jvm) if args.warm_jvm else None
+    cache = DecompileCache(args.cache, args.cache_max_mb) if args.cache else None
+    pipeline = AnalysisPipeline(
+        unpack=partial(unpack_for_analysis, profile=profile, workspaces=workspaces, cache=cache,
+                       backend=jvm_pool),
+        analyse=partial(analyse_stage, package_filter=package_filter, app_only=args.app_only,
+                        max_workers=max_workers, top_strings=args.top_strings,
+                        bounded_strings=args.bounded_strings, detectors=args.detectors),
+        cleanup=partial(cleanup_decompiled, workspaces=workspaces),
+        unpack_workers=args.unpack_workers,
+        detector_workers=args.detector_workers,
+        queue_size=args.queue_size,
+        work_dir=workspaces.roots[0],
+        min_free_mb=args.min_free_mb,
+        disk_free=lambda path: workspaces.available_bytes(),
+    )
+
+    store = ResultsStore(args.db) if args.db else None
+    try:
+        stats = pipeline.run(apks, on_result=partial(write_report, out_dir=args.out, compact=args.compact,
+                                                     store=store))
+    finally:
+        if store is not None:
+            store.close()
+        if jvm_pool is not None:
+            jvm_pool.close()
+
+    print(f"Analysed {stats.samples} APKs ({stats.failed} failed) in {stats.wall_seconds:.1f}s "
+          f"(unpack {stats.unpack_seconds:.1f}s + analyse {stats.analyse_seconds:.1f}s of stage time)")
+    if cache is not None:
+        print(f"Decompile cache: {cache.hits} hits, {cache.misses} misses")
+    for error in stats.errors:
+        print(f"  {error}")
+    sys.exit(1 if stats.failed else 0)
@@ -0,0 +1,74 @@
+# bench_patterns.py
+#
+# Measures the per-sample regex setup overhead of the detectors: building the
+# pattern tables inside every call (the old behaviour, with Python's re cache
+# warm and cold) versus looking them up in the precompiled registry.
+#
+# Usage: python benchmarks/bench_patterns.py [--dex-dirs N] [--files N] [--repeat N]
+
+import os
+import re
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from patterns import DEFAULT_PATTERNS, REGISTRY
+
+# Groups that were rebuilt once per smali directory by the detectors
+PER_DIR_GROUPS = ("reflection", "dynamic_loading", "native", "strings")
+SMALI_HEADER = ".class public Lcom/example/app/MainActivity;\n.super Landroid/app/Activity;\n"
+
+def per_sample_before(dex_dirs, files, purge):
+    """Old behaviour: compile every table per directory, re.search the class pattern per file."""
+    for _ in range(dex_dirs):
+        if purge:
+            re.purge()
+        for group in PER_DIR_GROUPS:
+            {name: re.compile(regex) for name, regex in DEFAULT_PATTERNS[group].items()}
+        re.compile(DEFAULT_PATTERNS["smali"]["const_string"])
+        re.compile(DEFAULT_PATTERNS["smali"]["load_library"])
+        for _ in range(files // dex_dirs):
+            re.search(DEFAULT_PATTERNS["smali"]["class_name"], SMALI_HEADER)
+
+def per_sample_after(dex_dirs, files):
+    """Registry: table lookups per directory, precompiled class pattern per file."""
+    class_name = REGISTRY.get("smali", "class_name")
+    for _ in range(dex_dirs):
+        for group in PER_DIR_GROUPS:
+            REGISTRY.group(group)
+        REGISTRY.get("smali", "const_string")
+        REGISTRY.get("smali", "load_library")
+        for _ in range(files // dex_dirs):
+            class_name.search(SMALI_HEADER)
+
+def best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sample regex setup overhead, before/after the pattern registry.")
+    parser.add_argument("--dex-dirs", type=int, default=4, help="smali directories per sample (default: 4)")
+    parser.add_argument("--files", type=int, default=4000, help="smali files per sample (default: 4000)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [
+        ("per-call compile (cold re cache)", best_ms(lambda: per_sample_before(args.dex_dirs, args.files, True), args.repeat)),
+        ("per-call compile (warm re cache)", best_ms(lambda: per_sample_before(args.dex_dirs, args.files, False), args.repeat)),
+        ("precompiled registry", best_ms(lambda: per_sample_after(args.dex_dirs, args.files), args.repeat)),
+    ]
+    print(f"Per-sample overhead, {args.dex_dirs} smali dirs / {args.files} files (best of {args.repeat}):")
+    for label, ms in rows:
+        print(f"  {label:<34} {ms:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_report_codec.py
+#
+# Compares report size and encode/decode time of the pretty JSON reports
+# against the compact formats in report_codec.
+#
+# Usage: python benchmarks/bench_report_codec.py [report.json] [--repeat N]
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import report_codec
+from report_codec import encode_json, decode_json, compress, decompress
+
+DEFAULT_REPORT = os.path.join(BASE_DIR, 'analysis_reports', 'app_login_report.json')
+
+def timed(func, repeat):
+    """Return (result, best time in ms) over *repeat* runs."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def candidates():
+    yield "json indent=2", \
+        lambda r: json.dumps(r, indent=2, default=str).encode("utf-8"), \
+        lambda b: json.loads(b.decode("utf-8"))
+    yield "json compact", \
+        lambda r: json.dumps(r, default=str, separators=(",", ":")).encode("utf-8"), \
+        lambda b: json.loads(b.decode("utf-8"))
+    yield "json compact + gzip", \
+        lambda r: gzip.compress(json.dumps(r, default=str, separators=(",", ":")).encode("utf-8")), \
+        lambda b: json.loads(gzip.decompress(b).decode("utf-8"))
+    if report_codec.is_orjson_available():
+        yield "orjson", encode_json, decode_json
+    yield "report_codec (%s)" % report_codec.compact_extension(), \
+        lambda r: compress(encode_json(r)), \
+        lambda b: decode_json(decompress(b))
+    try:
+        import msgpack
+        yield "msgpack", \
+            lambda r: msgpack.packb(r, default=str), \
+            lambda b: msgpack.unpackb(b)
+    except ImportError:
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark report encodings.")
+    parser.add_argument("report", nargs="?", default=DEFAULT_REPORT, help="JSON report to benchmark with")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    with open(args.report, "r", encoding="utf-8") as f:
+        report = json.load(f)
+
+    print(f"Report: {args.report}")
+    print(f"orjson: {report_codec.is_orjson_available()}, zstandard: {report_codec.is_zstd_available()}")
+    print(f"{'format':<30}{'size (KB)':>12}{'encode (ms)':>14}{'decode (ms)':>14}")
+    for name, encode, decode in candidates():
+        data, encode_ms = timed(lambda: encode(report), args.repeat)
+        decoded, decode_ms = timed(lambda: decode(data), args.repeat)
+        assert decoded == json.loads(json.dumps(report, default=str))
+        print(f"{name:<30}{len(data) / 1024:>12.1f}{encode_ms:>14.2f}{decode_ms:>14.2f}")
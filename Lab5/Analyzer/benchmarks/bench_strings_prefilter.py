@@ -0,0 +1,129 @@
+# bench_strings_prefilter.py
+#
+# Compares the URL/key extraction of extract_patterns_from_smali against the
+# previous approach (every "strings" regex over each file's full content) on
+# a synthetic, code-heavy smali tree (or a real decompiled APK directory).
+#
+# Usage: python benchmarks/bench_strings_prefilter.py [decompile_dir] [--files N] [--repeat N]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from patterns import REGISTRY
+from smali_walker import find_smali_dirs, walk_smali
+from strings_extractor import _patterns_in_dir, patterns_in_smali
+
+CODE_METHOD = """
+.method public compute%(n)d(II)I
+    .locals 4
+    .param p1, "firstValue"    # I
+    .param p2, "secondValue"    # I
+    .line %(n)d
+    add-int v0, p1, p2
+    .local v0, "sum":I
+    mul-int/lit8 v1, v0, 0x1f
+    invoke-virtual {p0, v1}, Lcom/example/Worker;->step(I)V
+    iget-object v2, p0, Lcom/example/Worker;->items:Ljava/util/List;
+    invoke-interface {v2}, Ljava/util/List;->size()I
+    move-result v3
+    if-lez v3, :cond_%(n)d
+    return v0
+    :cond_%(n)d
+    return v1
+.end method
+"""
+
+def make_tree(root, files):
+    """Write *files* smali classes: mostly code, every 10th with a few literals."""
+    package_dir = os.path.join(root, "smali", "com", "example")
+    os.makedirs(package_dir)
+    for i in range(files):
+        body = [f'.class public Lcom/example/C{i};\n.super Ljava/lang/Object;\n.source "C{i}.java"\n']
+        body.extend(CODE_METHOD % {"n": n} for n in range(15))
+        if i % 10 == 0:
+            body.append(f'    const-string v0, "https://api{i}.example.com/v1"\n'
+                        f'    const-string v1, "AKIAIOSFODNN7EXAMPL{i % 10}"\n'
+                        f'    const-string v2, "10.0.{i % 250}.1"\n')
+        with open(os.path.join(package_dir, f"C{i}.smali"), "w") as f:
+            f.write("".join(body))
+
+def full_content_matches(content, regexes):
+    """Previous behaviour: every regex over the whole file content."""
+    patterns = set()
+    for regex in regexes.values():
+        for match in regex.finditer(content):
+            value = match.group(0).strip('"')
+            if value:
+                patterns.add(value)
+    return patterns
+
+def full_content_scan(smali_dir):
+    patterns = set()
+    regexes = REGISTRY.group("strings")
+    for file_path in walk_smali(smali_dir):
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            patterns.update(full_content_matches(f.read(), regexes))
+    return patterns
+
+def match_stage(contents, matcher):
+    regexes = REGISTRY.group("strings")
+    return set().union(*(matcher(content, regexes) for content in contents))
+
+def best_ms(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-content regex scan vs literal-line prefilter.")
+    parser.add_argument("decompile_dir", nargs="?", help="Decompiled APK directory (default: synthetic tree)")
+    parser.add_argument("--files", type=int, default=2000, help="Synthetic smali files (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    decompile_dir = args.decompile_dir
+    if decompile_dir is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_strings_")
+        make_tree(tmp_dir, args.files)
+        decompile_dir = tmp_dir
+    try:
+        smali_dirs = find_smali_dirs(decompile_dir)
+        before, before_ms = best_ms(lambda: set().union(*(full_content_scan(d) for d in smali_dirs)), args.repeat)
+        after, after_ms = best_ms(lambda: set().union(*(_patterns_in_dir(d) for d in smali_dirs)), args.repeat)
+        
+        # Matching only, with the files already in memory (excludes walking and reading)
+        contents = []
+        for smali_dir in smali_dirs:
+            for file_path in walk_smali(smali_dir):
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    contents.append(f.read())
+        _, before_match_ms = best_ms(lambda: match_stage(contents, full_content_matches), args.repeat)
+        _, after_match_ms = best_ms(lambda: match_stage(contents, patterns_in_smali), args.repeat)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"{'':<26} {'end-to-end':>12} {'match only':>12}")
+    print(f"{'full-content regex scan':<26} {before_ms:9.1f} ms {before_match_ms:9.1f} ms  {len(before)} values")
+    print(f"{'literal-line prefilter':<26} {after_ms:9.1f} ms {after_match_ms:9.1f} ms  {len(after)} values")
+    print(f"speed-up: {before_ms / after_ms:.1f}x end-to-end, {before_match_ms / after_match_ms:.1f}x matching")
+    missing = before - after
+    if missing:
+        print(f"values only found by the full-content scan: {len(missing)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import argparse
+
+# --- Add 'src' directory to Python's search path ---
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from report_codec import to_pretty_json
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a compact (.json.zst/.json.gz) or NDJSON report to pretty JSON.")
+    parser.add_argument("report", help="Path to the report file")
+    parser.add_argument("-o", "--output", help="Write the pretty JSON here instead of stdout")
+    args = parser.parse_args()
+
+    try:
+        text = to_pretty_json(args.report, args.output)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not args.output:
+        print(text)
@@ -0,0 +1,283 @@
+# apktool_server.py
+
+import os
+import glob
+import queue
+import shutil
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+from unpacker import (DecodeProfile, FULL, WATCH_INTERVAL, UnpackError, apktool_timeout, apktool_version,
+                      check_decoded, extract_manifest, find_apktool, prepare_out_dir, query_apktool_version,
+                      unpack_apk)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SERVER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "java", "ApktoolServer.java")
+JAR_ENV = "APKTOOL_JAR"
+
+DEFAULT_POOL_SIZE = 1
+# Restart a server after this many decodes so apktool's heap does not grow without bound
+DEFAULT_MAX_JOBS = 100
+STARTUP_TIMEOUT = 120
+STDERR_TAIL_LINES = 20
+
+_TIMEOUT = object()
+
+class WarmJvmUnavailable(UnpackError):
+    """Raised when no warm apktool JVM can be started (no java, no apktool.jar, or a startup failure)."""
+    pass
+
+def find_apktool_jar() -> Optional[str]:
+    """apktool.jar from $APKTOOL_JAR, or next to the apktool wrapper script on PATH."""
+    jar = os.environ.get(JAR_ENV)
+    if jar:
+        return jar if os.path.isfile(jar) else None
+    apktool_cmd = find_apktool()
+    if not apktool_cmd:
+        return None
+    folder = os.path.dirname(os.path.realpath(apktool_cmd))
+    candidates = [os.path.join(folder, "apktool.jar")] + sorted(glob.glob(os.path.join(folder, "apktool*.jar")))
+    return next((jar for jar in candidates if os.path.isfile(jar)), None)
+
+class ApktoolServer:
+    """
+    One long-lived apktool JVM (java/ApktoolServer.java) fed decode jobs over a pipe.
+
+    JVM start-up and JIT warm-up are paid once instead of per APK. The
+    server is started lazily and restarted after max_jobs decodes, after a
+    timeout (the JVM is killed, as a running decode cannot be interrupted)
+    or when it dies. Not thread-safe: use one server per thread, e.g. via
+    ApktoolPool.
+    """
+
+    def __init__(self, jar: Optional[str] = None, java: Optional[str] = None,
+                 max_jobs: int = DEFAULT_MAX_JOBS, startup_timeout: float = STARTUP_TIMEOUT):
+        self.jar = jar or find_apktool_jar()
+        self.java = java or shutil.which("java")
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self.jobs = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue" = queue.Queue()
+        self._stderr: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def version(self) -> str:
+        """Version of the apktool.jar this server decodes with ("none" without java or a jar)."""
+        return query_apktool_version(self.java, "-jar", self.jar) if self.java and self.jar else "none"
+
+    def start(self):
+        """
+        Start the JVM and wait for it to be ready.
+
+        Raises:
+            WarmJvmUnavailable: If java or apktool.jar is missing or the server does not come up
+        """
+        if self.running:
+            return
+        if not self.java or not self.jar:
+            raise WarmJvmUnavailable("java and apktool.jar are needed for a warm JVM "
+                                     f"(set {JAR_ENV} if apktool.jar is not next to apktool)")
+        # -Djava.security.manager=allow lets the server trap System.exit on JDK 18+;
+        # JDKs before 12 reject the value, so fall back to starting without it
+        for options in (["-Djava.security.manager=allow"], []):
+            if self._spawn([self.java, *options, "-cp", self.jar, SERVER_SOURCE]):
+                logger.info(f"Warm apktool JVM started (pid {self._process.pid})")
+                return
+        raise WarmJvmUnavailable(f"apktool server did not start: {self._stderr_text()}")
+
+    def _spawn(self, cmd: List[str]) -> bool:
+        self.close()
+        self._lines = queue.Queue()
+        self._stderr.clear()
+        try:
+            self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.PIPE, shell=False)
+        except OSError as e:
+            raise WarmJvmUnavailable(f"Failed to start java: {e}")
+        threading.Thread(target=self._read_stdout, args=(self._process, self._lines), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self._process,), daemon=True).start()
+        self.jobs = 0
+        return self._next_line(self.startup_timeout) == "READY"
+
+    def _read_stdout(self, process: subprocess.Popen, lines: "queue.Queue"):
+        for line in process.stdout:
+            lines.put(line.decode(errors="ignore").rstrip("\r\n"))
+        lines.put(None)  # EOF: the JVM exited
+
+    def _read_stderr(self, process: subprocess.Popen):
+        for line in process.stderr:
+            text = line.decode(errors="ignore").rstrip()
+            self._stderr.append(text)
+            logger.debug(f"apktool: {text}")
+
+    def _next_line(self, timeout: float):
+        """Next protocol line, None at EOF, or _TIMEOUT."""
+        try:
+            return self._lines.get(timeout=timeout)
+        except queue.Empty:
+            return _TIMEOUT
+
+    def _stderr_text(self) -> str:
+        return "\n".join(self._stderr).strip()
+
+    def decode(self, apk_path: str, out_dir: Optional[str] = None, profile: DecodeProfile = FULL,
+               timeout: Optional[float] = None, watch: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Decode apk_path like unpack_apk, in the warm JVM. If watch(out_dir)
+        raises during the decode, the JVM is killed and the exception
+        propagates.
+
+        Raises:
+            WarmJvmUnavailable: If the server cannot be started or died mid-job
+                (the caller may retry with unpack_apk)
+            UnpackError: If apktool failed or timed out
+        """
+        if not profile.runs_apktool:
+            return extract_manifest(apk_path, out_dir)
+        out_dir = prepare_out_dir(apk_path, out_dir)
+        args = ["d", "-f", *profile.apktool_args(), "-o", os.path.abspath(out_dir), os.path.abspath(apk_path)]
+        if any("\t" in arg or "\n" in arg for arg in args):
+            raise WarmJvmUnavailable("Path contains a tab or newline, which the server protocol cannot carry")
+
+        if self.jobs >= self.max_jobs:
+            self.close()
+        self.start()
+        self._stderr.clear()
+        try:
+            self._process.stdin.write(("\t".join(args) + "\n").encode("utf-8"))
+            self._process.stdin.flush()
+        except OSError as e:
+            self.close()
+            raise WarmJvmUnavailable(f"apktool server is gone: {e}")
+        self.jobs += 1
+
+        timeout = timeout or apktool_timeout(apk_path)
+        line = self._wait(out_dir, timeout, watch)
+        if line is _TIMEOUT:
+            self.close(kill=True)
+            raise UnpackError(f"apktool timed out after {timeout:.0f} seconds")
+        if line is None:
+            self.close()
+            raise WarmJvmUnavailable(f"apktool server exited during the decode: {self._stderr_text()}")
+
+        _, status, error = (line.split("\t", 2) + ["", ""])[:3]
+        if status != "0":
+            raise UnpackError(f"apktool failed with code {status}: {error or self._stderr_text()}")
+        check_decoded(out_dir)
+        return out_dir
+
+    def _wait(self, out_dir: str, timeout: float, watch: Optional[Callable[[str], Any]]):
+        """The decode's result line (see _next_line), calling watch(out_dir) meanwhile."""
+        if watch is None:
+            return self._next_line(timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            line = self._next_line(max(0.0, min(WATCH_INTERVAL, remaining)))
+            if line is not _TIMEOUT or remaining <= WATCH_INTERVAL:
+                return line
+            try:
+                watch(out_dir)
+            except BaseException:
+                self.close(kill=True)  # a running decode cannot be interrupted
+                raise
+
+    def close(self, kill: bool = False):
+        """Stop the JVM: end of input lets it exit, a busy or stuck one is killed."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if kill:
+            process.kill()
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+class ApktoolPool:
+    """
+    A small pool of warm apktool JVMs; a decode backend like SubprocessDecoder.
+
+    Each call borrows a server, so at most size JVMs run at once. When no
+    warm JVM can be started (no java or apktool.jar, or a startup failure)
+    the pool logs it once and every call falls back to unpack_apk; a job
+    whose server died is retried the same way.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, jar: Optional[str] = None, java: Optional[str] = None,
+                 max_jobs: int = DEFAULT_MAX_JOBS):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self._idle: "queue.Queue" = queue.Queue()
+        self._servers = [ApktoolServer(jar, java, max_jobs) for _ in range(size)]
+        for server in self._servers:
+            self._idle.put(server)
+        self.available = True
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def decode(self, apk_path: str, out_dir: str, profile: DecodeProfile = FULL,
+               watch: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Decode like unpack_apk, preferably in a warm JVM. Returns the version
+        of the apktool that decoded: the jar's, or that of apktool on PATH
+        when the job fell back to unpack_apk.
+        """
+        if self.available and profile.runs_apktool:
+            server = self._idle.get()
+            try:
+                try:
+                    server.start()
+                except WarmJvmUnavailable as e:
+                    self._fall_back(e, disable=True)
+                else:
+                    try:
+                        server.decode(apk_path, out_dir, profile, watch=watch)
+                        return server.version
+                    except WarmJvmUnavailable as e:
+                        self._fall_back(e, disable=False)
+            finally:
+                self._idle.put(server)
+        unpack_apk(apk_path, out_dir, profile, watch)
+        return apktool_version()
+
+    @property
+    def version(self) -> str:
+        """Version of the apktool that decodes the next job: the warm JVMs' jar, or apktool on PATH."""
+        server = self._servers[0]
+        return server.version if self.available and server.java and server.jar else apktool_version()
+
+    def _fall_back(self, error: WarmJvmUnavailable, disable: bool):
+        with self._lock:
+            self.fallbacks += 1
+            if not disable:
+                logger.warning(f"{error}; retrying with a new apktool process")
+            elif self.available:
+                self.available = False
+                logger.warning(f"Warm apktool JVM unavailable, using one apktool process per APK: {error}")
+
+    def close(self):
+        for server in self._servers:
+            server.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,312 @@
+# arsc_parser.py
+
+import struct
+import zipfile
+import logging
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Chunk types (frameworks/base/libs/androidfw/include/androidfw/ResourceTypes.h)
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+UTF8_FLAG = 0x100
+TYPE_STRING = 0x03
+NO_ENTRY = 0xFFFFFFFF
+
+# ResTable_type flags
+FLAG_SPARSE = 0x01
+FLAG_OFFSET16 = 0x02
+
+# ResTable_entry flags
+FLAG_COMPLEX = 0x0001
+FLAG_COMPACT = 0x0008
+
+DEFAULT_LOCALE = ""
+# Package ID of the app's own resources (0x7FTTEEEE); 0x01 is the framework
+APP_PACKAGE_ID = 0x7F
+
+class ArscError(Exception):
+    """Raised when resources.arsc is missing or malformed."""
+    pass
+
+class ResourceString(NamedTuple):
+    """One string value of a resource entry."""
+    package: str
+    type: str     # e.g. 'string', 'plurals', 'array'
+    name: str
+    locale: str   # '' for the default configuration, e.g. 'fr', 'pt-BR'
+    value: str
+
+class StringPool:
+    """
+    Lazily decoded ResStringPool chunk.
+
+    Strings are only decoded when accessed, so iterating the entries of a
+    large table does not materialise the whole pool.
+    """
+
+    def __init__(self, data: memoryview, offset: int):
+        _, header_size, size = struct.unpack_from("<HHI", data, offset)
+        count, _styles, flags, strings_start, _styles_start = struct.unpack_from("<IIIII", data, offset + 8)
+        self.data = data
+        self.count = count
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self.strings_base = offset + strings_start
+        self.offsets = struct.unpack_from(f"<{count}I", data, offset + header_size) if count else ()
+        self.end = offset + size
+        self._cache: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        cached = self._cache.get(index)
+        if cached is None:
+            cached = self._decode(index)
+            self._cache[index] = cached
+        return cached
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.count):
+            yield self._decode(index)
+
+    def _decode(self, index: int) -> str:
+        if not 0 <= index < self.count:
+            raise ArscError(f"String index {index} out of range")
+        pos = self.strings_base + self.offsets[index]
+        data = self.data
+        if self.utf8:
+            # UTF-16 length, then UTF-8 byte length; each 1 or 2 bytes
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            return bytes(data[pos:pos + length]).decode("utf-8", errors="replace")
+        length = struct.unpack_from("<H", data, pos)[0]
+        if length & 0x8000:
+            length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos + 2)[0]
+            pos += 4
+        else:
+            pos += 2
+        return bytes(data[pos:pos + length * 2]).decode("utf-16-le", errors="replace")
+
+def _locale(data: memoryview, config_offset: int) -> str:
+    """Locale of a ResTable_config as 'll' or 'll-RR' ('' for the default)."""
+    config_size = struct.unpack_from("<I", data, config_offset)[0]
+    if config_size < 12:
+        return DEFAULT_LOCALE
+    language = _unpack_locale_part(bytes(data[config_offset + 8:config_offset + 10]), ord("a"))
+    country = _unpack_locale_part(bytes(data[config_offset + 10:config_offset + 12]), ord("0"))
+    if not language:
+        return DEFAULT_LOCALE
+    return f"{language}-{country}" if country else language
+
+def _unpack_locale_part(raw: bytes, base: int) -> str:
+    if raw[0] == 0:
+        return ""
+    if raw[0] & 0x80:
+        # Packed 3-letter code: 5 bits per letter
+        first = raw[1] & 0x1F
+        second = ((raw[1] & 0xE0) >> 5) | ((raw[0] & 0x03) << 3)
+        third = (raw[0] & 0x7C) >> 2
+        return "".join(chr(base + c) for c in (first, second, third))
+    return raw.decode("ascii", errors="replace")
+
+class ArscParser:
+    """
+    Streaming parser for the resource table (resources.arsc).
+
+    Only the chunks needed for string values are decoded: the global string
+    pool, each package's type/key pools and the entries of every type chunk
+    (one per configuration, i.e. per locale, density, ...).
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        if len(data) < 12:
+            raise ArscError("resources.arsc is truncated")
+        chunk_type, header_size, size = struct.unpack_from("<HHI", self.data, 0)
+        if chunk_type != RES_TABLE_TYPE:
+            raise ArscError(f"Not a resource table (chunk type 0x{chunk_type:04x})")
+        self.header_size = header_size
+        self.size = min(size, len(data))
+        self.global_pool: Optional[StringPool] = None
+        self._packages: List[Tuple[int, int]] = []
+        self._scan()
+
+    @classmethod
+    def from_apk(cls, apk_path: str) -> "ArscParser":
+        """Read resources.arsc straight out of the APK zip (no apktool decode)."""
+        try:
+            with zipfile.ZipFile(apk_path) as apk:
+                data = apk.read("resources.arsc")
+        except KeyError:
+            raise ArscError(f"No resources.arsc in {apk_path}")
+        except (OSError, zipfile.BadZipFile) as e:
+            raise ArscError(f"Cannot read {apk_path}: {e}")
+        return cls(data)
+
+    def _chunks(self, start: int, end: int) -> Iterator[Tuple[int, int, int, int]]:
+        """Yield (type, offset, header_size, size) of the chunks between start and end."""
+        offset = start
+        while offset + 8 <= end:
+            chunk_type, header_size, size = struct.unpack_from("<HHI", self.data, offset)
+            if size < 8 or offset + size > end:
+                logger.warning(f"Malformed chunk at offset {offset} in resources.arsc, stopping")
+                return
+            yield chunk_type, offset, header_size, size
+            offset += size
+
+    def _scan(self):
+        for chunk_type, offset, _header_size, size in self._chunks(self.header_size, self.size):
+            if chunk_type == RES_STRING_POOL_TYPE and self.global_pool is None:
+                self.global_pool = StringPool(self.data, offset)
+            elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+                self._packages.append((offset, size))
+        if self.global_pool is None:
+            raise ArscError("resources.arsc has no global string pool")
+
+    def iter_global_strings(self) -> Iterator[str]:
+        """Every string of the global value pool (all locales, all resource types)."""
+        yield from self.global_pool
+
+    def iter_strings(self, locales: Optional[Set[str]] = None) -> Iterator[ResourceString]:
+        """
+        Yield the string values of every resource entry, for every configuration.
+
+        Args:
+            locales: Only yield these locales ('' is the default configuration)
+        """
+        for package_offset, package_size in self._packages:
+            yield from self._iter_package(package_offset, package_offset + package_size, locales)
+
+    def resource_names(self) -> Dict[int, str]:
+        """
+        Map every resource ID (0xPPTTEEEE) to its name as apktool writes a
+        reference: 'style/AppTheme', prefixed with 'package:' outside the
+        app package (0x7F).
+        """
+        names: Dict[int, str] = {}
+        for offset, size in self._packages:
+            package_id, name, header_size, type_pool, key_pool = self._package_header(offset)
+            prefix = "" if package_id == APP_PACKAGE_ID else f"{name}:"
+            for chunk_type, chunk_offset, chunk_header, chunk_size in self._chunks(offset + header_size, offset + size):
+                if chunk_type != RES_TABLE_TYPE_TYPE:
+                    continue
+                type_id = self.data[chunk_offset + 8]
+                type_name = type_pool[type_id - 1] if 0 < type_id <= len(type_pool) else str(type_id)
+                for index, pos, _chunk_end in self._entry_positions(chunk_offset, chunk_header, chunk_size):
+                    entry_size, entry_flags = struct.unpack_from("<HH", self.data, pos)
+                    # Compact entries keep the key index in the size field
+                    key = entry_size if entry_flags & FLAG_COMPACT else struct.unpack_from("<I", self.data, pos + 4)[0]
+                    key_name = key_pool[key] if key < len(key_pool) else str(key)
+                    # Every configuration repeats the entry; the name is the same
+                    names.setdefault((package_id << 24) | (type_id << 16) | index, f"{prefix}{type_name}/{key_name}")
+        return names
+
+    def _package_header(self, offset: int) -> Tuple[int, str, int, StringPool, StringPool]:
+        """(package id, name, header size, type pool, key pool) of the package chunk at offset."""
+        data = self.data
+        header_size = struct.unpack_from("<H", data, offset + 2)[0]
+        package_id = struct.unpack_from("<I", data, offset + 8)[0]
+        name = bytes(data[offset + 12:offset + 12 + 256]).decode("utf-16-le", errors="replace").split("\x00", 1)[0]
+        type_strings_offset, _last_type, key_strings_offset = struct.unpack_from("<III", data, offset + 268)
+        return (package_id, name, header_size, StringPool(data, offset + type_strings_offset),
+                StringPool(data, offset + key_strings_offset))
+
+    def _iter_package(self, offset: int, end: int, locales: Optional[Set[str]]) -> Iterator[ResourceString]:
+        data = self.data
+        _package_id, name, header_size, type_pool, key_pool = self._package_header(offset)
+
+        for chunk_type, chunk_offset, chunk_header, chunk_size in self._chunks(offset + header_size, end):
+            if chunk_type != RES_TABLE_TYPE_TYPE:
+                continue
+            locale = _locale(data, chunk_offset + 20)
+            if locales is not None and locale not in locales:
+                continue
+            type_id = data[chunk_offset + 8]
+            type_name = type_pool[type_id - 1] if 0 < type_id <= len(type_pool) else str(type_id)
+            for key, value_index in self._iter_entries(chunk_offset, chunk_header, chunk_size):
+                yield ResourceString(name, type_name, key_pool[key] if key < len(key_pool) else str(key),
+                                     locale, self.global_pool[value_index])
+
+    def _entry_positions(self, offset: int, header_size: int, size: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield (entry index, entry offset, chunk end) of the entries present in one type chunk."""
+        data = self.data
+        flags = data[offset + 9]
+        entry_count, entries_start = struct.unpack_from("<II", data, offset + 12)
+        index_base = offset + header_size
+        entries_base = offset + entries_start
+        chunk_end = offset + size
+
+        if flags & FLAG_SPARSE:
+            # (entry index, offset / 4) pairs
+            pairs = struct.unpack_from(f"<{2 * entry_count}H", data, index_base)
+            offsets = [(pairs[2 * i], pairs[2 * i + 1] * 4) for i in range(entry_count)]
+        elif flags & FLAG_OFFSET16:
+            raw = struct.unpack_from(f"<{entry_count}H", data, index_base)
+            offsets = [(i, NO_ENTRY if o == 0xFFFF else o * 4) for i, o in enumerate(raw)]
+        else:
+            offsets = enumerate(struct.unpack_from(f"<{entry_count}I", data, index_base))
+
+        for index, entry_offset in offsets:
+            if entry_offset == NO_ENTRY:
+                continue
+            pos = entries_base + entry_offset
+            if pos + 8 <= chunk_end:
+                yield index, pos, chunk_end
+
+    def _iter_entries(self, offset: int, header_size: int, size: int) -> Iterator[Tuple[int, int]]:
+        """Yield (key index, global pool index) of the string values in one type chunk."""
+        data = self.data
+        for _index, pos, chunk_end in self._entry_positions(offset, header_size, size):
+            entry_size, entry_flags = struct.unpack_from("<HH", data, pos)
+            if entry_flags & FLAG_COMPACT:
+                # key in the size field, data type in the high byte of the flags
+                if entry_flags >> 8 == TYPE_STRING:
+                    yield entry_size, struct.unpack_from("<I", data, pos + 4)[0]
+                continue
+            key = struct.unpack_from("<I", data, pos + 4)[0]
+            if entry_flags & FLAG_COMPLEX:
+                # Bag (plurals, string-array, style): parent, count, then name + Res_value pairs
+                count = struct.unpack_from("<I", data, pos + 12)[0]
+                item = pos + entry_size
+                for _ in range(count):
+                    if item + 12 > chunk_end:
+                        break
+                    data_type, value = struct.unpack_from("<xBI", data, item + 6)
+                    if data_type == TYPE_STRING:
+                        yield key, value
+                    item += 12
+            else:
+                data_type, value = struct.unpack_from("<xBI", data, pos + entry_size + 2)
+                if data_type == TYPE_STRING:
+                    yield key, value
+
+def extract_arsc_strings(apk_path: str, locales: Optional[Set[str]] = None,
+                         types: Tuple[str, ...] = ("string", "plurals", "array")) -> Dict[str, List[str]]:
+    """
+    Extract text resources of every locale directly from the APK.
+
+    Args:
+        apk_path: Path to the APK file
+        locales: Only these locales ('' is the default); all when None
+        types: Resource types to include
+
+    Returns:
+        Dictionary mapping locale ('' for default) to its sorted, unique strings
+    """
+    parser = ArscParser.from_apk(apk_path)
+    by_locale: Dict[str, Set[str]] = {}
+    for resource in parser.iter_strings(locales):
+        if resource.type in types and resource.value.strip():
+            by_locale.setdefault(resource.locale, set()).add(resource.value.strip())
+    return {locale: sorted(values) for locale, values in sorted(by_locale.items())}
@@ -0,0 +1,155 @@
+# async_unpacker.py
+
+import os
+import signal
+import asyncio
+import logging
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Deque, Iterable, List, Optional, Tuple, Union
+
+from unpacker import (DecodeProfile, FULL, UnpackError, apktool_command, apktool_timeout, check_decoded,
+                      find_apktool, prepare_out_dir, extract_manifest)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_JVMS = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+# stderr lines kept for the error message of a failed decode
+STDERR_TAIL_LINES = 20
+
+async def unpack_apk_async(apk_path: str, out_dir: Optional[str] = None, profile: DecodeProfile = FULL,
+                           semaphore: Optional[asyncio.Semaphore] = None, timeout: Optional[float] = None,
+                           on_stderr: Optional[Callable[[str], None]] = None) -> str:
+    """
+    asyncio variant of unpack_apk.
+
+    Args:
+        apk_path: APK to decode
+        out_dir: Output directory (default: <tempdir>/<apk name>)
+        profile: What apktool decodes (see DecodeProfile)
+        semaphore: Limits concurrent JVMs; held only while apktool runs
+        timeout: Seconds before apktool is killed (default: apktool_timeout(apk_path))
+        on_stderr: Called with each stderr line as it arrives
+
+    Returns:
+        The decompiled directory
+
+    Raises:
+        UnpackError: On any failure, including the timeout
+        asyncio.CancelledError: If cancelled; apktool is killed and reaped first
+    """
+    if not profile.runs_apktool:
+        return extract_manifest(apk_path, out_dir)
+    apktool_cmd = find_apktool()
+    if not apktool_cmd:
+        raise UnpackError("apktool executable not found. Please install apktool and add it to your PATH.")
+    out_dir = await asyncio.to_thread(prepare_out_dir, apk_path, out_dir)  # rmtree off the event loop
+    if timeout is None:
+        timeout = apktool_timeout(apk_path)
+
+    async with semaphore or nullcontext():
+        return await _run_apktool(apktool_command(apktool_cmd, apk_path, out_dir, profile), out_dir,
+                                  timeout, on_stderr)
+
+async def _run_apktool(cmd: List[str], out_dir: str, timeout: float,
+                       on_stderr: Optional[Callable[[str], None]]) -> str:
+    try:
+        # New session on POSIX: the apktool wrapper script starts java as a child, and
+        # killing the process group takes the JVM down with it
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, start_new_session=(os.name == "posix"))
+    except OSError as e:
+        raise UnpackError(f"Failed to invoke apktool: {e}")
+
+    stderr_tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+
+    async def read_stderr():
+        async for line in process.stderr:
+            text = line.decode(errors="ignore").rstrip()
+            stderr_tail.append(text)
+            if on_stderr is not None:
+                on_stderr(text)
+
+    async def read_stdout():
+        async for line in process.stdout:
+            logger.debug(f"apktool: {line.decode(errors='ignore').rstrip()}")
+
+    async def communicate():
+        # Empty input answers apktool.bat's "press any key" prompt on Windows
+        process.stdin.write(b"\n")
+        try:
+            await process.stdin.drain()
+        except ConnectionError:
+            pass
+        process.stdin.close()
+        await asyncio.gather(read_stdout(), read_stderr())
+        return await process.wait()
+
+    try:
+        returncode = await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        await _kill(process)
+        raise UnpackError(f"apktool timed out after {timeout:.0f} seconds")
+    except asyncio.CancelledError:
+        await asyncio.shield(_kill(process))
+        raise
+
+    if returncode != 0:
+        stderr_text = "\n".join(stderr_tail).strip()
+        raise UnpackError(f"apktool failed with code {returncode}: {stderr_text}")
+    return check_decoded(out_dir)
+
+async def _kill(process: asyncio.subprocess.Process):
+    """Kill apktool (and its JVM) and reap it."""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    await process.wait()
+
+UnpackResult = Tuple[str, Union[str, UnpackError]]
+
+async def unpack_many_async(jobs: Iterable[Tuple[str, Optional[str]]], profile: DecodeProfile = FULL,
+                            max_concurrent: int = DEFAULT_MAX_JVMS,
+                            timeout: Optional[float] = None) -> List[UnpackResult]:
+    """
+    Decode many APKs with at most max_concurrent apktool JVMs at a time.
+
+    Args:
+        jobs: (apk_path, out_dir) pairs; out_dir may be None for the default
+        profile: Decode profile for every APK
+        max_concurrent: Concurrent apktool processes
+        timeout: Fixed timeout per APK (default: adaptive, see apktool_timeout)
+
+    Returns:
+        (apk_path, decompiled directory or UnpackError) per job, in job order.
+        Cancelling the call kills every running apktool.
+    """
+    if max_concurrent < 1:
+        raise ValueError("max_concurrent must be at least 1")
+    semaphore = asyncio.Semaphore(max_concurrent)
+    jobs = list(jobs)
+
+    async def run(apk_path: str, out_dir: Optional[str]) -> UnpackResult:
+        try:
+            return apk_path, await unpack_apk_async(apk_path, out_dir, profile, semaphore, timeout)
+        except UnpackError as e:
+            logger.error(f"Unpacking {apk_path} failed: {e}")
+            return apk_path, e
+
+    tasks = [asyncio.ensure_future(run(apk_path, out_dir)) for apk_path, out_dir in jobs]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,168 @@
+# axml_parser.py
+
+import struct
+import zipfile
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+
+from arsc_parser import StringPool
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+
+# Chunk types of the binary XML format (ResourceTypes.h)
+RES_XML_TYPE = 0x0003
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_END_ELEMENT_TYPE = 0x0103
+
+NO_INDEX = 0xFFFFFFFF
+
+# Res_value data types
+TYPE_REFERENCE = 0x01
+TYPE_ATTRIBUTE = 0x02
+TYPE_STRING = 0x03
+TYPE_FLOAT = 0x04
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+TYPE_INT_BOOLEAN = 0x12
+
+# Framework attribute IDs (android.R.attr) of the attributes parse_manifest reads.
+# Android resolves attributes by ID, so obfuscated manifests may blank or fake
+# the name strings; these IDs take precedence over the names.
+ANDROID_ATTRIBUTES: Dict[int, str] = {
+    0x01010001: "label",
+    0x01010002: "icon",
+    0x01010003: "name",
+    0x01010006: "permission",
+    0x01010009: "protectionLevel",
+    0x0101000e: "enabled",
+    0x0101000f: "debuggable",
+    0x01010010: "exported",
+    0x01010011: "process",
+    0x01010018: "authorities",
+    0x0101001c: "priority",
+    0x01010026: "mimeType",
+    0x01010027: "scheme",
+    0x01010028: "host",
+    0x0101002a: "path",
+    0x0101020c: "minSdkVersion",
+    0x0101021b: "versionCode",
+    0x0101021c: "versionName",
+    0x01010270: "targetSdkVersion",
+    0x01010271: "maxSdkVersion",
+    0x01010272: "testOnly",
+    0x01010280: "allowBackup",
+    0x0101035a: "largeHeap",
+    0x010104ea: "extractNativeLibs",
+    0x010104ec: "usesCleartextTraffic",
+    0x01010527: "networkSecurityConfig",
+}
+
+# Base protection levels (the low 4 bits; the rest are flags such as "privileged")
+PROTECTION_LEVELS = {0: "normal", 1: "dangerous", 2: "signature", 3: "signatureOrSystem"}
+
+class AxmlError(Exception):
+    """Raised when a binary XML document is missing or malformed."""
+    pass
+
+def is_axml(data: bytes) -> bool:
+    """True if data starts with a binary XML chunk header."""
+    return len(data) >= 8 and struct.unpack_from("<HH", data, 0) == (RES_XML_TYPE, 8)
+
+def read_apk_manifest(apk_path: str) -> bytes:
+    """Read the binary AndroidManifest.xml straight out of the APK zip."""
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            return apk.read("AndroidManifest.xml")
+    except KeyError:
+        raise AxmlError(f"No AndroidManifest.xml in {apk_path}")
+    except (OSError, zipfile.BadZipFile) as e:
+        raise AxmlError(f"Cannot read {apk_path}: {e}")
+
+def _format_value(attribute: str, data_type: int, data: int, strings: StringPool) -> str:
+    """Render a typed Res_value as text (references as @7F020000, like androguard)."""
+    if data_type == TYPE_STRING:
+        return strings[data] if data < len(strings) else ""
+    if data_type == TYPE_INT_BOOLEAN:
+        return "true" if data else "false"
+    if data_type == TYPE_INT_DEC:
+        return str(struct.unpack("<i", struct.pack("<I", data))[0])
+    if data_type == TYPE_INT_HEX:
+        if attribute == "protectionLevel" and data in PROTECTION_LEVELS:
+            return PROTECTION_LEVELS[data]
+        return f"0x{data:x}"
+    if data_type == TYPE_REFERENCE:
+        return f"@{data:08X}"
+    if data_type == TYPE_ATTRIBUTE:
+        return f"?{data:08X}"
+    if data_type == TYPE_FLOAT:
+        return repr(struct.unpack("<f", struct.pack("<I", data))[0])
+    return f"0x{data:x}"
+
+def iter_axml_events(data: bytes) -> Iterator[Tuple[str, str, Optional[Dict[str, str]]]]:
+    """
+    Stream ("start", tag, attributes) and ("end", tag, None) events of a binary XML document.
+
+    Attribute keys use lxml's Clark notation ("{namespace}name"), so the
+    events can be consumed like those of etree.iterparse.
+
+    Raises:
+        AxmlError: If data is not binary XML
+    """
+    view = memoryview(data)
+    if not is_axml(data):
+        raise AxmlError("Not a binary XML document")
+    end = min(struct.unpack_from("<I", view, 4)[0], len(data))
+    strings: Optional[StringPool] = None
+    resource_ids: Tuple[int, ...] = ()
+
+    offset = 8
+    while offset + 8 <= end:
+        chunk_type, header_size, size = struct.unpack_from("<HHI", view, offset)
+        if size < 8 or offset + size > end:
+            logger.warning(f"Malformed chunk at offset {offset} in binary XML, stopping")
+            break
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = StringPool(view, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            resource_ids = struct.unpack_from(f"<{(size - header_size) // 4}I", view, offset + header_size)
+        elif chunk_type in (RES_XML_START_ELEMENT_TYPE, RES_XML_END_ELEMENT_TYPE):
+            if strings is None:
+                raise AxmlError("Element before the string pool")
+            ext = offset + header_size
+            tag = strings[struct.unpack_from("<I", view, ext + 4)[0]]
+            if chunk_type == RES_XML_END_ELEMENT_TYPE:
+                yield "end", tag, None
+            else:
+                yield "start", tag, _attributes(view, ext, strings, resource_ids)
+        offset += size
+
+def _attributes(view: memoryview, ext: int, strings: StringPool, resource_ids: Tuple[int, ...]) -> Dict[str, str]:
+    attribute_start, attribute_size, attribute_count = struct.unpack_from("<HHH", view, ext + 8)
+    attributes: Dict[str, str] = {}
+    pos = ext + attribute_start
+    for _ in range(attribute_count):
+        ns_index, name_index, raw_index, _value_size, _res0, data_type, data = \
+            struct.unpack_from("<IIIHBBI", view, pos)
+        pos += attribute_size
+
+        resource_id = resource_ids[name_index] if name_index < len(resource_ids) else None
+        if resource_id in ANDROID_ATTRIBUTES:
+            name = ANDROID_ATTRIBUTES[resource_id]
+            namespace = ANDROID_NS
+        else:
+            name = strings[name_index] if name_index < len(strings) else ""
+            namespace = strings[ns_index] if ns_index != NO_INDEX and ns_index < len(strings) else ""
+            if not name:
+                continue
+        if raw_index != NO_INDEX and raw_index < len(strings):
+            value = strings[raw_index]
+        else:
+            value = _format_value(name, data_type, data, strings)
+        attributes[f"{{{namespace}}}{name}" if namespace else name] = value
+    return attributes
@@ -0,0 +1,161 @@
+# decompile_cache.py
+
+import os
+import re
+import glob
+import logging
+import tarfile
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from unpacker import DecodeProfile, compute_sha256
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MB = 10240
+# Smali compresses well even at the fastest level; higher levels mostly cost time
+COMPRESS_LEVEL = 1
+ARCHIVE_SUFFIX = ".tar.gz"
+
+MB = 1024 * 1024
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._+-]", "_", value)
+
+class DecompileCache:
+    """
+    Persistent cache of apktool output, one compressed tar per decode.
+
+    Entries are keyed by the APK's SHA-256, the version of the apktool that
+    decodes (as reported by the decode backend, see SubprocessDecoder) and
+    the decode profile, so upgrading apktool or decoding more of the APK
+    never reuses a stale tree. A hit extracts the archive into the
+    workspace instead of starting the JVM. The cache is bounded to max_mb: after each
+    store the least recently used archives (by mtime, refreshed on every
+    hit) are deleted.
+
+    Archives are written to a temporary file and renamed into place, so
+    concurrent workers (or processes) sharing the directory never read a
+    partial entry. Cache failures are logged and treated as misses.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: int = DEFAULT_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * MB
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, apk_path: str, profile: DecodeProfile, version: str, sha256: Optional[str] = None) -> str:
+        """
+        Cache key of decoding apk_path with profile under apktool version.
+        Pass sha256 when the caller already hashed the APK.
+        """
+        return f"{sha256 or compute_sha256(apk_path)}.{_slug(version)}.{_slug(profile.name)}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ARCHIVE_SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def get(self, key: str, dest: str) -> bool:
+        """
+        Extract the cached tree for key into dest.
+
+        Returns:
+            True on a hit, False on a miss (dest may then hold a partial tree)
+        """
+        path = self._path(key)
+        try:
+            with tarfile.open(path, "r:gz") as archive:
+                _extract(archive, dest)
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self._count(hit=False)
+            return False
+        except (OSError, EOFError, tarfile.TarError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            _remove(path)
+            self._count(hit=False)
+            return False
+        self._count(hit=True)
+        logger.info(f"Decompiled tree restored from cache ({key})")
+        return True
+
+    def put(self, key: str, src_dir: str) -> Optional[str]:
+        """Store the tree under src_dir for key, then evict down to max_mb. Returns the archive path."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=ARCHIVE_SUFFIX, dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f, \
+                    tarfile.open(fileobj=f, mode="w:gz", compresslevel=COMPRESS_LEVEL) as archive:
+                archive.add(src_dir, arcname=".")
+            os.replace(tmp_path, path)
+        except (OSError, tarfile.TarError) as e:
+            logger.warning(f"Could not cache {src_dir}: {e}")
+            _remove(tmp_path)
+            return None
+        self.evict()
+        return path
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """(path, size, last use) of every archive, least recently used first."""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*" + ARCHIVE_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> int:
+        """Delete least recently used archives until the cache fits max_mb. Returns the number deleted."""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} decompile cache entries ({total // MB} MB left)")
+        return removed
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+def _extract(archive: tarfile.TarFile, dest: str):
+    if hasattr(tarfile, "data_filter"):
+        archive.extractall(dest, filter="data")
+        return
+    # Older Pythons: refuse members that would escape dest
+    root = os.path.realpath(dest)
+    for member in archive.getmembers():
+        target = os.path.realpath(os.path.join(root, member.name))
+        if not (member.isfile() or member.isdir()) or os.path.commonpath([root, target]) != root:
+            raise tarfile.TarError(f"Unsafe member in cache archive: {member.name}")
+    archive.extractall(dest)
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Failed to remove {path}: {e}")
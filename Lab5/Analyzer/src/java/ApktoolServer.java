@@ -0,0 +1,74 @@
+// ApktoolServer.java
+//
+// Keeps one apktool JVM warm for many decodes. Started by apktool_server.py as
+//   java -cp apktool.jar ApktoolServer.java
+// (single-file source launcher, JDK 11+). Protocol on stdin/stdout, one line each:
+//   request:  apktool arguments separated by tabs, e.g. "d\t-f\t-o\t<out>\t<apk>"
+//   response: "DONE\t<exit status>\t<error or empty>"
+// "READY" is printed once at start-up. apktool's own output goes to stderr.
+
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+
+public class ApktoolServer {
+
+    static class ExitTrap extends SecurityException {
+        final int status;
+
+        ExitTrap(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    public static void main(String[] argv) throws Exception {
+        PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        System.setOut(System.err);
+        trapExit();
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        protocol.println("READY");
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            int status = 0;
+            String error = "";
+            try {
+                brut.apktool.Main.main(line.split("\t", -1));
+            } catch (ExitTrap e) {
+                status = e.status;
+            } catch (Throwable t) {
+                status = 1;
+                error = String.valueOf(t);
+            }
+            System.err.flush();
+            protocol.println("DONE\t" + status + "\t" + error.replace('\n', ' ').replace('\t', ' '));
+        }
+    }
+
+    // apktool calls System.exit on errors; turn that into an exception so the JVM survives.
+    // JDK 18+ only allows this with -Djava.security.manager=allow, which the client passes.
+    @SuppressWarnings("removal")
+    static void trapExit() {
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkPermission(java.security.Permission permission) {
+                }
+
+                @Override
+                public void checkExit(int status) {
+                    throw new ExitTrap(status);
+                }
+            });
+        } catch (UnsupportedOperationException e) {
+            System.err.println("ApktoolServer: cannot trap System.exit, a failing decode ends the server");
+        }
+    }
+}
@@ -0,0 +1,25 @@
+# lab8_common.py
+
+import os
+import importlib.util
+from types import ModuleType
+
+# Modules this analyser shares with Lab 8 (the results database schema, the
+# compact report codec) are defined once, in Lab 8's scripts/common. Lab 8 is
+# not an installed package, so they are loaded from their path in the
+# repository; they depend on the standard library only.
+LAB8_COMMON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "Lab 8",
+                                               "malware-lab", "scripts", "common"))
+
+def common_module_path(name: str) -> str:
+    return os.path.join(LAB8_COMMON_DIR, f"{name}.py")
+
+def load_common_module(name: str) -> ModuleType:
+    """Load scripts/common/<name>.py of Lab 8; raises ImportError if it is missing."""
+    path = common_module_path(name)
+    if not os.path.isfile(path):
+        raise ImportError(f"Lab 8 module {name} not found at {path}")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -1,9 +1,15 @@
 import os
+import re
+import struct
+import zipfile
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from lxml import etree
 
+from arsc_parser import ArscError, ArscParser
+from axml_parser import ANDROID_NS, AxmlError, is_axml, iter_axml_events, read_apk_manifest
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -44,12 +50,200 @@ class ManifestData:
         if self.custom_attributes is None:
             self.custom_attributes = {}
 
+ANDROID_ATTR = f"{{{ANDROID_NS}}}"
+
+# Component tags in the order parse_manifest reports them
+COMPONENT_TYPES = ("activity", "service", "receiver", "provider")
+
+# A binary manifest's unresolved reference ('@7F0A0008') or attribute ('?7F010000')
+RAW_REFERENCE_RE = re.compile(r"^([@?])([0-9A-F]{8})$")
+
+class _ManifestBuilder:
+    """
+    Builds ManifestData from one pass over ("start"/"end", tag, attributes) events.
+
+    Components, permissions and intent filters are classified as their start
+    tags arrive, so the same builder works on lxml's iterparse/iterwalk
+    events and on the binary AXML events from axml_parser.
+    """
+
+    def __init__(self):
+        self.package_name: Optional[str] = None
+        self.version_code = 0
+        self.version_name = ""
+        self.min_sdk = 0
+        self.target_sdk = 0
+        self.debuggable = False
+        self.allow_backup = True
+        self.custom_attributes: Dict[str, Any] = {}
+        self.permissions: List[Permission] = []
+        self.components: List[Component] = []
+        self._seen_application = False
+        self._seen_sdk = False
+        self._component: Optional[Component] = None
+        self._component_depth = 0
+        self._exported_attr: Optional[str] = None
+        self._intent_filter: Optional[Dict[str, List[str]]] = None
+        self._depth = 0
+
+    def start(self, tag: str, attrib: Dict[str, str]):
+        self._depth += 1
+
+        def android(name):
+            return attrib.get(ANDROID_ATTR + name)
+
+        if tag == "manifest" and self._depth == 1:
+            self.package_name = attrib.get("package")
+            if android("versionCode"):
+                self.version_code = int(android("versionCode"))
+            if android("versionName"):
+                self.version_name = android("versionName")
+        elif tag == "application" and not self._seen_application:
+            self._seen_application = True
+            debuggable_attr = android("debuggable")
+            backup_attr = android("allowBackup")
+            self.debuggable = debuggable_attr == "true" if debuggable_attr else False
+            self.allow_backup = backup_attr != "false" if backup_attr else True
+            # Store any other interesting application attributes
+            for key, value in attrib.items():
+                if key not in (ANDROID_ATTR + "debuggable", ANDROID_ATTR + "allowBackup"):
+                    self.custom_attributes[key.replace(ANDROID_ATTR, "")] = value
+        elif tag == "uses-sdk" and not self._seen_sdk:
+            self._seen_sdk = True
+            if android("minSdkVersion"):
+                self.min_sdk = int(android("minSdkVersion"))
+            if android("targetSdkVersion"):
+                self.target_sdk = int(android("targetSdkVersion"))
+        elif tag == "uses-permission":
+            if android("name"):
+                self.permissions.append(Permission(name=android("name")))
+        elif tag == "permission":
+            if android("name"):
+                self.permissions.append(Permission(name=android("name"),
+                                                   protection_level=android("protectionLevel")))
+        elif tag in COMPONENT_TYPES and self._component is None:
+            name = android("name")
+            if name:
+                self._component = Component(name=name, type=tag, permission=android("permission"))
+                self._component_depth = self._depth
+                self._exported_attr = android("exported")
+        elif tag == "intent-filter" and self._component is not None and self._intent_filter is None:
+            self._intent_filter = {"actions": [], "categories": [], "data": []}
+            self._component.intent_filters.append(self._intent_filter)
+        elif self._intent_filter is not None:
+            if tag == "action" and android("name"):
+                self._intent_filter["actions"].append(android("name"))
+            elif tag == "category" and android("name"):
+                self._intent_filter["categories"].append(android("name"))
+            elif tag == "data" and android("scheme"):
+                # Simplified - just get scheme
+                self._intent_filter["data"].append(f"scheme:{android('scheme')}")
+
+    def end(self, tag: str):
+        if tag == "intent-filter":
+            self._intent_filter = None
+        elif self._component is not None and self._depth == self._component_depth:
+            component = self._component
+            # By default, components with intent filters are exported
+            if self._exported_attr is not None:
+                component.exported = self._exported_attr == "true"
+            else:
+                component.exported = bool(component.intent_filters)
+            self.components.append(component)
+            self._component = None
+        self._depth -= 1
+
+    def feed(self, events: Iterable[Tuple[str, Any, Optional[Dict[str, str]]]]) -> "_ManifestBuilder":
+        for event, tag, attrib in events:
+            if not isinstance(tag, str):
+                continue  # comments and processing instructions
+            if event == "start":
+                self.start(tag, attrib)
+            else:
+                self.end(tag)
+        return self
+
+    def result(self) -> ManifestData:
+        if not self.package_name:
+            raise ValueError("Missing package name in manifest")
+        package_name = self.package_name
+        for component in self.components:
+            # Normalize name (add package prefix if needed)
+            if component.name.startswith("."):
+                component.name = package_name + component.name
+            elif "." not in component.name:
+                component.name = f"{package_name}.{component.name}"
+        # Grouped by type, document order within a type
+        components = sorted(self.components, key=lambda c: COMPONENT_TYPES.index(c.type))
+        return ManifestData(
+            package_name=package_name,
+            version_code=self.version_code,
+            version_name=self.version_name,
+            min_sdk=self.min_sdk,
+            target_sdk=self.target_sdk,
+            permissions=self.permissions,
+            components=components,
+            debuggable=self.debuggable,
+            allow_backup=self.allow_backup,
+            custom_attributes=self.custom_attributes
+        )
+
+def resolve_references(manifest: ManifestData, load_table: Callable[[], ArscParser]) -> ManifestData:
+    """
+    Replace raw resource IDs in custom_attributes ('@7F0A0008') by their
+    names from the resource table ('@style/AppTheme'), as in the manifest
+    apktool decodes. load_table is only called when there is something to
+    resolve; without a readable table the raw IDs are kept.
+    """
+    raw = {key: RAW_REFERENCE_RE.match(value) for key, value in manifest.custom_attributes.items()
+           if isinstance(value, str) and RAW_REFERENCE_RE.match(value)}
+    if not raw:
+        return manifest
+    try:
+        names = load_table().resource_names()
+    except (ArscError, OSError, struct.error, IndexError) as e:
+        logger.warning(f"Cannot resolve resource references in the manifest: {e}")
+        return manifest
+    for key, match in raw.items():
+        name = names.get(int(match.group(2), 16))
+        if name is not None:
+            manifest.custom_attributes[key] = match.group(1) + name
+    return manifest
+
+def _read_table(path: str) -> ArscParser:
+    with open(path, "rb") as f:
+        return ArscParser(f.read())
+
+def _tree_events(root) -> Iterator[Tuple[str, Any, Optional[Dict[str, str]]]]:
+    for event, elem in etree.iterwalk(root, events=("start", "end")):
+        yield event, elem.tag, elem.attrib if event == "start" else None
+
+def _iterparse_events(manifest_path: str) -> Iterator[Tuple[str, Any, Optional[Dict[str, str]]]]:
+    for event, elem in etree.iterparse(manifest_path, events=("start", "end")):
+        if event == "start":
+            yield event, elem.tag, dict(elem.attrib)
+        else:
+            yield event, elem.tag, None
+            elem.clear()  # children were already classified
+
+def _is_binary_manifest(manifest_path: str) -> bool:
+    try:
+        with open(manifest_path, "rb") as f:
+            return is_axml(f.read(8))
+    except OSError:
+        return False
+
 def parse_manifest(decompile_dir: str) -> ManifestData:
     """
     Parse the AndroidManifest.xml file in the decompiled directory.
     
+    The manifest is classified in a single walk over the tree. If
+    decompile_dir is an APK instead, the binary manifest is read straight
+    from the zip (see parse_manifest_from_apk); a binary manifest left by
+    apktool --no-res is decoded the same way.
+    
     Args:
-        decompile_dir: Path to the decompiled APK directory
+        decompile_dir: Path to the decompiled APK directory (or the APK itself)
         
     Returns:
         ManifestData object containing the parsed manifest information
@@ -58,174 +252,81 @@ def parse_manifest(decompile_dir: str) -> ManifestData:
         FileNotFoundError: If AndroidManifest.xml is not found
         ValueError: If manifest parsing fails
     """
+    if zipfile.is_zipfile(decompile_dir):
+        return parse_manifest_from_apk(decompile_dir)
+    
     manifest_path = os.path.join(decompile_dir, "AndroidManifest.xml")
     
     if not os.path.isfile(manifest_path):
         logger.error(f"AndroidManifest.xml not found at {manifest_path}")
         raise FileNotFoundError(f"AndroidManifest.xml not found at {manifest_path}")
     
+    if _is_binary_manifest(manifest_path):
+        # apktool --no-res leaves resources.arsc undecoded next to the manifest
+        with open(manifest_path, "rb") as f:
+            manifest = parse_axml_manifest(f.read())
+        return resolve_references(manifest, lambda: _read_table(os.path.join(decompile_dir, "resources.arsc")))
+    
     try:
         # Parse the XML
         logger.info(f"Parsing AndroidManifest.xml at {manifest_path}")
         tree = etree.parse(manifest_path)
-        root = tree.getroot()
-        
-        # Define namespaces
-        ns = {
-            'android': 'http://schemas.android.com/apk/res/android',
-        }
-        
-        # Extract basic app info
-        package_name = root.get('package')
-        if not package_name:
-            raise ValueError("Missing package name in manifest")
-        
-        # Default values
-        version_code = 0
-        version_name = ""
-        min_sdk = 0
-        target_sdk = 0
-        debuggable = False
-        allow_backup = True
-        custom_attributes = {}
-        
-        # Extract application attributes
-        app_node = root.find(".//application")
-        if app_node is not None:
-            debuggable_attr = app_node.get(f"{{{ns['android']}}}debuggable")
-            backup_attr = app_node.get(f"{{{ns['android']}}}allowBackup")
-            
-            debuggable = debuggable_attr == "true" if debuggable_attr else False
-            allow_backup = backup_attr != "false" if backup_attr else True
-            
-            # Store any other interesting application attributes
-            for key, value in app_node.attrib.items():
-                if key not in [f"{{{ns['android']}}}debuggable", f"{{{ns['android']}}}allowBackup"]:
-                    custom_attributes[key.replace(f"{{{ns['android']}}}", "")] = value
-        
-        # Extract version info
-        version_code_attr = root.get(f"{{{ns['android']}}}versionCode")
-        version_name_attr = root.get(f"{{{ns['android']}}}versionName")
-        
-        if version_code_attr:
-            version_code = int(version_code_attr)
-        if version_name_attr:
-            version_name = version_name_attr
-        
-        # Extract SDK info from uses-sdk
-        sdk_node = root.find(".//uses-sdk")
-        if sdk_node is not None:
-            min_sdk_attr = sdk_node.get(f"{{{ns['android']}}}minSdkVersion")
-            target_sdk_attr = sdk_node.get(f"{{{ns['android']}}}targetSdkVersion")
-            
-            if min_sdk_attr:
-                min_sdk = int(min_sdk_attr)
-            if target_sdk_attr:
-                target_sdk = int(target_sdk_attr)
-        
-        # Extract permissions
-        permissions = []
-        for perm_node in root.findall(".//uses-permission"):
-            perm_name = perm_node.get(f"{{{ns['android']}}}name")
-            if perm_name:
-                permissions.append(Permission(name=perm_name))
-        
-        # Extract permission definitions
-        for perm_def_node in root.findall(".//permission"):
-            perm_name = perm_def_node.get(f"{{{ns['android']}}}name")
-            protection_level = perm_def_node.get(f"{{{ns['android']}}}protectionLevel")
-            if perm_name:
-                permissions.append(Permission(
-                    name=perm_name, 
-                    protection_level=protection_level
-                ))
-        
-        # Extract components
-        components = []
-        
-        # Helper function to parse components
-        def parse_components(nodes, component_type):
-            for node in nodes:
-                name = node.get(f"{{{ns['android']}}}name")
-                if not name:
-                    continue
-                    
-                # Normalize name (add package prefix if needed)
-                if name.startswith("."):
-                    name = package_name + name
-                elif "." not in name:
-                    name = f"{package_name}.{name}"
-                
-                # Check if exported
-                exported_attr = node.get(f"{{{ns['android']}}}exported")
-                has_intent_filters = len(node.findall(".//intent-filter")) > 0
-                
-                # By default, components with intent filters are exported
-                exported = False
-                if exported_attr is not None:
-                    exported = exported_attr == "true"
-                elif has_intent_filters:
-                    exported = True
-                
-                # Get permission
-                permission = node.get(f"{{{ns['android']}}}permission")
-                
-                # Parse intent filters
-                intent_filters = []
-                for filter_node in node.findall(".//intent-filter"):
-                    intent_filter = {"actions": [], "categories": [], "data": []}
-                    
-                    # Get actions
-                    for action in filter_node.findall(".//action"):
-                        action_name = action.get(f"{{{ns['android']}}}name")
-                        if action_name:
-                            intent_filter["actions"].append(action_name)
-                    
-                    # Get categories
-                    for category in filter_node.findall(".//category"):
-                        category_name = category.get(f"{{{ns['android']}}}name")
-                        if category_name:
-                            intent_filter["categories"].append(category_name)
-                    
-                    # Get data (simplified - just get scheme)
-                    for data in filter_node.findall(".//data"):
-                        scheme = data.get(f"{{{ns['android']}}}scheme")
-                        if scheme:
-                            intent_filter["data"].append(f"scheme:{scheme}")
-                    
-                    intent_filters.append(intent_filter)
-                
-                components.append(Component(
-                    name=name,
-                    type=component_type,
-                    exported=exported,
-                    permission=permission,
-                    intent_filters=intent_filters
-                ))
-        
-        # Parse each component type
-        parse_components(root.findall(".//activity"), "activity")
-        parse_components(root.findall(".//service"), "service")
-        parse_components(root.findall(".//receiver"), "receiver")
-        parse_components(root.findall(".//provider"), "provider")
-        
-        # Create and return the manifest data
-        return ManifestData(
-            package_name=package_name,
-            version_code=version_code,
-            version_name=version_name,
-            min_sdk=min_sdk,
-            target_sdk=target_sdk,
-            permissions=permissions,
-            components=components,
-            debuggable=debuggable,
-            allow_backup=allow_backup,
-            custom_attributes=custom_attributes
-        )
+        return _ManifestBuilder().feed(_tree_events(tree.getroot())).result()
         
     except etree.XMLSyntaxError as e:
         logger.error(f"XML parsing error: {e}")
         raise ValueError(f"Failed to parse manifest XML: {e}")
     except Exception as e:
         logger.error(f"Error parsing manifest: {e}")
-        raise ValueError(f"Error parsing manifest: {e}")
\ No newline at end of file
+        raise ValueError(f"Error parsing manifest: {e}")
+
+def iterparse_manifest(manifest_path: str) -> ManifestData:
+    """
+    Parse a text AndroidManifest.xml with etree.iterparse, without keeping the tree.
+    
+    Raises:
+        ValueError: If manifest parsing fails
+    """
+    try:
+        return _ManifestBuilder().feed(_iterparse_events(manifest_path)).result()
+    except (OSError, etree.XMLSyntaxError) as e:
+        logger.error(f"XML parsing error: {e}")
+        raise ValueError(f"Failed to parse manifest XML: {e}")
+
+def parse_axml_manifest(data: bytes) -> ManifestData:
+    """
+    Parse a binary (AXML) AndroidManifest.xml.
+    
+    Raises:
+        ValueError: If the document is not valid binary XML
+    """
+    try:
+        return _ManifestBuilder().feed(iter_axml_events(data)).result()
+    except (AxmlError, struct.error, IndexError) as e:
+        logger.error(f"Binary XML parsing error: {e}")
+        raise ValueError(f"Failed to parse binary manifest: {e}")
+
+def parse_manifest_from_apk(apk_path: str) -> ManifestData:
+    """
+    Parse the binary AndroidManifest.xml straight from the APK zip, no apktool needed.
+    
+    Resource references in custom_attributes are resolved through the
+    APK's resources.arsc (see resolve_references).
+    
+    Args:
+        apk_path: Path to the APK file
+        
+    Returns:
+        ManifestData object containing the parsed manifest information
+        
+    Raises:
+        FileNotFoundError: If the APK has no AndroidManifest.xml
+        ValueError: If manifest parsing fails
+    """
+    logger.info(f"Parsing binary AndroidManifest.xml from {apk_path}")
+    try:
+        data = read_apk_manifest(apk_path)
+    except AxmlError as e:
+        logger.error(str(e))
+        raise FileNotFoundError(str(e))
+    return resolve_references(parse_axml_manifest(data), lambda: ArscParser.from_apk(apk_path))
@@ -2,8 +2,10 @@
 
 import os
 import logging
-from typing import List, Dict, Optional, NamedTuple
-import re
+from typing import List, Dict, Optional, NamedTuple, Pattern
+
+from patterns import REGISTRY
+from smali_walker import PackageFilter, find_smali_dirs, map_smali_dirs, walk_smali
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -71,12 +73,15 @@ def list_native_libs(decompile_dir: str) -> List[NativeLibInfo]:
     
     return results
 
-def analyze_native_function_usage(decompile_dir: str) -> Dict[str, int]:
+def analyze_native_function_usage(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                                  max_workers: Optional[int] = None) -> Dict[str, int]:
     """
     Analyze how often each native library is referenced in code.
     
     Args:
         decompile_dir: Path to the decompiled APK directory
+        package_filter: Optional PackageFilter limiting which packages are scanned
+        max_workers: Maximum number of smali directories scanned in parallel
         
     Returns:
         Dictionary mapping library names to reference counts
@@ -91,48 +96,48 @@ def analyze_native_function_usage(decompile_dir: str) -> Dict[str, int]:
     # Create a dictionary of library base names (without .so extension)
     lib_names = {os.path.splitext(lib.name)[0]: lib.name for lib in libraries}
     
-    # Pattern to find System.loadLibrary calls
-    load_library_pattern = re.compile(r'const-string [^,]+, "([^"\\]*(?:\\.[^"\\]*)*)"[^\n]*?\n.*?invoke-static[^\n]*?System;->loadLibrary')
-    
-    # Search through smali files for references
-    smali_dirs = [os.path.join(decompile_dir, "smali")]
-    
-    # Check for multidex
-    for i in range(2, 10):
-        additional_dir = os.path.join(decompile_dir, f"smali_classes{i}")
-        if os.path.isdir(additional_dir):
-            smali_dirs.append(additional_dir)
-    
     # Initialize counts for all libraries
     for lib_name in lib_names.values():
         usage_counts[lib_name] = 0
     
+    # Search through every smali directory (one per DEX file) for references
+    smali_dirs = find_smali_dirs(decompile_dir)
+    # Resolved here, not in the workers, so config-loaded patterns reach worker processes
+    load_library_pattern = REGISTRY.get("smali", "load_library")
+    for dir_counts in map_smali_dirs(_count_library_loads, smali_dirs, lib_names, package_filter,
+                                     load_library_pattern, max_workers=max_workers):
+        for lib_name, count in dir_counts.items():
+            usage_counts[lib_name] += count
+    
+    return usage_counts
+
+def _count_library_loads(smali_dir: str, lib_names: Dict[str, str],
+                         package_filter: Optional[PackageFilter] = None,
+                         load_library_pattern: Optional[Pattern] = None) -> Dict[str, int]:
+    """Count System.loadLibrary calls in one smali directory; runs as one parallel work unit."""
+    usage_counts: Dict[str, int] = {lib_name: 0 for lib_name in lib_names.values()}
+    
+    # Pattern to find System.loadLibrary calls
+    if load_library_pattern is None:
+        load_library_pattern = REGISTRY.get("smali", "load_library")
+    
     # Scan smali files for library loading
-    for smali_dir in smali_dirs:
-        if not os.path.isdir(smali_dir):
-            continue
-            
-        for root, _, files in os.walk(smali_dir):
-            for file in files:
-                if not file.endswith(".smali"):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        # Look for System.loadLibrary calls
-                        for match in load_library_pattern.finditer(content):
-                            lib_name = match.group(1)
-                            
-                            # Check if this is one of our libraries
-                            if lib_name in lib_names:
-                                usage_counts[lib_names[lib_name]] += 1
-                            elif f"{lib_name}.so" in lib_names.values():
-                                usage_counts[f"{lib_name}.so"] += 1
+    for file_path in walk_smali(smali_dir, package_filter):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
                 
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+                # Look for System.loadLibrary calls
+                for match in load_library_pattern.finditer(content):
+                    lib_name = match.group(1)
+                    
+                    # Check if this is one of our libraries
+                    if lib_name in lib_names:
+                        usage_counts[lib_names[lib_name]] += 1
+                    elif f"{lib_name}.so" in lib_names.values():
+                        usage_counts[f"{lib_name}.so"] += 1
+        
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
     
     return usage_counts
\ No newline at end of file
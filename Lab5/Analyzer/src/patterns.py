@@ -0,0 +1,134 @@
+# patterns.py
+
+import re
+import json
+import logging
+from typing import Dict, Pattern, Union
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Default regex sources, grouped by the detector that uses them.
+# Config files may add patterns to a group (or add new groups), see load_pattern_config.
+DEFAULT_PATTERNS: Dict[str, Dict[str, str]] = {
+    # Java reflection API methods
+    "reflection": {
+        "Class.forName": r'invoke-static {[^}]*}, Ljava/lang/Class;->forName\(Ljava/lang/String;\)Ljava/lang/Class;',
+        "Class.getDeclaredMethod": r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getDeclaredMethod\(Ljava/lang/String;',
+        "Class.getMethod": r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getMethod\(Ljava/lang/String;',
+        "getDeclaredField": r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getDeclaredField\(Ljava/lang/String;\)',
+        "getField": r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getField\(Ljava/lang/String;\)',
+        "Method.invoke": r'invoke-virtual {[^}]*}, Ljava/lang/reflect/Method;->invoke\(Ljava/lang/Object;\[Ljava/lang/Object;\)Ljava/lang/Object;',
+        "Constructor.newInstance": r'invoke-virtual {[^}]*}, Ljava/lang/reflect/Constructor;->newInstance\(',
+    },
+    # Dynamic class loading
+    "dynamic_loading": {
+        "DexClassLoader": r'new-instance [^,]+, Ldalvik/system/DexClassLoader;',
+        "PathClassLoader": r'new-instance [^,]+, Ldalvik/system/PathClassLoader;',
+        "InMemoryDexClassLoader": r'new-instance [^,]+, Ldalvik/system/InMemoryDexClassLoader;',
+        "ClassLoader.loadClass": r'invoke-virtual {[^}]*}, Ljava/lang/ClassLoader;->loadClass\(Ljava/lang/String;\)Ljava/lang/Class;',
+    },
+    # Native method declarations and JNI calls
+    "native": {
+        "native method": r'\.method.* native ',
+        "System.loadLibrary": r'invoke-static {[^}]*}, Ljava/lang/System;->loadLibrary\(Ljava/lang/String;\)V',
+        "System.load": r'invoke-static {[^}]*}, Ljava/lang/System;->load\(Ljava/lang/String;\)V',
+    },
+    # Sensitive values in smali string literals
+    "strings": {
+        "URL": r'"https?://[^\s"\']+',
+        "IP": r'"(?:\d{1,3}\.){3}\d{1,3}"',
+        "API_KEY": r'"[A-Za-z0-9_-]{20,}"',  # Possible API keys
+        "AWS_KEY": r'"[A-Z0-9]{20}"',  # AWS access keys
+        "FIREBASE": r'"[A-Za-z0-9_-]{28}\.[A-Za-z0-9_-]{22}"',  # Firebase URLs
+    },
+    # Categories of string_ranker, tried in this order on bare (unquoted) strings
+    "ranking": {
+        "url": r'^[A-Za-z][A-Za-z0-9+.-]*://[^\s/$.?#][^\s]*$',
+        "ip": r'(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.])',
+        "key": r'^(?:AKIA|ASIA)[A-Z0-9]{16}$|^AIza[0-9A-Za-z_-]{35}$',
+        "token": r'^[A-Za-z0-9_-]{20,}$',
+        "base64": r'^(?:[A-Za-z0-9+/]{4}){4,}(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?$',
+    },
+    # Smali syntax helpers
+    "smali": {
+        "class_name": r'\.class.*?(L[^;]+;)',
+        "const_string": r'const-string [^,]+, "([^"\\]*(?:\\.[^"\\]*)*)"',
+        "load_library": r'const-string [^,]+, "([^"\\]*(?:\\.[^"\\]*)*)"[^\n]*?\n.*?invoke-static[^\n]*?System;->loadLibrary',
+        "digit_dot_run": r'"\d{1,3}\.\d',  # cheap prefilter for the IP pattern
+        "const_string_line": r'const-string[^\n]*',
+        "field_literal_line": r'\.field [^\n]*= "[^\n]*',  # static final String initialisers
+    },
+}
+
+class PatternRegistry:
+    """
+    Compiled regex tables shared by the detectors.
+
+    Every pattern is compiled once, when it is registered. Detectors look up
+    whole groups (e.g. "reflection") instead of building their own tables on
+    every call.
+    """
+
+    def __init__(self, sources: Dict[str, Dict[str, str]] = None):
+        self._groups: Dict[str, Dict[str, Pattern]] = {}
+        for group, patterns in (sources or {}).items():
+            for name, regex in patterns.items():
+                self.register(group, name, regex)
+
+    def register(self, group: str, name: str, regex: Union[str, Pattern]):
+        """
+        Compile and add (or replace) one pattern.
+
+        Raises:
+            ValueError: If the regex does not compile
+        """
+        try:
+            compiled = regex if isinstance(regex, re.Pattern) else re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern {group}/{name}: {e}")
+        self._groups.setdefault(group, {})[name] = compiled
+
+    def group(self, group: str) -> Dict[str, Pattern]:
+        """Return the compiled patterns of a group (empty if the group is unknown)."""
+        return self._groups.get(group, {})
+
+    def get(self, group: str, name: str) -> Pattern:
+        """Return one compiled pattern; raises KeyError if it is not registered."""
+        return self._groups[group][name]
+
+    def groups(self) -> Dict[str, Dict[str, Pattern]]:
+        return self._groups
+
+# Module-level registry used by all detectors
+REGISTRY = PatternRegistry(DEFAULT_PATTERNS)
+
+def load_pattern_config(config_path: str, registry: PatternRegistry = REGISTRY) -> int:
+    """
+    Add the patterns of a JSON config file to the registry.
+
+    The file maps group names to {pattern name: regex} objects, e.g.
+    {"dynamic_loading": {"BaseDexClassLoader": "new-instance [^,]+, Ldalvik/system/BaseDexClassLoader;"}}
+
+    Returns:
+        Number of patterns registered
+
+    Raises:
+        ValueError: If the file is malformed or a regex does not compile
+    """
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Cannot read pattern config {config_path}: {e}")
+
+    if not isinstance(config, dict) or not all(isinstance(v, dict) for v in config.values()):
+        raise ValueError(f"Pattern config {config_path} must map group names to {{name: regex}} objects")
+
+    count = 0
+    for group, patterns in config.items():
+        for name, regex in patterns.items():
+            registry.register(group, name, regex)
+            count += 1
+    logger.info(f"Loaded {count} pattern(s) from {config_path}")
+    return count
@@ -0,0 +1,204 @@
+# pipeline.py
+
+import os
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNPACK_WORKERS = 2
+DEFAULT_DETECTOR_WORKERS = 2
+DEFAULT_MIN_FREE_MB = 2048
+DISK_POLL_SECONDS = 0.5
+
+_DONE = object()
+
+@dataclass
+class BatchItem:
+    """Outcome of one sample in the pipeline."""
+    apk_path: str
+    report: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    unpack_seconds: float = 0.0
+    analyse_seconds: float = 0.0
+
+@dataclass
+class PipelineStats:
+    samples: int = 0
+    failed: int = 0
+    unpack_seconds: float = 0.0
+    analyse_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    max_ready: int = 0          # most decoded directories waiting for a detector
+    disk_waits: int = 0         # times an apktool worker paused for disk space
+    errors: List[str] = field(default_factory=list)
+
+def free_bytes(path: str) -> int:
+    """Free disk space of the file system holding path."""
+    return shutil.disk_usage(path).free
+
+class AnalysisPipeline:
+    """
+    Two-stage batch pipeline: apktool decoding overlapped with the detectors.
+
+    unpack_workers threads run unpack(apk_path) -> decompile_dir (apktool is
+    an external JVM, so threads are enough) and hand the decoded
+    directories to a bounded queue. detector_workers threads take them off
+    the queue and run analyse(apk_path, decompile_dir) -> report, whose
+    smali scans fan out to process pools (see map_smali_dirs, which starts
+    them with forkserver rather than forking these threads); cleanup
+    (decompile_dir) runs after each analysis.
+
+    Backpressure keeps decoding from running ahead of the detectors:
+    - at most queue_size decoded directories wait in the queue (default:
+      detector_workers), so an apktool worker blocks once it is full;
+    - a new decode only starts while work_dir has min_free_mb free. With
+      no directory in flight the decode starts anyway, so a nearly full
+      disk slows the batch down instead of stalling it.
+    """
+
+    def __init__(self, unpack: Callable[[str], str], analyse: Callable[[str, str], Dict[str, Any]],
+                 cleanup: Callable[[str], None], unpack_workers: int = DEFAULT_UNPACK_WORKERS,
+                 detector_workers: int = DEFAULT_DETECTOR_WORKERS, queue_size: Optional[int] = None,
+                 work_dir: Optional[str] = None, min_free_mb: int = DEFAULT_MIN_FREE_MB,
+                 disk_free: Callable[[str], int] = free_bytes):
+        if unpack_workers < 1 or detector_workers < 1:
+            raise ValueError("unpack_workers and detector_workers must be at least 1")
+        self.unpack = unpack
+        self.analyse = analyse
+        self.cleanup = cleanup
+        self.unpack_workers = unpack_workers
+        self.detector_workers = detector_workers
+        self.queue_size = queue_size or detector_workers
+        self.work_dir = work_dir or tempfile.gettempdir()
+        self.min_free_bytes = min_free_mb * 1024 * 1024
+        self.disk_free = disk_free
+
+    def run(self, apk_paths: Iterable[str],
+            on_result: Optional[Callable[[BatchItem], None]] = None) -> PipelineStats:
+        """
+        Process every APK; on_result is called once per sample, in completion
+        order, from the calling thread (so it may use e.g. a SQLite connection).
+
+        Returns:
+            PipelineStats of the run
+        """
+        stats = PipelineStats()
+        ready: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        done: "queue.Queue" = queue.Queue()
+        pending: Iterator[str] = iter(apk_paths)
+        pending_lock = threading.Lock()
+        state = threading.Condition()
+        in_flight = [0]  # decoded (or decoding) directories not yet cleaned up
+
+        def next_apk() -> Optional[str]:
+            with pending_lock:
+                return next(pending, None)
+
+        def wait_for_disk():
+            with state:
+                waited = False
+                while in_flight[0] > 0 and self.disk_free(self.work_dir) < self.min_free_bytes:
+                    if not waited:
+                        waited = True
+                        stats.disk_waits += 1
+                        logger.info(f"Less than {self.min_free_bytes // (1024 * 1024)} MB free in "
+                                    f"{self.work_dir}, waiting for detectors to release space")
+                    state.wait(DISK_POLL_SECONDS)
+                in_flight[0] += 1
+
+        def release():
+            with state:
+                in_flight[0] -= 1
+                state.notify_all()
+
+        def unpack_worker():
+            while True:
+                apk_path = next_apk()
+                if apk_path is None:
+                    return
+                wait_for_disk()
+                start = time.perf_counter()
+                try:
+                    decompile_dir = self.unpack(apk_path)
+                except Exception as e:
+                    release()
+                    logger.error(f"Unpacking {apk_path} failed: {e}")
+                    done.put(BatchItem(apk_path, error=f"Unpacking failed: {e}",
+                                      unpack_seconds=time.perf_counter() - start))
+                    continue
+                item = BatchItem(apk_path, unpack_seconds=time.perf_counter() - start)
+                ready.put((item, decompile_dir))  # blocks while detectors are behind
+                with state:
+                    stats.max_ready = max(stats.max_ready, ready.qsize())
+
+        def detector_worker():
+            while True:
+                entry = ready.get()
+                if entry is _DONE:
+                    return
+                item, decompile_dir = entry
+                start = time.perf_counter()
+                try:
+                    item.report = self.analyse(item.apk_path, decompile_dir)
+                    if item.report and item.report.get("error"):
+                        item.error = item.report["error"]
+                except Exception as e:
+                    logger.exception(f"Analysis of {item.apk_path} failed")
+                    item.error = f"Unexpected analysis error: {e}"
+                finally:
+                    item.analyse_seconds = time.perf_counter() - start
+                try:
+                    self.cleanup(decompile_dir)
+                except Exception as e:
+                    logger.error(f"Cleaning up {decompile_dir} failed: {e}")
+                release()
+                done.put(item)
+
+        wall_start = time.perf_counter()
+        unpackers = [threading.Thread(target=unpack_worker, name=f"unpack-{i}", daemon=True)
+                     for i in range(self.unpack_workers)]
+        detectors = [threading.Thread(target=detector_worker, name=f"detect-{i}", daemon=True)
+                     for i in range(self.detector_workers)]
+
+        def coordinator():
+            for thread in unpackers:
+                thread.join()
+            for _ in detectors:
+                ready.put(_DONE)
+            for thread in detectors:
+                thread.join()
+            done.put(_DONE)
+
+        for thread in unpackers + detectors:
+            thread.start()
+        threading.Thread(target=coordinator, name="pipeline", daemon=True).start()
+
+        while True:
+            item = done.get()
+            if item is _DONE:
+                break
+            stats.samples += 1
+            stats.unpack_seconds += item.unpack_seconds
+            stats.analyse_seconds += item.analyse_seconds
+            if item.error:
+                stats.failed += 1
+                stats.errors.append(f"{os.path.basename(item.apk_path)}: {item.error}")
+            if on_result is not None:
+                try:
+                    on_result(item)
+                except Exception as e:
+                    logger.error(f"Result handler failed for {item.apk_path}: {e}")
+        stats.wall_seconds = time.perf_counter() - wall_start
+
+        logger.info(f"Pipeline finished {stats.samples} samples ({stats.failed} failed) in "
+                    f"{stats.wall_seconds:.1f}s; stage time: unpack {stats.unpack_seconds:.1f}s, "
+                    f"analyse {stats.analyse_seconds:.1f}s")
+        return stats
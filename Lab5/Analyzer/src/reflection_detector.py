@@ -1,11 +1,13 @@
 # reflection_detector.py
 
 import os
-import re
 import logging
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, Pattern
 from dataclasses import dataclass, field
 
+from patterns import REGISTRY
+from smali_walker import PackageFilter, find_smali_dirs, map_smali_dirs, walk_smali
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -36,12 +38,15 @@ class ReflectionInfo:
         """Get total number of reflection-related issues."""
         return len(self.reflection_calls) + len(self.dynamic_loading) + len(self.native_method_calls)
 
-def detect_reflection(decompile_dir: str) -> ReflectionInfo:
+def detect_reflection(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                      max_workers: Optional[int] = None) -> ReflectionInfo:
     """
     Detect use of Java reflection, dynamic class loading, and native method calls.
     
     Args:
         decompile_dir: Path to the decompiled APK directory
+        package_filter: Optional PackageFilter limiting which packages are scanned
+        max_workers: Maximum number of smali directories scanned in parallel
         
     Returns:
         ReflectionInfo object containing detected reflection usage
@@ -50,94 +55,20 @@ def detect_reflection(decompile_dir: str) -> ReflectionInfo:
     
     results = ReflectionInfo()
     
-    # Scan smali files for reflection
-    smali_dir = os.path.join(decompile_dir, "smali")
-    if not os.path.isdir(smali_dir):
-        logger.warning(f"No smali directory found at {smali_dir}")
+    # Every DEX file (multidex apps) gets its own smali directory
+    smali_dirs = find_smali_dirs(decompile_dir)
+    if not smali_dirs:
+        logger.warning(f"No smali directory found in {decompile_dir}")
         return results
     
-    # Check for multiple smali directories (multidex apps)
-    smali_dirs = [smali_dir]
-    for i in range(2, 10):  # Check for smali_classes2 through smali_classes9
-        additional_dir = os.path.join(decompile_dir, f"smali_classes{i}")
-        if os.path.isdir(additional_dir):
-            smali_dirs.append(additional_dir)
-    
-    # Patterns to search for
-    reflection_patterns = {
-        # Java reflection API methods
-        "Class.forName": re.compile(r'invoke-static {[^}]*}, Ljava/lang/Class;->forName\(Ljava/lang/String;\)Ljava/lang/Class;'),
-        "Class.getDeclaredMethod": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getDeclaredMethod\(Ljava/lang/String;'),
-        "Class.getMethod": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getMethod\(Ljava/lang/String;'),
-        "getDeclaredField": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getDeclaredField\(Ljava/lang/String;\)'),
-        "getField": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/Class;->getField\(Ljava/lang/String;\)'),
-        "Method.invoke": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/reflect/Method;->invoke\(Ljava/lang/Object;\[Ljava/lang/Object;\)Ljava/lang/Object;'),
-        "Constructor.newInstance": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/reflect/Constructor;->newInstance\('),
-    }
-    
-    dynamic_loading_patterns = {
-        # Dynamic class loading
-        "DexClassLoader": re.compile(r'new-instance [^,]+, Ldalvik/system/DexClassLoader;'),
-        "PathClassLoader": re.compile(r'new-instance [^,]+, Ldalvik/system/PathClassLoader;'),
-        "InMemoryDexClassLoader": re.compile(r'new-instance [^,]+, Ldalvik/system/InMemoryDexClassLoader;'),
-        "ClassLoader.loadClass": re.compile(r'invoke-virtual {[^}]*}, Ljava/lang/ClassLoader;->loadClass\(Ljava/lang/String;\)Ljava/lang/Class;'),
-    }
+    # Compiled once in the registry; passed along so worker processes get config-added patterns too
+    pattern_groups = {group: REGISTRY.group(group) for group in ("reflection", "dynamic_loading", "native", "smali")}
     
-    native_patterns = {
-        # Native method declarations and JNI calls
-        "native method": re.compile(r'\.method.* native '),
-        "System.loadLibrary": re.compile(r'invoke-static {[^}]*}, Ljava/lang/System;->loadLibrary\(Ljava/lang/String;\)V'),
-        "System.load": re.compile(r'invoke-static {[^}]*}, Ljava/lang/System;->load\(Ljava/lang/String;\)V'),
-    }
-    
-    for smali_dir in smali_dirs:
-        # Walk through all smali files
-        for root, _, files in os.walk(smali_dir):
-            for file in files:
-                if not file.endswith(".smali"):
-                    continue
-                
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        class_name = extract_class_name(content)
-                        
-                        # Check for reflection
-                        for pattern_name, pattern in reflection_patterns.items():
-                            for match in pattern.finditer(content):
-                                line_number = content[:match.start()].count('\n') + 1
-                                results.reflection_calls.append({
-                                    'type': pattern_name,
-                                    'class': class_name,
-                                    'file': os.path.relpath(file_path, smali_dir),
-                                    'line': line_number
-                                })
-                        
-                        # Check for dynamic loading
-                        for pattern_name, pattern in dynamic_loading_patterns.items():
-                            for match in pattern.finditer(content):
-                                line_number = content[:match.start()].count('\n') + 1
-                                results.dynamic_loading.append({
-                                    'type': pattern_name,
-                                    'class': class_name,
-                                    'file': os.path.relpath(file_path, smali_dir),
-                                    'line': line_number
-                                })
-                        
-                        # Check for native methods
-                        for pattern_name, pattern in native_patterns.items():
-                            for match in pattern.finditer(content):
-                                line_number = content[:match.start()].count('\n') + 1
-                                results.native_method_calls.append({
-                                    'type': pattern_name,
-                                    'class': class_name,
-                                    'file': os.path.relpath(file_path, smali_dir),
-                                    'line': line_number
-                                })
-                                
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+    for dir_results in map_smali_dirs(_scan_smali_dir, smali_dirs, package_filter, pattern_groups,
+                                      max_workers=max_workers):
+        results.reflection_calls.extend(dir_results.reflection_calls)
+        results.dynamic_loading.extend(dir_results.dynamic_loading)
+        results.native_method_calls.extend(dir_results.native_method_calls)
     
     logger.info(f"Found {results.total_issues} reflection-related issues: "
                f"{len(results.reflection_calls)} reflection calls, "
@@ -146,9 +77,67 @@ def detect_reflection(decompile_dir: str) -> ReflectionInfo:
     
     return results
 
-def extract_class_name(smali_content: str) -> str:
-    """Extract the class name from smali file content."""
-    class_match = re.search(r'\.class.*?(L[^;]+;)', smali_content)
+def _scan_smali_dir(smali_dir: str, package_filter: Optional[PackageFilter] = None,
+                    pattern_groups: Optional[Dict[str, Dict[str, Pattern]]] = None) -> ReflectionInfo:
+    """Scan a single smali directory; runs as one parallel work unit."""
+    results = ReflectionInfo()
+    
+    pattern_groups = pattern_groups or {}
+    reflection_patterns = pattern_groups.get("reflection", REGISTRY.group("reflection"))
+    dynamic_loading_patterns = pattern_groups.get("dynamic_loading", REGISTRY.group("dynamic_loading"))
+    native_patterns = pattern_groups.get("native", REGISTRY.group("native"))
+    class_name_pattern = pattern_groups.get("smali", REGISTRY.group("smali"))["class_name"]
+    
+    # Walk through all smali files
+    for file_path in walk_smali(smali_dir, package_filter):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                class_name = extract_class_name(content, class_name_pattern)
+                
+                # Check for reflection
+                for pattern_name, pattern in reflection_patterns.items():
+                    for match in pattern.finditer(content):
+                        line_number = content[:match.start()].count('\n') + 1
+                        results.reflection_calls.append({
+                            'type': pattern_name,
+                            'class': class_name,
+                            'file': os.path.relpath(file_path, smali_dir),
+                            'line': line_number
+                        })
+                
+                # Check for dynamic loading
+                for pattern_name, pattern in dynamic_loading_patterns.items():
+                    for match in pattern.finditer(content):
+                        line_number = content[:match.start()].count('\n') + 1
+                        results.dynamic_loading.append({
+                            'type': pattern_name,
+                            'class': class_name,
+                            'file': os.path.relpath(file_path, smali_dir),
+                            'line': line_number
+                        })
+                
+                # Check for native methods
+                for pattern_name, pattern in native_patterns.items():
+                    for match in pattern.finditer(content):
+                        line_number = content[:match.start()].count('\n') + 1
+                        results.native_method_calls.append({
+                            'type': pattern_name,
+                            'class': class_name,
+                            'file': os.path.relpath(file_path, smali_dir),
+                            'line': line_number
+                        })
+                        
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+    
+    return results
+
+def extract_class_name(smali_content: str, pattern: Optional[Pattern] = None) -> str:
+    """Extract the class name from smali file content (pattern defaults to the registry's "class_name")."""
+    if pattern is None:
+        pattern = REGISTRY.get("smali", "class_name")
+    class_match = pattern.search(smali_content)
     if class_match:
         class_name = class_match.group(1)
         # Convert from smali format to Java format
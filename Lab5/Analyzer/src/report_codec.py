@@ -0,0 +1,74 @@
+# report_codec.py
+
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from lab8_common import load_common_module
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# The compact format (JSON encoding, zstd/gzip compression, magic-byte
+# detection) is defined once, in Lab 8's scripts/common/report_codec.py, so
+# reports of both labs can be read by either.
+codec = load_common_module("report_codec")
+encode_json = codec.encode_json
+decode_json = codec.decode_json
+compress = codec.compress
+decompress = codec.decompress
+compact_extension = codec.compact_suffix
+
+def is_orjson_available() -> bool:
+    return codec.orjson is not None
+
+def is_zstd_available() -> bool:
+    return codec.zstandard is not None
+
+def write_compact_report(report: Dict[str, Any], path_base: str) -> str:
+    """
+    Write a report as compressed compact JSON.
+
+    Args:
+        report: Report dictionary as returned by run_analysis
+        path_base: Output path without extension; compact_extension() is appended
+
+    Returns:
+        Path of the written file
+    """
+    path = path_base + compact_extension()
+    with open(path, "wb") as f:
+        f.write(compress(encode_json(report)))
+    return path
+
+def read_report(path: str) -> Dict[str, Any]:
+    """
+    Load a report written in any of the supported formats.
+
+    Handles pretty JSON (.json), compressed compact JSON (.json.zst/.json.gz)
+    and streamed NDJSON (.ndjson).
+    """
+    if path.endswith(".ndjson"):
+        from report_sink import load_ndjson_report
+        return load_ndjson_report(path)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return decode_json(decompress(data))
+    except ValueError as e:
+        raise ValueError(f"Failed to decode report {path}: {e}")
+
+def to_pretty_json(path: str, out_path: Optional[str] = None) -> str:
+    """
+    Convert a report in any supported format to human-readable JSON (indent=2).
+
+    Returns:
+        The pretty JSON text; it is also written to out_path when given
+    """
+    text = json.dumps(read_report(path), indent=2, default=str, ensure_ascii=False)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        logger.info(f"Pretty JSON written to {out_path}")
+    return text
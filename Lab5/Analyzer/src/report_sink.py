@@ -0,0 +1,118 @@
+# report_sink.py
+
+import json
+import logging
+from typing import Any, Dict, IO, Iterable, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class NDJSONReportSink:
+    """
+    Streams analysis results as newline-delimited JSON (NDJSON) records.
+
+    Every record is one JSON object on its own line and carries a "record" key:
+
+        {"record": "header",  "apk_file": ..., "analysis_timestamp": ...}
+        {"record": "section", "section": ..., "data": ...}
+        {"record": "finding", "section": ..., "category": ..., "finding": ...}
+
+    List-valued results are split into one "finding" record per item, so a
+    consumer can index findings while the scan is still running. The lists are
+    left empty in the "section" record that precedes them.
+    """
+
+    def __init__(self, stream: IO[str], per_finding: bool = True):
+        self.stream = stream
+        self.per_finding = per_finding
+        self.records_written = 0
+        self._owns_stream = False
+
+    @classmethod
+    def open(cls, path: str, per_finding: bool = True) -> "NDJSONReportSink":
+        """Create a sink writing to the file at *path* (truncated first)."""
+        sink = cls(open(path, "w", encoding="utf-8"), per_finding=per_finding)
+        sink._owns_stream = True
+        return sink
+
+    def __enter__(self) -> "NDJSONReportSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, record: Dict[str, Any]):
+        self.stream.write(json.dumps(record, default=str, ensure_ascii=False))
+        self.stream.write("\n")
+        self.records_written += 1
+
+    def write_header(self, apk_file: str, analysis_timestamp: str, **fields: Any):
+        """Emit the header record identifying the analysed APK (plus any extra fields)."""
+        self._write({"record": "header", "apk_file": apk_file, "analysis_timestamp": analysis_timestamp, **fields})
+        self.stream.flush()
+
+    def emit(self, section: str, data: Any):
+        """Emit one report section as soon as its detector has produced it."""
+        if not self.per_finding:
+            self._write({"record": "section", "section": section, "data": data})
+        elif isinstance(data, list):
+            self._write({"record": "section", "section": section, "data": []})
+            self._write_findings(section, None, data)
+        elif isinstance(data, dict):
+            lists = {key: value for key, value in data.items() if isinstance(value, list)}
+            head = {key: ([] if key in lists else value) for key, value in data.items()}
+            self._write({"record": "section", "section": section, "data": head})
+            for category, items in lists.items():
+                self._write_findings(section, category, items)
+        else:
+            self._write({"record": "section", "section": section, "data": data})
+        self.stream.flush()
+
+    def _write_findings(self, section: str, category: Optional[str], items: Iterable[Any]):
+        for item in items:
+            record = {"record": "finding", "section": section}
+            if category is not None:
+                record["category"] = category
+            record["finding"] = item
+            self._write(record)
+
+    def close(self):
+        """Flush the stream, closing it if the sink opened it."""
+        if self.stream.closed:
+            return
+        self.stream.flush()
+        if self._owns_stream:
+            self.stream.close()
+
+def load_ndjson_report(path: str) -> Dict[str, Any]:
+    """
+    Rebuild a report dictionary from an NDJSON stream written by NDJSONReportSink.
+
+    The result has the same shape as the dictionary returned by run_analysis,
+    so it can be passed to format_report or dumped as regular JSON.
+    """
+    report: Dict[str, Any] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                # A scan that is still running (or crashed) may leave a partial last line
+                logger.warning(f"Skipping malformed NDJSON line {line_number} in {path}: {e}")
+                continue
+
+            kind = record.get("record")
+            if kind == "header":
+                report.update({key: value for key, value in record.items() if key != "record"})
+            elif kind == "section":
+                report[record["section"]] = record.get("data")
+            elif kind == "finding":
+                if "category" in record:
+                    section = report.setdefault(record["section"], {})
+                    section.setdefault(record["category"], []).append(record["finding"])
+                else:
+                    report.setdefault(record["section"], []).append(record["finding"])
+    return report
@@ -0,0 +1,135 @@
+# results_store.py
+
+import os
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from lab8_common import common_module_path, load_common_module
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# The schema and the IOC index writer are defined once, in Lab 8's
+# scripts/common/results_db.py, since the Lab 8 scanners write to (and query)
+# the same database.
+RESULTS_DB_PATH = common_module_path("results_db")
+results_db = load_common_module("results_db")
+SCHEMA_VERSION = results_db.SCHEMA_VERSION
+normalise_permission = results_db.normalise_permission
+
+SOURCE = "analyse_apk"
+
+class ResultsStore:
+    """
+    SQLite results database (WAL mode) filled from run_analysis reports.
+
+    Reports and failures are buffered and written in one transaction every
+    batch_size samples, and on flush()/close(). Each sample's outcome is
+    recorded in sample_status, where Lab 8's query_results.py --failed finds
+    the samples to re-run.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 50):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        results_db.create_schema(self.conn)
+        self.batch_size = batch_size
+        self._pending: List[Dict[str, Any]] = []
+        self._failures: List[Tuple] = []
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_report(self, report: Dict[str, Any]):
+        """
+        Queue a report produced by run_analysis.
+
+        Its evidence replaces what analyse_apk recorded for the sample before
+        (evidence of the Lab 8 scanners is kept). Permissions come from the
+        manifest, API hits are the reflection and dynamic loading types found
+        (e.g. "DexClassLoader"), and string hits are the interesting strings.
+        The interesting strings also replace the sample's entries in the
+        trigram IOC index searched by Lab 8's search_iocs.py.
+        """
+        if not report.get("sha256"):
+            raise ValueError("Report has no sha256; it cannot be stored")
+        self._pending.append(report)
+        self._flush_if_full()
+
+    def add_failure(self, sha256: str, apk_path: str, error: Optional[str]):
+        """Queue the status of a sample whose analysis failed (its evidence is left as it was)."""
+        now = datetime.now(tz=timezone.utc).isoformat()
+        self._failures.append((sha256, SOURCE, os.path.basename(apk_path), "error", error or None, now))
+        self._flush_if_full()
+
+    def _flush_if_full(self):
+        if len(self._pending) + len(self._failures) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued reports and failures in one transaction."""
+        if not self._pending and not self._failures:
+            return
+
+        samples: List[Tuple] = []
+        permissions: List[Tuple] = []
+        api_hits: List[Tuple] = []
+        string_hits: List[Tuple] = []
+        statuses: List[Tuple] = []
+        now = datetime.now(tz=timezone.utc).isoformat()
+
+        # A sample queued twice in one batch: the last report wins
+        reports = {report["sha256"]: report for report in self._pending}
+        for report in reports.values():
+            sha256 = report["sha256"]
+            manifest = report.get("manifest_info")
+            manifest = manifest if isinstance(manifest, dict) else {}
+            samples.append((sha256, report.get("apk_file", ""), manifest.get("package_name"), now))
+            statuses.append((sha256, SOURCE, report.get("apk_file", ""), "ok", None, now))
+
+            perms = {normalise_permission(p.get("name", "")) for p in manifest.get("permissions", []) if p.get("name")}
+            permissions.extend((sha256, p, SOURCE) for p in perms)
+
+            apis = set()
+            reflection = report.get("reflection_dynamic_loading")
+            if isinstance(reflection, dict):
+                for key in ("reflection_calls", "dynamic_loading", "native_method_calls"):
+                    apis.update(hit.get("type") for hit in reflection.get(key, []) if hit.get("type"))
+            api_hits.extend((sha256, a, SOURCE) for a in apis)
+
+            strings = report.get("interesting_strings")
+            if isinstance(strings, list):
+                string_hits.extend((sha256, s, SOURCE) for s in set(strings))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO samples (sha256, sample, package_name, analysed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET sample=excluded.sample, "
+                "package_name=COALESCE(excluded.package_name, samples.package_name), "
+                "analysed_at=excluded.analysed_at",
+                samples)
+            for table, rows in (("permissions", permissions), ("api_hits", api_hits), ("string_hits", string_hits)):
+                results_db.replace_evidence(self.conn, table, [(sha256, SOURCE) for sha256 in reports], rows)
+            for sha256, report in reports.items():
+                strings = report.get("interesting_strings")
+                results_db.index_strings(self.conn, sha256, strings if isinstance(strings, list) else [])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sample_status (sha256, source, sample, status, error, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._failures + statuses)
+
+        logger.info(f"Recorded {len(self._pending)} report(s) and {len(self._failures)} failure(s) "
+                    f"in results database")
+        self._pending.clear()
+        self._failures.clear()
+
+    def close(self):
+        """Flush pending reports and close the database."""
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,94 @@
+# sketches.py
+
+import math
+import hashlib
+from typing import Tuple
+
+def hash128(value: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes of value (one blake2b call)."""
+    digest = hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for approximate set membership.
+
+    Memory is fixed at creation from capacity and error_rate (about 1.2 MB
+    for one million items at 1%). Membership tests can return false
+    positives (a new item reported as already seen) at roughly error_rate
+    once capacity items were added; they never return false negatives.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        # Double hashing (Kirsch & Mitzenmacher): position_i = h1 + i * h2
+        h1, h2 = hash128(value)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+    def add(self, value: str) -> bool:
+        """Add value; returns True if it was (probably) not seen before."""
+        new = False
+        for p in self._positions(value):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count estimator with 2**precision one-byte registers.
+
+    The default precision of 14 uses 16 KB and has a standard error of
+    about 0.8%. Sketches with the same precision can be merged, e.g. the
+    per-DEX results of parallel workers.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value: str):
+        h = hash128(value)[0]
+        index = h & (self.num_registers - 1)
+        rest = h >> self.precision
+        # Rank = position of the lowest set bit among the remaining 64 - precision bits
+        width = 64 - self.precision
+        rank = (rest & -rest).bit_length() if rest else width + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        """Estimated number of distinct values added."""
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
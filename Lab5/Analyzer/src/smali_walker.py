@@ -0,0 +1,228 @@
+# smali_walker.py
+
+import os
+import re
+import glob
+import fnmatch
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Library packages that are bundled into most apps and rarely hold app logic
+LIBRARY_PACKAGES: List[str] = [
+    "android/support/**",
+    "androidx/**",
+    "kotlin/**",
+    "kotlinx/**",
+    "com/google/android/gms/**",
+    "com/google/firebase/**",
+    "okhttp3/**",
+    "okio/**",
+    "retrofit2/**",
+]
+
+def _split_pattern(pattern: str) -> List[str]:
+    """Turn 'androidx/**' or 'com.example.app' into package path segments."""
+    pattern = pattern.strip().replace(".", "/")
+    while pattern.endswith("/**") or pattern.endswith("/"):
+        pattern = pattern[:-3] if pattern.endswith("/**") else pattern[:-1]
+    return [part for part in pattern.split("/") if part]
+
+def _covers(prefix: List[str], parts: List[str]) -> bool:
+    """Check if the package path *parts* lies inside the *prefix* subtree."""
+    if len(parts) < len(prefix):
+        return False
+    return all(fnmatch.fnmatchcase(parts[i], prefix[i]) for i in range(len(prefix)))
+
+def _leads_to(prefix: List[str], parts: List[str]) -> bool:
+    """Check if the package path *parts* is an ancestor of the *prefix* subtree."""
+    if len(parts) >= len(prefix):
+        return False
+    return all(fnmatch.fnmatchcase(parts[i], prefix[i]) for i in range(len(parts)))
+
+@dataclass
+class PackageFilter:
+    """
+    Allow/deny filter on class packages, applied while walking smali trees.
+
+    Patterns are package prefixes in dotted ('com.example') or path form
+    ('androidx/**'); single segments may use fnmatch wildcards. Deny wins
+    over allow, and an empty allow list allows every package.
+    """
+    allow: List[str] = field(default_factory=list)
+    deny: List[str] = field(default_factory=list)
+    _allow: List[List[str]] = field(init=False, repr=False, compare=False)
+    _deny: List[List[str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._allow = [p for p in (_split_pattern(a) for a in self.allow) if p]
+        self._deny = [p for p in (_split_pattern(d) for d in self.deny) if p]
+
+    @classmethod
+    def from_manifest(cls, manifest_data, deny: Optional[List[str]] = None) -> "PackageFilter":
+        """Build a filter restricted to the app package declared in the manifest."""
+        return cls(allow=[manifest_data.package_name], deny=list(deny or []))
+
+    @property
+    def is_empty(self) -> bool:
+        """Check if the filter lets every package through."""
+        return not self._allow and not self._deny
+
+    def restrict_to(self, package_name: str) -> "PackageFilter":
+        """
+        Return a copy of this filter narrowed to the *package_name* subtree.
+
+        Allow patterns inside the package are kept, patterns covering the
+        whole package are replaced by it, and unrelated ones are dropped; with
+        an empty allow list the result allows just *package_name*. When no
+        allow pattern overlaps the package, the copy matches nothing.
+        """
+        package = _split_pattern(package_name)
+        if not self._allow or not package:
+            return PackageFilter(allow=[package_name], deny=list(self.deny))
+        allow: List[str] = []
+        for prefix in self._allow:
+            if _covers(prefix, package):
+                narrowed = package
+            elif len(prefix) > len(package) and all(fnmatch.fnmatchcase(package[i], prefix[i])
+                                                    for i in range(len(package))):
+                narrowed = package + prefix[len(package):]
+            else:
+                continue
+            pattern = ".".join(narrowed)
+            if pattern not in allow:
+                allow.append(pattern)
+        if not allow:
+            logger.warning(f"No allowed package overlaps {package_name}; nothing will be scanned")
+            return PackageFilter(allow=[package_name], deny=list(self.deny) + [package_name])
+        return PackageFilter(allow=allow, deny=list(self.deny))
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Return the filter patterns in a JSON-serialisable form."""
+        return {"allow": list(self.allow), "deny": list(self.deny)}
+
+    def should_descend(self, rel_dir: str) -> bool:
+        """Check if the walker needs to list the directory at *rel_dir*."""
+        parts = [part for part in rel_dir.replace(os.sep, "/").split("/") if part]
+        if any(_covers(prefix, parts) for prefix in self._deny):
+            return False
+        if not self._allow:
+            return True
+        return any(_covers(prefix, parts) or _leads_to(prefix, parts) for prefix in self._allow)
+
+    def includes_package(self, rel_dir: str) -> bool:
+        """Check if classes located directly in *rel_dir* should be scanned."""
+        parts = [part for part in rel_dir.replace(os.sep, "/").split("/") if part]
+        if any(_covers(prefix, parts) for prefix in self._deny):
+            return False
+        if not self._allow:
+            return True
+        return any(_covers(prefix, parts) for prefix in self._allow)
+
+def walk_smali(smali_dir: str, package_filter: Optional[PackageFilter] = None) -> Iterator[str]:
+    """
+    Yield the paths of all .smali files below *smali_dir*.
+
+    Excluded package directories are pruned from os.walk, so their subtrees
+    are never listed or opened.
+
+    Args:
+        smali_dir: Path to a smali (or smali_classesN) directory
+        package_filter: Optional PackageFilter selecting the packages to scan
+
+    Returns:
+        Iterator over absolute paths of .smali files
+    """
+    if package_filter is not None and package_filter.is_empty:
+        package_filter = None
+
+    for root, dirnames, files in os.walk(smali_dir):
+        rel_dir = os.path.relpath(root, smali_dir)
+        if rel_dir == ".":
+            rel_dir = ""
+
+        if package_filter is not None:
+            # Prune in place so os.walk never descends into excluded packages
+            dirnames[:] = [
+                d for d in dirnames
+                if package_filter.should_descend(os.path.join(rel_dir, d))
+            ]
+            if not package_filter.includes_package(rel_dir):
+                continue
+
+        for file in files:
+            if file.endswith(".smali"):
+                yield os.path.join(root, file)
+
+def _smali_dir_sort_key(path: str):
+    """Order smali, smali_classes2, ..., smali_classes10, then any other smali* dirs."""
+    name = os.path.basename(path)
+    if name == "smali":
+        return (0, 0, name)
+    match = re.fullmatch(r"smali_classes(\d+)", name)
+    if match:
+        return (1, int(match.group(1)), name)
+    return (2, 0, name)
+
+def find_smali_dirs(decompile_dir: str) -> List[str]:
+    """
+    Find every smali directory written by apktool (one per DEX file).
+
+    Args:
+        decompile_dir: Path to the decompiled APK directory
+
+    Returns:
+        List of smali directory paths, primary DEX first
+    """
+    smali_dirs = [d for d in glob.glob(os.path.join(glob.escape(decompile_dir), "smali*")) if os.path.isdir(d)]
+    smali_dirs.sort(key=_smali_dir_sort_key)
+    return smali_dirs
+
+def _pool_context():
+    """
+    Start method for the smali process pools.
+
+    map_smali_dirs is called from the pipeline's detector threads, and
+    forking a process while other threads run can copy a lock one of them
+    holds (logging, queues) into a child that then deadlocks. forkserver
+    forks from a single-threaded server instead; spawn where it is missing.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def map_smali_dirs(worker: Callable[..., Any], smali_dirs: List[str], *args,
+                   max_workers: Optional[int] = None) -> List[Any]:
+    """
+    Run worker(smali_dir, *args) for every smali directory.
+
+    Each directory is an independent work unit scheduled on a process pool,
+    so multidex apps spread across cores. The pool never forks the calling
+    process (see _pool_context), so this is safe from threads; the worker
+    must be a module-level function of an importable module so it can be
+    pickled. With a single directory or max_workers=1 everything runs in
+    the current process.
+
+    Returns:
+        List of worker results, in the same order as smali_dirs
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(smali_dirs))
+
+    if max_workers <= 1:
+        return [worker(smali_dir, *args) for smali_dir in smali_dirs]
+
+    logger.debug(f"Scanning {len(smali_dirs)} smali directories with {max_workers} workers")
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as executor:
+            futures = [executor.submit(worker, smali_dir, *args) for smali_dir in smali_dirs]
+            return [future.result() for future in futures]
+    except (OSError, RuntimeError) as e:
+        # e.g. no permission to create processes, or a worker died
+        logger.warning(f"Parallel smali scan failed ({e}), falling back to sequential scan")
+        return [worker(smali_dir, *args) for smali_dir in smali_dirs]
@@ -0,0 +1,215 @@
+# string_ranker.py
+
+import re
+import heapq
+import math
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from patterns import REGISTRY
+from sketches import BloomFilter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 15
+# Distinct strings the default seen filter is sized for (about 1.2 MB at 1%)
+DEFAULT_SEEN_CAPACITY = 1_000_000
+
+# Categories in priority order; a string belongs to the first one it matches.
+# "url", "ip", "key", "token" and "base64" are patterns of the "ranking"
+# registry group (config files may add more), "high_entropy" and "other" are
+# the fallbacks. "key" is for known credential formats (AWS, Google API keys).
+CATEGORY_WEIGHTS: Dict[str, float] = {
+    "url": 3.0,
+    "ip": 3.0,
+    "key": 3.0,
+    "token": 2.0,
+    "base64": 2.0,
+    "high_entropy": 1.0,
+    "other": 0.0,
+}
+
+# Minimum Shannon entropy (bits/char) for the categories that would otherwise
+# match long identifiers such as "com_example_feature_enabled"
+MIN_ENTROPY: Dict[str, float] = {
+    "token": 3.5,
+    "base64": 3.5,
+    "high_entropy": 4.0,
+}
+MIN_HIGH_ENTROPY_LENGTH = 16
+
+# Categories whose matches must also look random (see looks_random)
+RANDOM_CATEGORIES = {"token", "base64"}
+MAX_CASE_RUN = 6
+MAX_WORD_LIKE_RUNS = 1  # same-case runs of 4+ letters ("efault", "SAMPLE", ...)
+
+# Kotlin mangles functions taking inline classes as name-<7 char hash>
+KOTLIN_MANGLED_PATTERN = re.compile(r'^[a-z][A-Za-z0-9]*-[A-Za-z0-9_-]{7}$')
+
+# Well-known hosts (XML namespaces, schema URLs) ranked below other URLs
+BENIGN_URL_HOSTS = ("schemas.android.com", "www.w3.org", "ns.adobe.com", "xmlpull.org", "www.apache.org")
+BENIGN_URL_PENALTY = 2.0
+
+# Map every other ASCII character to a space, leaving same-case letter runs as words
+_LOWER_ONLY = {c: " " for c in range(128) if not chr(c).islower()}
+_UPPER_ONLY = {c: " " for c in range(128) if not chr(c).isupper()}
+
+def shannon_entropy(value: str) -> float:
+    """Shannon entropy of value in bits per character (0.0 for empty strings)."""
+    if not value:
+        return 0.0
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+def looks_random(value: str) -> bool:
+    """
+    Cheap check that separates keys/blobs from identifiers such as
+    "DefaultEmojiCompatConfigHelper_API28": random strings contain digits,
+    no long run of same-case letters and at most one word-like run.
+    """
+    if not any(c.isdigit() for c in value) or KOTLIN_MANGLED_PATTERN.match(value):
+        return False
+    runs = [len(run) for run in value.translate(_LOWER_ONLY).split()]
+    runs += [len(run) for run in value.translate(_UPPER_ONLY).split()]
+    return max(runs, default=0) <= MAX_CASE_RUN and sum(r >= 4 for r in runs) <= MAX_WORD_LIKE_RUNS
+
+def categorise(value: str, entropy: Optional[float] = None,
+               patterns: Optional[Dict[str, Pattern]] = None) -> str:
+    """Return the category of value (see CATEGORY_WEIGHTS); patterns defaults to the "ranking" group."""
+    if entropy is None:
+        entropy = shannon_entropy(value)
+    if patterns is None:
+        patterns = REGISTRY.group("ranking")
+    for category, pattern in patterns.items():
+        if not pattern.search(value) or entropy < MIN_ENTROPY.get(category, 0.0):
+            continue
+        if category in RANDOM_CATEGORIES and not looks_random(value):
+            continue
+        return category
+    # Random-looking blobs; natural-language text (with whitespace) is excluded
+    if (len(value) >= MIN_HIGH_ENTROPY_LENGTH and entropy >= MIN_ENTROPY["high_entropy"]
+            and not any(c.isspace() for c in value)):
+        return "high_entropy"
+    return "other"
+
+def score_string(value: str, patterns: Optional[Dict[str, Pattern]] = None) -> Tuple[str, float, float]:
+    """
+    Score one string.
+
+    Returns:
+        (category, score, entropy). The score is the category weight plus
+        the entropy plus a small length bonus (capped at 64 characters);
+        URLs of well-known namespace hosts are penalised.
+    """
+    entropy = shannon_entropy(value)
+    category = categorise(value, entropy, patterns)
+    score = CATEGORY_WEIGHTS.get(category, 1.0) + entropy + min(len(value), 64) / 64
+    if category == "url" and any(host in value for host in BENIGN_URL_HOSTS):
+        score -= BENIGN_URL_PENALTY
+    return category, score, entropy
+
+class StringRanker:
+    """
+    Keeps the top_k highest scoring strings per category.
+
+    Each category is a bounded min-heap, so memory stays at
+    top_k entries per category however many strings are added. Duplicates
+    are recognised through seen, which also remembers strings evicted from
+    a heap: a sketches.BloomFilter by default, so the whole ranker runs in
+    fixed memory (a false positive drops a new string), or anything with
+    "in" and add(), e.g. a set for exact deduplication. patterns are the
+    "ranking" patterns, passed in by code that runs in worker processes.
+    """
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, seen: Optional[Any] = None,
+                 patterns: Optional[Dict[str, Pattern]] = None):
+        self.top_k = top_k
+        self.patterns = patterns
+        self.total = 0
+        self.category_counts: Counter = Counter()
+        self._heaps: Dict[str, List[Tuple[float, str, float]]] = {}
+        self._seen = seen if seen is not None else BloomFilter(DEFAULT_SEEN_CAPACITY)
+
+    def __getstate__(self):
+        # Like BoundedStringCollector: the seen filter stays in the worker that filled it
+        state = dict(self.__dict__)
+        state["_seen"] = None
+        state["patterns"] = None
+        return state
+
+    def add(self, value: str) -> Optional[str]:
+        """
+        Score value and keep it if it is among the top_k of its category.
+
+        Returns the category, or None for empty and already seen strings
+        (those are not scored again).
+        """
+        if not value or value in self._seen:
+            return None
+        self._seen.add(value)
+        return self.add_unseen(value)
+
+    def add_unseen(self, value: str) -> str:
+        """add() for a value the caller has already deduplicated; seen is neither checked nor updated."""
+        category, score, entropy = score_string(value, self.patterns)
+        heap = self._heaps.setdefault(category, [])
+        self.total += 1
+        self.category_counts[category] += 1
+
+        entry = (score, value, entropy)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heappushpop(heap, entry)
+        return category
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "StringRanker"):
+        """
+        Fold in a ranker filled elsewhere, e.g. in a smali worker process.
+
+        Kept strings are deduplicated against the heaps; the counts of
+        strings seen by both rankers add up.
+        """
+        self.total += other.total
+        self.category_counts.update(other.category_counts)
+        for category, entries in other._heaps.items():
+            heap = self._heaps.setdefault(category, [])
+            for entry in entries:
+                if any(kept[1] == entry[1] for kept in heap):
+                    continue
+                if len(heap) < self.top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heappushpop(heap, entry)
+
+    def ranked(self) -> Dict[str, Any]:
+        """
+        Return the kept strings, best first, per category (in CATEGORY_WEIGHTS order).
+
+        Every entry is {"value", "score", "entropy"}; "counts" holds how many
+        strings were seen per category.
+        """
+        order = list(CATEGORY_WEIGHTS) + sorted(set(self._heaps) - set(CATEGORY_WEIGHTS))
+        result: Dict[str, Any] = {"total": self.total, "counts": dict(self.category_counts)}
+        for category in order:
+            heap = self._heaps.get(category)
+            if not heap:
+                continue
+            result[category] = [
+                {"value": value, "score": round(score, 3), "entropy": round(entropy, 3)}
+                for score, value, entropy in sorted(heap, reverse=True)
+            ]
+        return result
+
+def rank_strings(strings: Iterable[str], top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+    """Rank an iterable of strings; see StringRanker.ranked for the result shape."""
+    ranker = StringRanker(top_k)
+    ranker.update(strings)
+    logger.debug(f"Ranked {ranker.total} strings: {dict(ranker.category_counts)}")
+    return ranker.ranked()
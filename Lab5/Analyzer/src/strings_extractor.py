@@ -1,25 +1,59 @@
 # strings_extractor.py
 
 import os
-import re
 import logging
-from typing import List, Dict, Set, Optional
+from typing import Any, Iterable, List, Dict, Set, Optional, Pattern, Tuple
 import xml.etree.ElementTree as ET
 
+from arsc_parser import ArscError, extract_arsc_strings
+from patterns import REGISTRY
+from sketches import BloomFilter, HyperLogLog
+from smali_walker import PackageFilter, find_smali_dirs, map_smali_dirs, walk_smali
+from string_ranker import StringRanker, categorise
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def extract_strings(decompile_dir: str) -> List[str]:
+# Registry groups the smali workers need. They are resolved in the calling
+# process and passed along, since worker processes started by forkserver/spawn
+# import a fresh REGISTRY without the patterns loaded from a config file.
+WORKER_PATTERN_GROUPS = ("strings", "smali", "ranking")
+
+def _pattern_groups() -> Dict[str, Dict[str, Pattern]]:
+    return {group: REGISTRY.group(group) for group in WORKER_PATTERN_GROUPS}
+
+def _has_url_literal(text: str, smali_patterns: Dict[str, Pattern]) -> bool:
+    return '"http' in text
+
+def _has_ip_literal(text: str, smali_patterns: Dict[str, Pattern]) -> bool:
+    return smali_patterns["digit_dot_run"].search(text) is not None
+
+# Cheap literal checks run before the "strings" regexes; a pattern is skipped
+# when its check fails. Patterns without a check (keys, config-added) always run.
+PREFILTERS = {
+    "URL": _has_url_literal,
+    "IP": _has_ip_literal,
+}
+
+def extract_strings(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                    max_workers: Optional[int] = None,
+                    resource_strings: Optional[Iterable[str]] = None,
+                    ranker: Optional[StringRanker] = None) -> List[str]:
     """
     Extract interesting strings from decompiled APK.
     
     This function scans the decompiled APK directory for:
-    1. Strings from res/values/strings.xml
-    2. URLs and sensitive patterns in smali files
-    3. Hardcoded strings in smali files
+    1. Strings from the resources (resource_strings if given, e.g. from
+       extract_apk_resource_strings, otherwise res/values/strings.xml)
+    2. URLs and sensitive patterns in all smali* directories
+    3. Hardcoded strings in all smali* directories
     
     Args:
         decompile_dir: Path to the decompiled APK directory
+        package_filter: Optional PackageFilter limiting which smali packages are scanned
+        max_workers: Maximum number of smali directories scanned in parallel
+        resource_strings: Resource strings already read from the APK (all locales)
+        ranker: Optional StringRanker fed every new string as each source is read
         
     Returns:
         List of interesting strings found in the APK
@@ -28,18 +62,196 @@ def extract_strings(decompile_dir: str) -> List[str]:
     
     results: Set[str] = set()
     
+    def collect(values: Iterable[str]):
+        for value in values:
+            if value and value not in results:
+                results.add(value)
+                if ranker is not None:
+                    ranker.add_unseen(value)
+    
     # 1. Extract strings from resources
-    results.update(extract_resource_strings(decompile_dir))
+    if resource_strings is None:
+        resource_strings = extract_resource_strings(decompile_dir)
+    collect(resource_strings)
     
     # 2. Extract URLs and patterns from smali files
-    results.update(extract_patterns_from_smali(decompile_dir))
+    collect(extract_patterns_from_smali(decompile_dir, package_filter, max_workers))
     
     # 3. Extract hardcoded strings from smali files
-    results.update(extract_hardcoded_strings(decompile_dir))
+    collect(extract_hardcoded_strings(decompile_dir, package_filter, max_workers))
     
     # Convert set to sorted list for consistent output
     return sorted(list(results))
 
+def extract_strings_bounded(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                            max_workers: Optional[int] = None, max_retained: int = 50_000,
+                            resource_strings: Optional[Iterable[str]] = None,
+                            ranker: Optional[StringRanker] = None) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Bounded-memory variant of extract_strings for huge or obfuscated apps.
+    
+    Same sources as extract_strings, but instead of a set of every distinct
+    value each smali directory uses a Bloom filter for deduplication and a
+    HyperLogLog sketch for the distinct count. Only strings that pass the
+    interestingness filter (pattern matches, or a string_ranker category
+    other than "other") are kept, at most max_retained of them.
+    
+    If ranker is given, every string seen (not only the retained ones) is
+    ranked: each smali worker fills its own ranker of ranker.top_k entries
+    per category, and those are merged into ranker.
+    
+    Returns:
+        (sorted retained strings, statistics dict)
+    """
+    logger.info(f"Extracting strings from {decompile_dir} (bounded mode, max {max_retained} kept)")
+    
+    top_k = ranker.top_k if ranker is not None else None
+    pattern_groups = _pattern_groups()
+    collector = BoundedStringCollector(max_retained, top_k=top_k, ranking_patterns=pattern_groups["ranking"])
+    if resource_strings is None:
+        resource_strings = extract_resource_strings(decompile_dir)
+    for value in resource_strings:
+        collector.add(value)
+    
+    smali_dirs = find_smali_dirs(decompile_dir)
+    for dir_collector in map_smali_dirs(_bounded_in_dir, smali_dirs, package_filter, pattern_groups, max_retained,
+                                        top_k, max_workers=max_workers):
+        collector.merge(dir_collector)
+    if ranker is not None:
+        ranker.merge(collector.ranker)
+    
+    stats = collector.stats()
+    logger.debug(f"Bounded string extraction: {stats}")
+    return sorted(collector.retained), stats
+
+class BoundedStringCollector:
+    """
+    Collects strings in fixed memory: Bloom filter (dedup) + HyperLogLog
+    (distinct count) + at most max_retained interesting strings, and with
+    top_k a StringRanker of the top_k strings per category. ranking_patterns
+    is the registry's "ranking" group (looked up when None).
+    
+    The Bloom filter can report a new string as seen (about 1% once
+    bloom_capacity strings were added), so a few strings may be missed.
+    """
+    
+    def __init__(self, max_retained: int = 50_000, bloom_capacity: int = 1_000_000,
+                 error_rate: float = 0.01, hll_precision: int = 14, top_k: Optional[int] = None,
+                 ranking_patterns: Optional[Dict[str, Pattern]] = None):
+        self.max_retained = max_retained
+        self.bloom = BloomFilter(bloom_capacity, error_rate)
+        self.hll = HyperLogLog(hll_precision)
+        self.ranking_patterns = ranking_patterns
+        # The ranker only gets strings the Bloom filter has not seen, so it shares it
+        self.ranker = StringRanker(top_k, seen=self.bloom, patterns=ranking_patterns) if top_k else None
+        self.retained: Set[str] = set()
+        self.duplicates = 0
+        self.uninteresting = 0
+        self.over_cap = 0
+    
+    def __getstate__(self):
+        # The Bloom filter and patterns are only needed while collecting; don't send them back from workers
+        state = dict(self.__dict__)
+        state["bloom"] = None
+        state["ranking_patterns"] = None
+        return state
+    
+    def add(self, value: str, interesting: Optional[bool] = None):
+        """Add one extracted value; interesting=None runs the string_ranker filter."""
+        self.hll.add(value)
+        if not self.bloom.add(value):
+            self.duplicates += 1
+            return
+        category = self.ranker.add_unseen(value) if self.ranker is not None and value else None
+        if interesting is None:
+            interesting = (category or categorise(value, patterns=self.ranking_patterns)) != "other"
+        if not interesting:
+            self.uninteresting += 1
+        elif value in self.retained:
+            self.duplicates += 1
+        elif len(self.retained) >= self.max_retained:
+            self.over_cap += 1
+        else:
+            self.retained.add(value)
+    
+    def merge(self, other: "BoundedStringCollector"):
+        """Fold in a per-directory collector (counts of values seen in several directories add up)."""
+        self.hll.merge(other.hll)
+        self.duplicates += other.duplicates
+        self.uninteresting += other.uninteresting
+        self.over_cap += other.over_cap
+        if self.ranker is not None and other.ranker is not None:
+            self.ranker.merge(other.ranker)
+        for value in other.retained:
+            if value in self.retained:
+                self.duplicates += 1
+            elif len(self.retained) < self.max_retained:
+                self.retained.add(value)
+            else:
+                self.over_cap += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "distinct_estimate": self.hll.count(),
+            "retained": len(self.retained),
+            "dropped_uninteresting": self.uninteresting,
+            "dropped_over_cap": self.over_cap,
+            "duplicates": self.duplicates,
+        }
+
+def _bounded_in_dir(smali_dir: str, package_filter: Optional[PackageFilter] = None,
+                    pattern_groups: Optional[Dict[str, Dict[str, Pattern]]] = None,
+                    max_retained: int = 50_000, top_k: Optional[int] = None) -> BoundedStringCollector:
+    """Pattern and const-string extraction for one smali directory into a bounded collector."""
+    pattern_groups = pattern_groups or _pattern_groups()
+    regexes, smali_patterns = pattern_groups["strings"], pattern_groups["smali"]
+    collector = BoundedStringCollector(max_retained, top_k=top_k, ranking_patterns=pattern_groups["ranking"])
+    const_string_pattern = smali_patterns["const_string"]
+    min_length = 8
+    
+    for file_path in walk_smali(smali_dir, package_filter):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            
+            # URLs, keys, ... matched by the regexes are interesting by definition
+            for value in patterns_in_smali(content, regexes, smali_patterns):
+                collector.add(value, interesting=True)
+            
+            if "const-string" not in content:
+                continue
+            for line in smali_patterns["const_string_line"].findall(content):
+                match = const_string_pattern.search(line)
+                if match and len(match.group(1)) >= min_length:
+                    collector.add(match.group(1).encode().decode('unicode_escape'))
+                    
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+    
+    return collector
+
+def extract_apk_resource_strings(apk_path: str) -> Optional[Dict[str, List[str]]]:
+    """
+    Extract text resources of every locale straight from resources.arsc.
+    
+    Unlike extract_resource_strings this needs no apktool decode and also
+    covers the localised values-xx/ configurations.
+    
+    Args:
+        apk_path: Path to the APK file
+        
+    Returns:
+        Dictionary mapping locale ('' for the default) to its strings, or
+        None if the resource table is missing or cannot be parsed
+    """
+    try:
+        by_locale = extract_arsc_strings(apk_path)
+    except ArscError as e:
+        logger.warning(f"Cannot read resource strings from {apk_path}: {e}")
+        return None
+    logger.debug(f"Extracted resource strings for locales {sorted(by_locale)} from resources.arsc")
+    return by_locale
+
 def extract_resource_strings(decompile_dir: str) -> Set[str]:
     """Extract strings from res/values/strings.xml file."""
     strings: Set[str] = set()
@@ -63,81 +275,115 @@ def extract_resource_strings(decompile_dir: str) -> Set[str]:
     
     return strings
 
-def extract_patterns_from_smali(decompile_dir: str) -> Set[str]:
+def extract_patterns_from_smali(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                                max_workers: Optional[int] = None) -> Set[str]:
     """Extract URLs and sensitive patterns from smali files."""
     patterns: Set[str] = set()
-    smali_dir = os.path.join(decompile_dir, "smali")
+    smali_dirs = find_smali_dirs(decompile_dir)
     
-    if not os.path.isdir(smali_dir):
-        logger.debug(f"No smali directory found at {smali_dir}")
+    if not smali_dirs:
+        logger.debug(f"No smali directory found in {decompile_dir}")
         return patterns
     
-    # Patterns to search for
-    regexes = {
-        "URL": re.compile(r'"https?://[^\s"\']+'),  # URLs
-        "IP": re.compile(r'"(?:\d{1,3}\.){3}\d{1,3}"'),  # IP addresses
-        "API_KEY": re.compile(r'"[A-Za-z0-9_-]{20,}"'),  # Possible API keys
-        "AWS_KEY": re.compile(r'"[A-Z0-9]{20}"'),  # AWS access keys
-        "FIREBASE": re.compile(r'"[A-Za-z0-9_-]{28}\.[A-Za-z0-9_-]{22}"'),  # Firebase URLs
-    }
+    for dir_patterns in map_smali_dirs(_patterns_in_dir, smali_dirs, package_filter, _pattern_groups(),
+                                       max_workers=max_workers):
+        patterns.update(dir_patterns)
+    
+    logger.debug(f"Extracted {len(patterns)} patterns from smali files")
+    return patterns
+
+def _patterns_in_dir(smali_dir: str, package_filter: Optional[PackageFilter] = None,
+                     pattern_groups: Optional[Dict[str, Dict[str, Pattern]]] = None) -> Set[str]:
+    """Extract patterns from one smali directory; runs as one parallel work unit."""
+    patterns: Set[str] = set()
+    
+    # Patterns to search for (URLs, IPs, API keys, ...), resolved by the caller
+    pattern_groups = pattern_groups or _pattern_groups()
+    regexes, smali_patterns = pattern_groups["strings"], pattern_groups["smali"]
     
     # Walk through all smali files
-    for root, _, files in os.walk(smali_dir):
-        for file in files:
-            if not file.endswith(".smali"):
-                continue
+    for file_path in walk_smali(smali_dir, package_filter):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
             
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-                    for pattern_name, regex in regexes.items():
-                        for match in regex.finditer(content):
-                            # Clean up the match (remove quotes)
-                            value = match.group(0).strip('"')
-                            if value:  # Skip empty strings
-                                patterns.add(value)
-                                
-            except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
+            patterns.update(patterns_in_smali(content, regexes, smali_patterns))
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
     
-    logger.debug(f"Extracted {len(patterns)} patterns from smali files")
     return patterns
 
-def extract_hardcoded_strings(decompile_dir: str) -> Set[str]:
+def patterns_in_smali(content: str, regexes: Dict[str, Pattern],
+                      smali_patterns: Optional[Dict[str, Pattern]] = None) -> Set[str]:
+    """
+    Run the "strings" regexes over one smali file's content.
+
+    Cheap literal checks come first: files without string constants are
+    skipped, only const-string(/jumbo) and static field initialiser lines are
+    searched, and patterns with a failing PREFILTERS check are not run at all.
+    smali_patterns is the registry's "smali" group (looked up when None).
+    """
+    found: Set[str] = set()
+    if smali_patterns is None:
+        smali_patterns = REGISTRY.group("smali")
+    lines = smali_patterns["const_string_line"].findall(content) if "const-string" in content else []
+    if '= "' in content:
+        lines.extend(smali_patterns["field_literal_line"].findall(content))
+    if not lines:
+        return found
+    literals = "\n".join(lines)
+    
+    for pattern_name, regex in regexes.items():
+        prefilter = PREFILTERS.get(pattern_name)
+        if prefilter is not None and not prefilter(literals, smali_patterns):
+            continue
+        for match in regex.finditer(literals):
+            # Clean up the match (remove quotes)
+            value = match.group(0).strip('"')
+            if value:  # Skip empty strings
+                found.add(value)
+    return found
+
+def extract_hardcoded_strings(decompile_dir: str, package_filter: Optional[PackageFilter] = None,
+                              max_workers: Optional[int] = None) -> Set[str]:
     """Extract hardcoded strings from smali files."""
     strings: Set[str] = set()
-    smali_dir = os.path.join(decompile_dir, "smali")
+    smali_dirs = find_smali_dirs(decompile_dir)
     
-    if not os.path.isdir(smali_dir):
+    if not smali_dirs:
         return strings
     
-    # Regex to find const-string instructions in smali
-    const_string_pattern = re.compile(r'const-string [^,]+, "([^"\\]*(?:\\.[^"\\]*)*)"')
+    for dir_strings in map_smali_dirs(_hardcoded_in_dir, smali_dirs, package_filter, REGISTRY.group("smali"),
+                                      max_workers=max_workers):
+        strings.update(dir_strings)
+    
+    logger.debug(f"Extracted {len(strings)} hardcoded strings from smali files")
+    return strings
+
+def _hardcoded_in_dir(smali_dir: str, package_filter: Optional[PackageFilter] = None,
+                      smali_patterns: Optional[Dict[str, Pattern]] = None) -> Set[str]:
+    """Extract const-string values from one smali directory; runs as one parallel work unit."""
+    strings: Set[str] = set()
+    
+    # Regex to find const-string instructions in smali, resolved by the caller
+    const_string_pattern = (smali_patterns or REGISTRY.group("smali"))["const_string"]
     
     # Interesting strings to include (minimum length to filter out noise)
     min_length = 8
     
     # Walk through all smali files
-    for root, _, files in os.walk(smali_dir):
-        for file in files:
-            if not file.endswith(".smali"):
-                continue
-            
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        if "const-string" in line:
-                            match = const_string_pattern.search(line)
-                            if match and len(match.group(1)) >= min_length:
-                                # Unescape the string
-                                value = match.group(1).encode().decode('unicode_escape')
-                                strings.add(value)
-                                
-            except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
+    for file_path in walk_smali(smali_dir, package_filter):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    if "const-string" in line:
+                        match = const_string_pattern.search(line)
+                        if match and len(match.group(1)) >= min_length:
+                            # Unescape the string
+                            value = match.group(1).encode().decode('unicode_escape')
+                            strings.add(value)
+                            
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
     
-    logger.debug(f"Extracted {len(strings)} hardcoded strings from smali files")
     return strings
\ No newline at end of file
@@ -3,48 +3,180 @@
 import subprocess
 import shutil
 import os
+import time
+import hashlib
 import tempfile
-from typing import Optional
+import zipfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional
+
+# Seconds between two calls of a decode's watch callback (see unpack_apk)
+WATCH_INTERVAL = 1.0
+
+# Adaptive timeout: a fixed JVM start-up allowance plus time per MB of APK,
+# so a stuck small APK frees its slot quickly while large ones still finish.
+BASE_TIMEOUT = 60.0
+SECONDS_PER_MB = 8.0
+MAX_TIMEOUT = 1800.0
 
 class UnpackError(Exception):
     """Raised when APK unpacking fails."""
     pass
 
-def unpack_apk(apk_path: str, out_dir: Optional[str] = None) -> str:
+@dataclass(frozen=True)
+class DecodeProfile:
+    """
+    What apktool decodes for a run.
+
+    sources: disassemble DEX to smali (without it: --no-src)
+    resources: decode resources.arsc and res/ XML (without it: --no-res;
+        the manifest then stays binary AXML, which parse_manifest reads)
+    only_main_classes: only disassemble classes*.dex in the APK root
+        (--only-main-classes), skipping DEX files hidden elsewhere
+    A profile with neither sources nor resources does not run apktool at
+    all: the binary AndroidManifest.xml is copied out of the zip.
+    """
+    name: str
+    sources: bool = True
+    resources: bool = True
+    only_main_classes: bool = False
+
+    @property
+    def runs_apktool(self) -> bool:
+        return self.sources or self.resources
+
+    def apktool_args(self) -> List[str]:
+        args = []
+        if not self.sources:
+            args.append("--no-src")
+        if not self.resources:
+            args.append("--no-res")
+        if self.only_main_classes and self.sources:
+            args.append("--only-main-classes")
+        return args
+
+FULL = DecodeProfile("full")
+NO_RES = DecodeProfile("no-res", resources=False)
+NO_SRC = DecodeProfile("no-src", sources=False)
+MANIFEST_ONLY = DecodeProfile("manifest-only", sources=False, resources=False)
+
+DECODE_PROFILES = {profile.name: profile for profile in (FULL, NO_RES, NO_SRC, MANIFEST_ONLY)}
+
+# What each analysis step needs from apktool. The manifest (binary AXML) and
+# resource strings (resources.arsc) are read straight from the APK, and
+# Androguard works on the APK itself, so only the smali scans need a decode.
+DETECTOR_NEEDS = {
+    "manifest": set(),
+    "native": {"sources"},
+    "reflection": {"sources"},
+    "strings": {"sources"},
+    "androguard": set(),
+}
+ALL_DETECTORS = tuple(DETECTOR_NEEDS)
+
+def choose_decode_profile(detectors: Iterable[str] = ALL_DETECTORS, only_main_classes: bool = False,
+                          decode_resources: bool = False) -> DecodeProfile:
+    """
+    Pick the cheapest profile covering the enabled detectors.
+
+    Args:
+        detectors: Enabled analysis steps (keys of DETECTOR_NEEDS)
+        only_main_classes: Restrict disassembly to classes*.dex in the APK root
+        decode_resources: Also decode res/ (e.g. to keep the decoded XML)
+
+    Raises:
+        ValueError: For an unknown detector name
+    """
+    needs = set()
+    for detector in detectors:
+        if detector not in DETECTOR_NEEDS:
+            raise ValueError(f"Unknown detector '{detector}' (expected one of: {', '.join(ALL_DETECTORS)})")
+        needs |= DETECTOR_NEEDS[detector]
+    if decode_resources:
+        needs.add("resources")
+
+    sources, resources = "sources" in needs, "resources" in needs
+    for profile in DECODE_PROFILES.values():
+        if (profile.sources, profile.resources) == (sources, resources):
+            if only_main_classes and sources:
+                return DecodeProfile(profile.name + "+main-classes", sources, resources, only_main_classes=True)
+            return profile
+    return FULL
+
+def apktool_timeout(apk_path: str, base: float = BASE_TIMEOUT, per_mb: float = SECONDS_PER_MB,
+                    maximum: float = MAX_TIMEOUT) -> float:
+    """Timeout in seconds for decoding apk_path, scaled by its size."""
+    try:
+        size_mb = os.path.getsize(apk_path) / (1024 * 1024)
+    except OSError:
+        size_mb = 0.0
+    return min(maximum, base + per_mb * size_mb)
+
+def compute_sha256(apk_path: str) -> str:
+    """Return the SHA-256 hex digest of the APK file."""
+    sha256 = hashlib.sha256()
+    with open(apk_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def find_apktool() -> Optional[str]:
+    """Locate the apktool executable (handles Unix 'apktool' and Windows 'apktool.bat')."""
+    return shutil.which("apktool") or shutil.which("apktool.bat")
+
+def apktool_version() -> str:
+    """
+    Version reported by 'apktool --version' ("none" when apktool is not
+    installed, "unknown" when it cannot be queried). Cached per executable.
+    """
+    apktool_cmd = find_apktool()
+    return query_apktool_version(apktool_cmd) if apktool_cmd else "none"
+
+@lru_cache(maxsize=None)
+def query_apktool_version(*command: str) -> str:
+    """Version printed by 'command --version' (e.g. "apktool" or "java", "-jar", jar), cached."""
+    try:
+        result = subprocess.run([*command, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                stdin=subprocess.DEVNULL, timeout=60, shell=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    lines = result.stdout.decode(errors="ignore").strip().splitlines()
+    return lines[-1].strip() if result.returncode == 0 and lines else "unknown"
+
+def unpack_apk(apk_path: str, out_dir: Optional[str] = None, profile: DecodeProfile = FULL,
+               watch: Optional[Callable[[str], Any]] = None, timeout: Optional[float] = None) -> str:
     """
     Decompile the given APK into a temporary folder using apktool.
+    profile selects what is decoded (see DecodeProfile, choose_decode_profile).
+    apktool is killed after timeout seconds (default: apktool_timeout(apk_path)).
+    watch(out_dir) is called every WATCH_INTERVAL seconds while apktool runs,
+    e.g. WorkspaceManager.quota_watch(); if it raises, apktool is killed and
+    the exception propagates.
     Returns the path to the decompiled directory.
     Raises UnpackError on any failure.
     """
+    if not profile.runs_apktool:
+        return extract_manifest(apk_path, out_dir)
+
     # 1) Locate the apktool executable (handles Unix 'apktool' and Windows 'apktool.bat')
-    apktool_cmd = shutil.which("apktool") or shutil.which("apktool.bat")
+    apktool_cmd = find_apktool()
     if not apktool_cmd:
         raise UnpackError(
             "apktool executable not found. Please install apktool and add it to your PATH."
         )
 
-    # 2) Determine output directory
-    if out_dir is None:
-        base = os.path.splitext(os.path.basename(apk_path))[0]
-        # Use system temp directory instead of hardcoded "tmp"
-        out_dir = os.path.join(tempfile.gettempdir(), base)
+    # 2) Determine and clean the output directory
+    out_dir = prepare_out_dir(apk_path, out_dir)
+    if timeout is None:
+        timeout = apktool_timeout(apk_path)
 
-    # 3) Clean up any existing directory
-    if os.path.isdir(out_dir):
-        try:
-            shutil.rmtree(out_dir)
-        except (PermissionError, OSError) as e:
-            raise UnpackError(f"Cannot clean output directory: {e}")
-
-    # Ensure parent directory exists
-    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
-
-    # 4) Build and run the apktool command
+    # 3) Build and run the apktool command
     # IMPORTANT: Don't use shell=True on Windows to avoid the "press any key" prompt
     # Instead, pass input="" to automatically handle prompts
     try:
         # For Windows, use this approach which provides empty input to bypass the prompt
-        cmd = [apktool_cmd, "d", "-f", "-o", out_dir, apk_path]
+        cmd = apktool_command(apktool_cmd, apk_path, out_dir, profile)
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
@@ -54,8 +186,8 @@ def unpack_apk(apk_path: str, out_dir: Optional[str] = None) -> str:
             shell=False,
         )
         
-        # Provide empty input and set a reasonable timeout (180 seconds)
-        stdout, stderr = process.communicate(input=b"\n", timeout=180)
+        # Provide empty input and a timeout scaled by the APK size
+        stdout, stderr = _communicate(process, out_dir, b"\n", timeout, watch)
         
         # Check for failure
         if process.returncode != 0:
@@ -65,14 +197,105 @@ def unpack_apk(apk_path: str, out_dir: Optional[str] = None) -> str:
     except subprocess.TimeoutExpired:
         # Make sure to kill the process if it times out
         process.kill()
-        raise UnpackError("apktool timed out after 180 seconds")
+        raise UnpackError(f"apktool timed out after {timeout:.0f} seconds")
+    except UnpackError:
+        raise
     except Exception as e:
         # Catch FileNotFoundError or other OS errors
         raise UnpackError(f"Failed to invoke apktool: {e}")
 
-    # 5) Validate that AndroidManifest.xml exists in the output
+    # 4) Validate that AndroidManifest.xml exists in the output
+    check_decoded(out_dir)
+    return out_dir
+
+class SubprocessDecoder:
+    """
+    Decode backend running unpack_apk: one apktool process (from PATH) per APK.
+
+    A decode backend has decode(apk_path, out_dir, profile, watch), which
+    decodes like unpack_apk and returns the version of the apktool that
+    actually ran, and version, the apktool its next decode will use; the
+    two key DecompileCache stores and lookups. ApktoolPool is the warm-JVM
+    backend.
+    """
+
+    @property
+    def version(self) -> str:
+        return apktool_version()
+
+    def decode(self, apk_path: str, out_dir: str, profile: DecodeProfile = FULL,
+               watch: Optional[Callable[[str], Any]] = None) -> str:
+        unpack_apk(apk_path, out_dir, profile, watch)
+        return apktool_version()
+
+def _communicate(process: subprocess.Popen, out_dir: str, input: bytes, timeout: float,
+                 watch: Optional[Callable[[str], Any]]):
+    """process.communicate(input, timeout), calling watch(out_dir) every WATCH_INTERVAL seconds."""
+    if watch is None:
+        return process.communicate(input=input, timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return process.communicate(input=input, timeout=max(0.0, min(WATCH_INTERVAL, remaining)))
+        except subprocess.TimeoutExpired:
+            if remaining <= WATCH_INTERVAL:
+                raise
+        input = None  # sent by the first call
+        try:
+            watch(out_dir)
+        except BaseException:
+            process.kill()
+            process.communicate()
+            raise
+
+def apktool_command(apktool_cmd: str, apk_path: str, out_dir: str, profile: DecodeProfile = FULL) -> List[str]:
+    """The apktool decode command line for profile."""
+    return [apktool_cmd, "d", "-f", *profile.apktool_args(), "-o", out_dir, apk_path]
+
+def prepare_out_dir(apk_path: str, out_dir: Optional[str] = None) -> str:
+    """
+    Resolve the output directory (default: <tempdir>/<apk name>), remove
+    anything already there and create its parent. Raises UnpackError.
+    """
+    if out_dir is None:
+        # Use system temp directory instead of hardcoded "tmp"
+        out_dir = _default_out_dir(apk_path)
+    if os.path.isdir(out_dir):
+        try:
+            shutil.rmtree(out_dir)
+        except (PermissionError, OSError) as e:
+            raise UnpackError(f"Cannot clean output directory: {e}")
+    # Ensure parent directory exists
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    return out_dir
+
+def check_decoded(out_dir: str) -> str:
+    """Return out_dir if apktool produced an AndroidManifest.xml there, else raise UnpackError."""
     manifest_path = os.path.join(out_dir, "AndroidManifest.xml")
     if not os.path.isfile(manifest_path):
         raise UnpackError(f"Missing AndroidManifest.xml in {out_dir}")
+    return out_dir
 
-    return out_dir
\ No newline at end of file
+def _default_out_dir(apk_path: str) -> str:
+    base = os.path.splitext(os.path.basename(apk_path))[0]
+    return os.path.join(tempfile.gettempdir(), base)
+
+def extract_manifest(apk_path: str, out_dir: Optional[str] = None) -> str:
+    """Manifest-only profile: copy the binary AndroidManifest.xml out of the zip, no apktool."""
+    if out_dir is None:
+        out_dir = _default_out_dir(apk_path)
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            manifest = apk.read("AndroidManifest.xml")
+    except KeyError:
+        raise UnpackError(f"Missing AndroidManifest.xml in {apk_path}")
+    except (OSError, zipfile.BadZipFile) as e:
+        raise UnpackError(f"Cannot read {apk_path}: {e}")
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "AndroidManifest.xml"), "wb") as f:
+            f.write(manifest)
+    except OSError as e:
+        raise UnpackError(f"Cannot write to output directory: {e}")
+    return out_dir
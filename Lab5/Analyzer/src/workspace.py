@@ -0,0 +1,256 @@
+# workspace.py
+
+import os
+import glob
+import queue
+import time
+import shutil
+import atexit
+import logging
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+from unpacker import UnpackError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+RAM_DISK = "/dev/shm"
+DEFAULT_QUOTA_MB = 2048
+# Free space a RAM disk keeps after all reservations, so decoding never fills memory
+DEFAULT_RAM_RESERVE_MB = 1024
+# Rough size of an apktool tree relative to its APK (smali and decoded XML are verbose)
+DECODE_FACTOR = 8
+TRASH_PREFIX = ".apk-workspace-trash-"
+# Bounds in seconds between two tree walks of a QuotaWatch
+MIN_WALK_INTERVAL = 1.0
+MAX_WALK_INTERVAL = 30.0
+
+# Environment overrides for the default manager (e.g. a dedicated tmpfs mount)
+WORKSPACE_ENV = "APK_WORKSPACE"
+QUOTA_ENV = "APK_WORKSPACE_QUOTA_MB"
+
+MB = 1024 * 1024
+
+class WorkspaceQuotaError(UnpackError):
+    """Raised when a decoded tree is larger than the per-job quota."""
+    pass
+
+def tree_size(path: str) -> int:
+    """Total size in bytes of the regular files under path."""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+class QuotaWatch:
+    """
+    Decode watch callback that walks the tree only when it may be near the quota.
+
+    Walking a decoded tree costs a scandir per directory, too much to repeat
+    every WATCH_INTERVAL. After each walk the next one is scheduled for when
+    the tree could first reach the quota at twice the growth rate seen so
+    far (between MIN_WALK_INTERVAL and MAX_WALK_INTERVAL seconds later);
+    calls in between return the last size. One instance per decode.
+    """
+
+    def __init__(self, manager: "WorkspaceManager", clock: Callable[[], float] = time.monotonic):
+        self.manager = manager
+        self.clock = clock
+        self.walks = 0
+        self._size = 0
+        self._walked_at: Optional[float] = None
+        self._next_walk = 0.0
+
+    def __call__(self, path: str) -> int:
+        now = self.clock()
+        if now < self._next_walk:
+            return self._size
+        size = self.manager.check_quota(path)
+        self.walks += 1
+        if self._walked_at is None or now <= self._walked_at:
+            delay = MIN_WALK_INTERVAL
+        else:
+            rate = max(size - self._size, 0) / (now - self._walked_at)
+            headroom = self.manager.quota_bytes - size
+            delay = headroom / (2 * rate) if rate > 0 else MAX_WALK_INTERVAL
+        self._size, self._walked_at = size, now
+        self._next_walk = now + min(max(delay, MIN_WALK_INTERVAL), MAX_WALK_INTERVAL)
+        return size
+
+def expected_tree_size(apk_path: str) -> int:
+    """Estimated size in bytes of apk_path decoded by apktool."""
+    try:
+        return os.path.getsize(apk_path) * DECODE_FACTOR
+    except OSError:
+        return 0
+
+class WorkspaceManager:
+    """
+    Hands out directories for decoded APKs, preferring RAM-backed storage.
+
+    Roots are tried in order: the preferred directory (e.g. a tmpfs mount),
+    /dev/shm, then the system temp directory. A root is used when its free
+    space minus the quotas of the jobs already running there still leaves
+    one more quota (plus reserve_mb on RAM disks); otherwise the last root
+    (disk) is used, as it is for a job whose expected size exceeds the
+    quota. check_quota raises WorkspaceQuotaError for a job whose tree
+    outgrew its quota; pass quota_watch() (check_quota that only walks the
+    tree when it may be near the quota) as the decoder's watch callback to
+    stop apktool soon after that happens rather than after the decode.
+
+    release() renames the directory to a trash name (instant on the same
+    file system) and deletes it on a background thread, so the small-file
+    rmtree is off the critical path. Pending deletions are finished at
+    interpreter exit (or by drain()).
+    """
+
+    def __init__(self, preferred: Optional[str] = None, quota_mb: int = DEFAULT_QUOTA_MB,
+                 use_ram_disk: bool = True, reserve_mb: int = DEFAULT_RAM_RESERVE_MB):
+        candidates = [preferred] if preferred else []
+        if use_ram_disk:
+            candidates.append(RAM_DISK)
+        candidates.append(tempfile.gettempdir())
+        self.roots: List[str] = []
+        for root in candidates:
+            root = os.path.abspath(root)
+            if root not in self.roots and os.path.isdir(root) and os.access(root, os.W_OK):
+                self.roots.append(root)
+        if not self.roots:
+            raise ValueError("No writable workspace directory available")
+
+        self.quota_bytes = quota_mb * MB
+        self.reserve_bytes = reserve_mb * MB
+        self._lock = threading.Lock()
+        self._active: Dict[str, str] = {}   # workspace path -> root
+        self._reserved: Dict[str, int] = {root: 0 for root in self.roots}
+        self._trash: "queue.Queue" = queue.Queue()
+        self._deleter: Optional[threading.Thread] = None
+        atexit.register(self.drain)
+
+        # Trees left behind by an interrupted run
+        for root in self.roots:
+            for stale in glob.glob(os.path.join(root, TRASH_PREFIX + "*")):
+                self._schedule_delete(stale)
+
+    def _has_room(self, root: str) -> bool:
+        try:
+            free = shutil.disk_usage(root).free
+        except OSError:
+            return False
+        # Everything before the disk fallback is memory-backed (tmpfs, /dev/shm)
+        margin = self.reserve_bytes if root != self.roots[-1] else 0
+        return free - self._reserved[root] - self.quota_bytes >= margin
+
+    def available_bytes(self) -> int:
+        """Free space left for new jobs on the best root (after reservations)."""
+        with self._lock:
+            best = 0
+            for root in self.roots:
+                try:
+                    best = max(best, shutil.disk_usage(root).free - self._reserved[root])
+                except OSError:
+                    continue
+            return best
+
+    def acquire(self, label: str = "apk", expected_bytes: Optional[int] = None) -> str:
+        """
+        Create and return a fresh workspace directory (label prefixes its name).
+
+        expected_bytes estimates the job's tree (see expected_tree_size); a
+        job likely to outgrow its quota reservation goes to the disk root.
+        """
+        with self._lock:
+            if expected_bytes is not None and expected_bytes > self.quota_bytes:
+                root = self.roots[-1]
+            else:
+                root = next((r for r in self.roots if self._has_room(r)), self.roots[-1])
+            if root == self.roots[-1] and len(self.roots) > 1:
+                logger.debug(f"No room on RAM-backed workspaces, using {root}")
+            path = tempfile.mkdtemp(prefix=f"{label}_", dir=root)
+            self._active[path] = root
+            self._reserved[root] += self.quota_bytes
+        logger.debug(f"Workspace {path} acquired")
+        return path
+
+    def check_quota(self, path: str) -> int:
+        """Return the size of a workspace; raise WorkspaceQuotaError if it exceeds the quota."""
+        size = tree_size(path)
+        if size > self.quota_bytes:
+            raise WorkspaceQuotaError(f"Decoded tree is {size // MB} MB, over the "
+                                      f"{self.quota_bytes // MB} MB workspace quota")
+        return size
+
+    def quota_watch(self) -> QuotaWatch:
+        """A fresh QuotaWatch for one decode's watch callback."""
+        return QuotaWatch(self)
+
+    def release(self, path: str):
+        """Give a workspace back; it is deleted asynchronously."""
+        with self._lock:
+            root = self._active.pop(path, None)
+            if root is not None:
+                self._reserved[root] -= self.quota_bytes
+        if not os.path.exists(path):
+            return
+        trash = os.path.join(os.path.dirname(path), TRASH_PREFIX + os.path.basename(path))
+        try:
+            os.rename(path, trash)
+        except OSError:
+            trash = path
+        self._schedule_delete(trash)
+
+    def _schedule_delete(self, path: str):
+        self._trash.put(path)
+        with self._lock:
+            if self._deleter is None:
+                self._deleter = threading.Thread(target=self._delete_loop, name="workspace-cleanup", daemon=True)
+                self._deleter.start()
+
+    def _delete_loop(self):
+        while True:
+            path = self._trash.get()
+            try:
+                shutil.rmtree(path)
+            except FileNotFoundError:
+                pass  # removed by another process cleaning up stale trees
+            except OSError as e:
+                logger.error(f"Failed to remove workspace {path}: {e}")
+            finally:
+                self._trash.task_done()
+
+    def drain(self):
+        """Block until all pending deletions are done."""
+        self._trash.join()
+
+    @property
+    def active(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._active)
+
+_default_manager: Optional[WorkspaceManager] = None
+_default_lock = threading.Lock()
+
+def default_manager() -> WorkspaceManager:
+    """Process-wide manager, configured from APK_WORKSPACE / APK_WORKSPACE_QUOTA_MB."""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = WorkspaceManager(os.environ.get(WORKSPACE_ENV),
+                                                int(os.environ.get(QUOTA_ENV, DEFAULT_QUOTA_MB)))
+        return _default_manager
+
+def set_default_manager(manager: WorkspaceManager):
+    global _default_manager
+    with _default_lock:
+        _default_manager = manager
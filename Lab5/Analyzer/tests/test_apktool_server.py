@@ -0,0 +1,131 @@
+import sys
+import os
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import apktool_server
+from apktool_server import ApktoolPool, ApktoolServer, WarmJvmUnavailable
+from unpacker import NO_RES, UnpackError
+
+# Speaks the ApktoolServer.java protocol; "decodes" by writing an empty manifest
+FAKE_JAVA = """#!{python}
+import os, sys, time
+if "--version" in sys.argv:
+    print("2.9.3-jar")
+    sys.exit(0)
+print("READY", flush=True)
+for line in sys.stdin:
+    args = line.rstrip("\\n").split("\\t")
+    out_dir, apk = args[args.index("-o") + 1], args[-1]
+    name = os.path.basename(apk)
+    with open(os.path.join(os.path.dirname(apk), "pids.log"), "a") as log:
+        log.write(f"{{os.getpid()}} {{' '.join(args[:-3])}}\\n")
+    if "crash" in name:
+        sys.exit(3)
+    if "slow" in name:
+        time.sleep(30)
+    if "huge" in name:  # keeps writing until it is killed
+        os.makedirs(out_dir)
+        for i in range(300):
+            with open(os.path.join(out_dir, f"blob{{i}}.bin"), "wb") as blob:
+                blob.write(bytes(256 * 1024))
+            time.sleep(0.1)
+    if "bad" in name:
+        sys.stderr.write("brut.androlib.AndrolibException: broken resources\\n")
+        sys.stderr.flush()
+        print("DONE\\t1\\t", flush=True)
+        continue
+    os.makedirs(out_dir)
+    open(os.path.join(out_dir, "AndroidManifest.xml"), "w").close()
+    print("DONE\\t0\\t", flush=True)
+"""
+
+@pytest.fixture
+def fake_java(tmp_path):
+    if os.name != "posix":
+        pytest.skip("fake java script needs a POSIX shebang")
+    script = tmp_path / "java"
+    script.write_text(FAKE_JAVA.format(python=sys.executable))
+    script.chmod(0o755)
+    jar = tmp_path / "apktool.jar"
+    jar.write_bytes(b"PK")
+    return str(script), str(jar)
+
+def apk(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"PK")
+    return str(path)
+
+def pids(tmp_path):
+    return [line.split()[0] for line in (tmp_path / "pids.log").read_text().splitlines()]
+
+def test_server_reuses_one_jvm(tmp_path, fake_java):
+    java, jar = fake_java
+    server = ApktoolServer(jar=jar, java=java, max_jobs=3)
+    try:
+        for i in range(4):
+            out_dir = server.decode(apk(tmp_path, f"app{i}.apk"), str(tmp_path / "out" / str(i)), NO_RES)
+            assert os.path.isfile(os.path.join(out_dir, "AndroidManifest.xml"))
+        with pytest.raises(UnpackError, match="broken resources"):
+            server.decode(apk(tmp_path, "bad.apk"), str(tmp_path / "out" / "bad"))
+    finally:
+        server.close()
+    used = pids(tmp_path)
+    assert len(set(used[:3])) == 1 and used[3] != used[0]  # restarted after max_jobs
+    assert "--no-res" in (tmp_path / "pids.log").read_text().splitlines()[0]
+
+def test_server_timeout_and_crash(tmp_path, fake_java):
+    java, jar = fake_java
+    server = ApktoolServer(jar=jar, java=java)
+    try:
+        with pytest.raises(UnpackError, match="timed out"):
+            server.decode(apk(tmp_path, "slow.apk"), str(tmp_path / "out" / "slow"), timeout=0.5)
+        assert not server.running
+        with pytest.raises(WarmJvmUnavailable):
+            server.decode(apk(tmp_path, "crash.apk"), str(tmp_path / "out" / "crash"))
+    finally:
+        server.close()
+
+def test_server_watch_kills_a_growing_decode(tmp_path, fake_java, monkeypatch):
+    monkeypatch.setattr(apktool_server, "WATCH_INTERVAL", 0.2)
+    sizes = []
+
+    def watch(out_dir):
+        sizes.append(sum(os.path.getsize(os.path.join(out_dir, n)) for n in os.listdir(out_dir))
+                     if os.path.isdir(out_dir) else 0)
+        if sizes[-1] > 1024 * 1024:
+            raise UnpackError("over quota")
+
+    java, jar = fake_java
+    server = ApktoolServer(jar=jar, java=java)
+    try:
+        with pytest.raises(UnpackError, match="over quota"):
+            server.decode(apk(tmp_path, "huge.apk"), str(tmp_path / "out" / "huge"), watch=watch)
+        assert not server.running and sizes[-1] < 5 * 1024 * 1024
+        # The next job gets a fresh JVM
+        assert server.decode(apk(tmp_path, "ok.apk"), str(tmp_path / "out" / "ok"), watch=watch)
+    finally:
+        server.close()
+
+def test_pool_falls_back_to_subprocess(tmp_path, fake_java, monkeypatch):
+    calls = []
+    monkeypatch.setattr(apktool_server, "unpack_apk", lambda *args: calls.append(args) or args[1])
+
+    pool = ApktoolPool(java=None, jar=None)
+    monkeypatch.setattr(apktool_server.shutil, "which", lambda name: None)
+    # Each decode reports the apktool that ran: here apktool on PATH (absent, so "none")
+    assert pool.decode(apk(tmp_path, "a.apk"), str(tmp_path / "out")) == "none"
+    assert not pool.available and pool.fallbacks == 1 and calls[0][1] == str(tmp_path / "out")
+    assert pool.version == "none"  # ... which decodes from now on
+
+    java, jar = fake_java
+    with ApktoolPool(2, jar=jar, java=java) as pool:
+        assert pool.version == "2.9.3-jar"
+        assert pool.decode(apk(tmp_path, "crash.apk"), str(tmp_path / "out2")) == "none"
+        assert pool.available and len(calls) == 2  # the job is retried, the pool stays warm
+        assert pool.decode(apk(tmp_path, "ok.apk"), str(tmp_path / "out3")) == "2.9.3-jar"
+        assert len(calls) == 2
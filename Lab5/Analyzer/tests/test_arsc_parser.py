@@ -0,0 +1,138 @@
+import sys
+import os
+import struct
+import zipfile
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from arsc_parser import ArscError, ArscParser, extract_arsc_strings
+from strings_extractor import extract_apk_resource_strings, extract_strings
+
+REPAY_APK = os.path.join(os.path.dirname(__file__), "..", "APK", "repay.apk")
+
+def string_pool(strings, utf8=True):
+    """Build a ResStringPool chunk."""
+    data = b""
+    offsets = []
+    for value in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = value.encode("utf-8")
+            data += bytes([len(value), len(encoded)]) + encoded + b"\x00"
+        else:
+            data += struct.pack("<H", len(value)) + value.encode("utf-16-le") + b"\x00\x00"
+    data += b"\x00" * (-len(data) % 4)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    flags = 0x100 if utf8 else 0
+    header = struct.pack("<HHIIIIII", 0x0001, header_size, strings_start + len(data),
+                         len(strings), 0, flags, strings_start, 0)
+    return header + struct.pack(f"<{len(strings)}I", *offsets) + data
+
+def config(language=b"\x00\x00", country=b"\x00\x00"):
+    return struct.pack("<I", 36) + b"\x00" * 4 + language + country + b"\x00" * 24
+
+def type_chunk(type_id, entries, locale_config):
+    """entries: list of None, (key, value_index) or (key, [value_index, ...]) for bags."""
+    body = b""
+    offsets = []
+    for entry in entries:
+        if entry is None:
+            offsets.append(0xFFFFFFFF)
+            continue
+        offsets.append(len(body))
+        key, value = entry
+        if isinstance(value, list):
+            body += struct.pack("<HHIII", 16, 0x0001, key, 0, len(value))
+            for i, index in enumerate(value):
+                body += struct.pack("<IHBBI", 0x02000000 + i, 8, 0, 0x03, index)
+        else:
+            body += struct.pack("<HHI", 8, 0, key) + struct.pack("<HBBI", 8, 0, 0x03, value)
+    header_size = 20 + len(locale_config)
+    entries_start = header_size + 4 * len(entries)
+    header = struct.pack("<HHIBBHII", 0x0201, header_size, entries_start + len(body),
+                         type_id, 0, 0, len(entries), entries_start) + locale_config
+    return header + struct.pack(f"<{len(entries)}I", *offsets) + body
+
+def build_arsc(values, types, keys, type_chunks, package="com.example.bank"):
+    type_pool = string_pool(types, utf8=False)
+    key_pool = string_pool(keys)
+    header_size = 288
+    name = package.encode("utf-16-le").ljust(256, b"\x00")
+    package_body = type_pool + key_pool + b"".join(type_chunks)
+    package_chunk = struct.pack("<HHII", 0x0200, header_size, header_size + len(package_body), 0x7f) + name
+    package_chunk += struct.pack("<IIIII", header_size, len(types), header_size + len(type_pool), len(keys), 0)
+    package_chunk += package_body
+    global_pool = string_pool(values)
+    return struct.pack("<HHII", 0x0002, 12, 12 + len(global_pool) + len(package_chunk), 1) + global_pool + package_chunk
+
+@pytest.fixture
+def arsc_data():
+    values = ["Bank Login", "Connexion bancaire", "Enter your PIN", "Entrez votre code PIN",
+              "https://phish.example.com", "res/drawable/icon.png", "one", "two"]
+    return build_arsc(
+        values,
+        types=["drawable", "string", "array"],
+        keys=["icon", "title", "prompt", "server", "choices"],
+        type_chunks=[
+            type_chunk(1, [(0, 5)], config()),
+            type_chunk(2, [(1, 0), (2, 2), (3, 4)], config()),
+            type_chunk(2, [(1, 1), None, (2, 3)], config(b"fr")),
+            type_chunk(3, [(4, [6, 7])], config()),
+        ])
+
+def test_parser_iterates_every_locale(arsc_data):
+    parser = ArscParser(arsc_data)
+    resources = list(parser.iter_strings())
+    assert {r.package for r in resources} == {"com.example.bank"}
+    by_key = {(r.type, r.name, r.locale): r.value for r in resources}
+    assert by_key[("string", "title", "")] == "Bank Login"
+    assert by_key[("string", "title", "fr")] == "Connexion bancaire"
+    assert by_key[("string", "prompt", "fr")] == "Entrez votre code PIN"
+    assert by_key[("drawable", "icon", "")] == "res/drawable/icon.png"
+    assert ("string", "server", "fr") not in by_key  # no entry in the fr configuration
+    assert sorted(r.value for r in resources if r.type == "array") == ["one", "two"]
+    assert len(list(parser.iter_global_strings())) == 8
+
+def test_parser_locale_filter(arsc_data):
+    resources = list(ArscParser(arsc_data).iter_strings(locales={"fr"}))
+    assert {r.value for r in resources} == {"Connexion bancaire", "Entrez votre code PIN"}
+
+def test_resource_names(arsc_data):
+    names = ArscParser(arsc_data).resource_names()
+    assert names[0x7F010000] == "drawable/icon"
+    assert names[0x7F020000] == "string/title"
+    assert names[0x7F020002] == "string/server"
+    assert names[0x7F030000] == "array/choices"
+    assert len(names) == 5  # an entry in several configurations is named once
+
+def test_extract_arsc_strings_from_apk(tmpdir, arsc_data):
+    apk_path = str(tmpdir.join("bank.apk"))
+    with zipfile.ZipFile(apk_path, "w") as apk:
+        apk.writestr("resources.arsc", arsc_data)
+    by_locale = extract_arsc_strings(apk_path)
+    assert by_locale[""] == ["Bank Login", "Enter your PIN", "https://phish.example.com", "one", "two"]
+    assert by_locale["fr"] == ["Connexion bancaire", "Entrez votre code PIN"]
+
+    # Resource strings of every locale feed the interesting strings
+    strings = extract_strings(str(tmpdir), resource_strings=set().union(*by_locale.values()))
+    assert "Connexion bancaire" in strings
+
+def test_missing_or_invalid_table(tmpdir):
+    apk_path = str(tmpdir.join("empty.apk"))
+    with zipfile.ZipFile(apk_path, "w") as apk:
+        apk.writestr("classes.dex", b"dex\n035\x00")
+    with pytest.raises(ArscError):
+        ArscParser.from_apk(apk_path)
+    assert extract_apk_resource_strings(apk_path) is None
+    with pytest.raises(ArscError):
+        ArscParser(b"\x03\x00\x08\x00\x10\x00\x00\x00" + b"\x00" * 8)
+
+@pytest.mark.skipif(not os.path.isfile(REPAY_APK), reason="sample APK not available")
+def test_real_apk_resources():
+    by_locale = extract_arsc_strings(REPAY_APK, types=("string",))
+    assert len(by_locale[""]) > 50
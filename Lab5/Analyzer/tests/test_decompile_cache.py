@@ -0,0 +1,103 @@
+import sys
+import os
+import time
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from decompile_cache import DecompileCache
+from unpacker import FULL, NO_RES
+from workspace import WorkspaceManager
+
+def make_tree(root, marker="v1"):
+    os.makedirs(os.path.join(root, "smali", "com", "ex"), exist_ok=True)
+    with open(os.path.join(root, "AndroidManifest.xml"), "w") as f:
+        f.write('<manifest package="com.ex"/>')
+    with open(os.path.join(root, "smali", "com", "ex", "A.smali"), "w") as f:
+        f.write(f'.class public Lcom/ex/A;\nconst-string v0, "{marker}"\n')
+    return root
+
+@pytest.fixture
+def apk(tmp_path):
+    path = tmp_path / "sample.apk"
+    path.write_bytes(b"PK\x05\x06" + b"\x00" * 18)
+    return str(path)
+
+def test_key_depends_on_hash_version_and_profile(tmp_path, apk):
+    cache = DecompileCache(str(tmp_path / "cache"))
+    key = cache.key(apk, FULL, "2.9.3")
+    assert key.endswith(".2.9.3.full") and len(key.split(".")[0]) == 64
+    assert cache.key(apk, NO_RES, "2.9.3") != key
+    assert cache.key(apk, FULL, "2.10.0") != key
+    assert cache.key(apk, FULL, "2.9.3", sha256=key.split(".")[0]) == key
+
+def test_put_and_get_round_trip(tmp_path, apk):
+    cache = DecompileCache(str(tmp_path / "cache"))
+    key = cache.key(apk, FULL, "2.9.3")
+    assert not cache.get(key, str(tmp_path / "miss"))
+    assert cache.put(key, make_tree(str(tmp_path / "decoded"))) is not None
+    assert key in cache
+
+    dest = str(tmp_path / "restored")
+    assert cache.get(key, dest)
+    with open(os.path.join(dest, "smali", "com", "ex", "A.smali")) as f:
+        assert '"v1"' in f.read()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_lru_eviction(tmp_path):
+    cache = DecompileCache(str(tmp_path / "cache"), max_mb=1)
+    big = make_tree(str(tmp_path / "big"))
+    with open(os.path.join(big, "blob.bin"), "wb") as f:
+        f.write(os.urandom(400 * 1024))  # incompressible
+
+    cache.put("a", big)
+    cache.put("b", big)
+    old = time.time() - 60
+    os.utime(os.path.join(cache.cache_dir, "a.tar.gz"), (old, old))
+    os.utime(os.path.join(cache.cache_dir, "b.tar.gz"), (old - 60, old - 60))
+    assert cache.get("b", str(tmp_path / "use-b"))  # b is now the most recently used
+
+    cache.put("c", big)
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+    assert cache.size() <= cache.max_bytes
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DecompileCache(str(tmp_path / "cache"))
+    with open(os.path.join(cache.cache_dir, "bad.tar.gz"), "wb") as f:
+        f.write(b"not a tar")
+    assert not cache.get("bad", str(tmp_path / "dest"))
+    assert "bad" not in cache
+
+class FallingBackBackend:
+    """A warm-JVM pool whose jar stops working during the first decode."""
+    def __init__(self):
+        self.version = "2.9.3-jar"
+        self.decodes = 0
+
+    def decode(self, apk_path, out_dir, profile, watch=None):
+        self.decodes += 1
+        self.version = "2.7.0"  # apktool on PATH decodes this job, and the next ones
+        make_tree(out_dir)
+        return self.version
+
+def test_unpack_for_analysis_keys_by_the_backend(tmp_path, apk):
+    analyzer_dir = os.path.dirname(src_path)
+    if analyzer_dir not in sys.path:
+        sys.path.insert(0, analyzer_dir)
+    from analyse_apk import cleanup_decompiled, unpack_for_analysis
+
+    (tmp_path / "ws").mkdir()
+    workspaces = WorkspaceManager(str(tmp_path / "ws"), reserve_mb=0)
+    cache, backend = DecompileCache(str(tmp_path / "cache")), FallingBackBackend()
+    for _ in range(2):
+        decompile_dir = unpack_for_analysis(apk, workspaces=workspaces, cache=cache, backend=backend)
+        assert os.path.isfile(os.path.join(decompile_dir, "smali", "com", "ex", "A.smali"))
+        cleanup_decompiled(decompile_dir, workspaces)
+    workspaces.drain()
+    # Stored under the apktool that ran, and found again under it
+    assert backend.decodes == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert cache.key(apk, FULL, "2.7.0") in cache
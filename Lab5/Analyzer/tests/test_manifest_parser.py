@@ -1,5 +1,7 @@
 import sys
 import os
+import struct
+import zipfile
 import pytest
 from unittest.mock import patch
 from lxml import etree
@@ -9,7 +11,9 @@ src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
-from manifest_parser import parse_manifest, ManifestData, Permission, Component
+from manifest_parser import (parse_manifest, parse_manifest_from_apk, iterparse_manifest, resolve_references,
+                             ManifestData, Permission, Component)
+from arsc_parser import ArscError
 
 SAMPLE_MANIFEST = """<manifest xmlns:android="http://schemas.android.com/apk/res/android"
     package="com.example.testapp"
@@ -77,6 +81,150 @@ def test_parse_mocked_manifest():
         assert any(c.type == "receiver" and "BootReceiver" in c.name for c in components)
         assert any(c.type == "provider" and "DataProvider" in c.name for c in components)
 
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+
+def build_axml(elements):
+    """
+    Build a binary AXML document from (tag, [(name, resource_id, value)], children) tuples.
+    
+    String values are stored as raw strings, booleans and ints as typed values.
+    """
+    strings = [ANDROID_NS, "android"]
+    resource_ids = []
+
+    def index(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    def collect(element):
+        for name, resource_id, _value in element[1]:
+            if resource_id and name not in strings[:len(resource_ids)]:
+                # Attribute names with a resource ID come first (resource map order)
+                strings.insert(len(resource_ids), name)
+                resource_ids.append(resource_id)
+        for child in element[2]:
+            collect(child)
+
+    for element in elements:
+        collect(element)
+
+    def node(chunk_type, ext):
+        return struct.pack("<HHIII", chunk_type, 16, 16 + len(ext), 1, 0xFFFFFFFF) + ext
+
+    def emit(element):
+        tag, attributes, children = element
+        body = b""
+        for name, resource_id, value in attributes:
+            ns = 0 if resource_id else 0xFFFFFFFF
+            if isinstance(value, bool):
+                typed = (0xFFFFFFFF, 0x12, 0xFFFFFFFF if value else 0)
+            elif isinstance(value, int):
+                typed = (0xFFFFFFFF, 0x10, value)
+            else:
+                typed = (index(value), 0x03, index(value))
+            body += struct.pack("<IIIHBBI", ns, index(name), typed[0], 8, 0, typed[1], typed[2])
+        start = struct.pack("<IIHHHHHH", 0xFFFFFFFF, index(tag), 20, 20, len(attributes), 0, 0, 0) + body
+        chunks = node(0x0102, start)
+        for child in children:
+            chunks += emit(child)
+        return chunks + node(0x0103, struct.pack("<II", 0xFFFFFFFF, index(tag)))
+
+    elements_data = b"".join(emit(element) for element in elements)
+    pool_data, offsets = b"", []
+    for value in strings:
+        offsets.append(len(pool_data))
+        pool_data += struct.pack("<H", len(value)) + value.encode("utf-16-le") + b"\x00\x00"
+    pool_data += b"\x00" * (-len(pool_data) % 4)
+    strings_start = 28 + 4 * len(strings)
+    pool = struct.pack("<HHIIIIII", 0x0001, 28, strings_start + len(pool_data), len(strings), 0, 0, strings_start, 0)
+    pool += struct.pack(f"<{len(strings)}I", *offsets) + pool_data
+    resource_map = struct.pack("<HHI", 0x0180, 8, 8 + 4 * len(resource_ids)) + struct.pack(f"<{len(resource_ids)}I", *resource_ids)
+    body = pool + resource_map + elements_data
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+BINARY_MANIFEST = build_axml([
+    ("manifest", [("versionCode", 0x0101021b, 7), ("package", 0, "com.example.dropper")], [
+        ("uses-sdk", [("minSdkVersion", 0x0101020c, 19), ("targetSdkVersion", 0x01010270, 28)], []),
+        ("uses-permission", [("name", 0x01010003, "android.permission.RECEIVE_SMS")], []),
+        ("application", [("debuggable", 0x0101000f, True)], [
+            ("receiver", [("name", 0x01010003, ".SmsReceiver")], [
+                ("intent-filter", [], [
+                    ("action", [("name", 0x01010003, "android.provider.Telephony.SMS_RECEIVED")], []),
+                ]),
+            ]),
+            # Obfuscated: the attribute name string is blanked, the resource ID still says android:name
+            ("activity", [("", 0x01010003, ".Main"), ("exported", 0x01010010, False)], []),
+        ]),
+    ]),
+])
+
+def test_parse_binary_manifest_from_apk(tmp_path):
+    apk_path = str(tmp_path / "dropper.apk")
+    with zipfile.ZipFile(apk_path, "w") as apk:
+        apk.writestr("AndroidManifest.xml", BINARY_MANIFEST)
+
+    result = parse_manifest_from_apk(apk_path)
+    assert result.package_name == "com.example.dropper"
+    assert result.version_code == 7
+    assert (result.min_sdk, result.target_sdk) == (19, 28)
+    assert result.debuggable is True
+    assert [p.name for p in result.permissions] == ["android.permission.RECEIVE_SMS"]
+    # Components are grouped by type (activities first), like the decoded XML path
+    assert [(c.type, c.name) for c in result.components] == [
+        ("activity", "com.example.dropper.Main"), ("receiver", "com.example.dropper.SmsReceiver")]
+    activity, receiver = result.components
+    assert activity.exported is False
+    assert receiver.exported is True  # implied by the intent filter
+    assert receiver.intent_filters == [
+        {"actions": ["android.provider.Telephony.SMS_RECEIVED"], "categories": [], "data": []}]
+
+    # parse_manifest accepts the APK itself, and apktool --no-res output (binary manifest)
+    assert parse_manifest(apk_path) == result
+    (tmp_path / "decoded").mkdir()
+    (tmp_path / "decoded" / "AndroidManifest.xml").write_bytes(BINARY_MANIFEST)
+    assert parse_manifest(str(tmp_path / "decoded")) == result
+
+class FakeTable:
+    def __init__(self, names):
+        self.names = names
+
+    def resource_names(self):
+        return self.names
+
+def application(**custom_attributes):
+    return ManifestData("com.example.dropper", 1, "1.0", 19, 28, [], [], custom_attributes=custom_attributes)
+
+def test_resolve_references():
+    manifest = application(theme="@7F0A0008", icon="@7F010000", label="@0104000A", allowBackup="true")
+    resolved = resolve_references(manifest, lambda: FakeTable({0x7F0A0008: "style/AppTheme", 0x7F010000: "drawable/icon"}))
+    assert resolved.custom_attributes == {
+        "theme": "@style/AppTheme", "icon": "@drawable/icon",
+        "label": "@0104000A",  # framework resource, not in the APK's table
+        "allowBackup": "true"}
+
+    # Without a readable table the raw IDs are kept; nothing to resolve, nothing loaded
+    def unreadable():
+        raise ArscError("resources.arsc not found")
+    assert resolve_references(application(theme="@7F0A0008"), unreadable).custom_attributes == {"theme": "@7F0A0008"}
+    assert resolve_references(application(), unreadable).custom_attributes == {}
+
+def test_iterparse_matches_tree_parse(tmp_path):
+    manifest_path = tmp_path / "AndroidManifest.xml"
+    manifest_path.write_text(SAMPLE_MANIFEST)
+    streamed = iterparse_manifest(str(manifest_path))
+    assert streamed == parse_manifest(str(tmp_path))
+    provider = next(c for c in streamed.components if c.type == "provider")
+    assert provider.exported is True
+    assert provider.permission == "com.example.testapp.CUSTOM_PERMISSION"
+
+def test_invalid_binary_manifest(tmp_path):
+    apk_path = str(tmp_path / "broken.apk")
+    with zipfile.ZipFile(apk_path, "w") as apk:
+        apk.writestr("AndroidManifest.xml", BINARY_MANIFEST[:8] + b"\x00" * 16)
+    with pytest.raises(ValueError):
+        parse_manifest_from_apk(apk_path)
+
 VALID_APK_PATH = os.path.join("APK", "app_login.apk")
 
 @pytest.mark.skipif(not os.path.isfile(VALID_APK_PATH), reason="Real APK not found.")
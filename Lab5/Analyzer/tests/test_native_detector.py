@@ -46,6 +46,21 @@ def test_analyze_native_usage_detect(tmp_path):
     usage = analyze_native_function_usage(str(app_dir))
     assert usage.get("bar.so") == 1
 
+def test_analyze_native_usage_many_dexes(tmp_path):
+    app_dir = tmp_path / "app"
+    lib_dir = app_dir / "lib" / "arm64-v8a"
+    lib_dir.mkdir(parents=True)
+    (lib_dir / "bar.so").write_bytes(b"binary")
+    for name in ["smali", "smali_classes5", "smali_classes11"]:
+        smali_dir = app_dir / name
+        smali_dir.mkdir()
+        (smali_dir / "Loader.smali").write_text(
+            'const-string v0, "bar"\n'
+            'invoke-static {v0}, Ljava/lang/System;->loadLibrary(Ljava/lang/String;)V\n'
+        )
+    usage = analyze_native_function_usage(str(app_dir))
+    assert usage.get("bar.so") == 3
+
 VALID_APK_PATH = os.path.join("APK", "app_login.apk")
 
 @pytest.mark.skipif(not os.path.isfile(VALID_APK_PATH), reason="APK not found")
@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import patterns
+from patterns import DEFAULT_PATTERNS, PatternRegistry, load_pattern_config
+from reflection_detector import detect_reflection
+from string_ranker import StringRanker
+from strings_extractor import extract_strings_bounded
+
+def test_registry_compiles_defaults_once():
+    registry = PatternRegistry(DEFAULT_PATTERNS)
+    assert len(registry.group("reflection")) == 7
+    assert len(registry.group("dynamic_loading")) == 4
+    assert len(registry.group("native")) == 3
+    assert registry.group("reflection") is registry.group("reflection")
+    assert registry.get("smali", "class_name").search(".class public Lcom/a/B;").group(1) == "Lcom/a/B;"
+    assert registry.group("unknown") == {}
+
+def test_invalid_pattern_raises_value_error():
+    registry = PatternRegistry()
+    with pytest.raises(ValueError):
+        registry.register("strings", "broken", "(unclosed")
+
+def test_config_extends_detector_patterns(tmp_path, monkeypatch):
+    registry = PatternRegistry(DEFAULT_PATTERNS)
+    monkeypatch.setattr(patterns, "REGISTRY", registry)
+    monkeypatch.setattr(sys.modules["reflection_detector"], "REGISTRY", registry)
+    config = tmp_path / "patterns.json"
+    config.write_text(json.dumps({"dynamic_loading": {
+        "BaseDexClassLoader": "new-instance [^,]+, Ldalvik/system/BaseDexClassLoader;"}}))
+    assert load_pattern_config(str(config), registry) == 1
+
+    smali_dir = tmp_path / "app" / "smali"
+    smali_dir.mkdir(parents=True)
+    (smali_dir / "A.smali").write_text(".class public LA;\nnew-instance v0, Ldalvik/system/BaseDexClassLoader;\n")
+    info = detect_reflection(str(tmp_path / "app"), max_workers=1)
+    assert [d["type"] for d in info.dynamic_loading] == ["BaseDexClassLoader"]
+
+def test_config_patterns_reach_worker_processes(tmp_path, monkeypatch):
+    """Worker processes import a fresh REGISTRY, so the overrides must be passed to them."""
+    registry = PatternRegistry(DEFAULT_PATTERNS)
+    for module in ("patterns", "reflection_detector", "strings_extractor"):
+        monkeypatch.setattr(sys.modules[module], "REGISTRY", registry)
+    config = tmp_path / "patterns.json"
+    config.write_text(json.dumps({
+        "ranking": {"onion": "\\.onion$"},
+        "smali": {"class_name": "\\.source \"([^\"]+)\""},
+    }))
+    assert load_pattern_config(str(config), registry) == 2
+
+    app = tmp_path / "app"
+    for index, name in enumerate(("smali", "smali_classes2")):
+        (app / name).mkdir(parents=True)
+        (app / name / f"A{index}.smali").write_text(
+            f".class public LA{index};\n.source \"Source{index}.java\"\n"
+            "new-instance v0, Ldalvik/system/DexClassLoader;\n"
+            f'    const-string v1, "hidden{index}.onion"\n')
+
+    ranker = StringRanker(top_k=5)
+    retained, _ = extract_strings_bounded(str(app), max_workers=2, ranker=ranker)
+    assert set(retained) == {"hidden0.onion", "hidden1.onion"}
+    assert {s["value"] for s in ranker.ranked()["onion"]} == set(retained)
+    info = detect_reflection(str(app), max_workers=2)
+    assert {d["class"] for d in info.dynamic_loading} == {"Source0.java", "Source1.java"}
+
+def test_malformed_config(tmp_path):
+    config = tmp_path / "patterns.json"
+    config.write_text(json.dumps({"strings": ["not", "a", "mapping"]}))
+    with pytest.raises(ValueError):
+        load_pattern_config(str(config), PatternRegistry())
@@ -0,0 +1,117 @@
+import sys
+import os
+import time
+import threading
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from pipeline import AnalysisPipeline
+
+class FakeStages:
+    """Unpack/analyse/cleanup stand-ins that record concurrency."""
+
+    def __init__(self, unpack_delay=0.02, analyse_delay=0.02, fail=()):
+        self.unpack_delay = unpack_delay
+        self.analyse_delay = analyse_delay
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.live_dirs = set()
+        self.max_live_dirs = 0
+        self.overlapped = False
+        self.unpacking = 0
+        self.analysing = 0
+        self.cleaned = []
+
+    def unpack(self, apk_path):
+        with self.lock:
+            self.unpacking += 1
+            self.overlapped |= self.analysing > 0
+        time.sleep(self.unpack_delay)
+        with self.lock:
+            self.unpacking -= 1
+            if apk_path in self.fail:
+                raise RuntimeError("apktool failed")
+            decompile_dir = apk_path + "_decoded"
+            self.live_dirs.add(decompile_dir)
+            self.max_live_dirs = max(self.max_live_dirs, len(self.live_dirs))
+        return decompile_dir
+
+    def analyse(self, apk_path, decompile_dir):
+        with self.lock:
+            self.analysing += 1
+            self.overlapped |= self.unpacking > 0
+        time.sleep(self.analyse_delay)
+        with self.lock:
+            self.analysing -= 1
+        return {"apk_file": os.path.basename(apk_path), "decompile_dir": decompile_dir}
+
+    def cleanup(self, decompile_dir):
+        with self.lock:
+            self.live_dirs.discard(decompile_dir)
+            self.cleaned.append(decompile_dir)
+
+def make_pipeline(stages, **kwargs):
+    kwargs.setdefault("disk_free", lambda path: 10**12)
+    return AnalysisPipeline(stages.unpack, stages.analyse, stages.cleanup, **kwargs)
+
+def test_pipeline_overlaps_stages_and_reports_every_sample():
+    stages = FakeStages()
+    apks = [f"sample{i}.apk" for i in range(8)]
+    results = []
+    caller = threading.current_thread()
+    stats = make_pipeline(stages, unpack_workers=2, detector_workers=2).run(
+        apks, on_result=lambda item: results.append((item, threading.current_thread())))
+
+    assert sorted(item.apk_path for item, _ in results) == apks
+    assert all(thread is caller for _, thread in results)  # results are handled in the calling thread
+    assert all(item.report["decompile_dir"] == item.apk_path + "_decoded" for item, _ in results)
+    assert stats.samples == 8 and stats.failed == 0
+    assert stages.overlapped
+    assert sorted(stages.cleaned) == sorted(a + "_decoded" for a in apks)
+    assert not stages.live_dirs
+
+def test_pipeline_bounds_decoded_directories():
+    # Slow detectors: decoding must not run ahead by more than queue + workers
+    stages = FakeStages(unpack_delay=0.001, analyse_delay=0.02)
+    stats = make_pipeline(stages, unpack_workers=3, detector_workers=1, queue_size=1).run(
+        [f"s{i}.apk" for i in range(10)])
+    assert stats.samples == 10
+    assert stats.max_ready <= 1
+    # 1 being analysed + 1 queued + 3 decoded by blocked apktool workers
+    assert stages.max_live_dirs <= 5
+
+def test_pipeline_waits_for_disk_space():
+    stages = FakeStages(unpack_delay=0.001, analyse_delay=0.01)
+    # Disk always below the threshold: one sample in flight at a time, but no stall
+    stats = make_pipeline(stages, unpack_workers=3, detector_workers=2, disk_free=lambda path: 0).run(
+        [f"s{i}.apk" for i in range(5)])
+    assert stats.samples == 5
+    assert stages.max_live_dirs == 1
+    assert stats.disk_waits > 0
+
+def test_pipeline_reports_failures():
+    stages = FakeStages(fail={"bad.apk"})
+
+    def analyse(apk_path, decompile_dir):
+        if apk_path == "crash.apk":
+            raise ValueError("detector crashed")
+        return stages.analyse(apk_path, decompile_dir)
+
+    pipeline = AnalysisPipeline(stages.unpack, analyse, stages.cleanup, disk_free=lambda path: 10**12)
+    results = {}
+    stats = pipeline.run(["ok.apk", "bad.apk", "crash.apk"], on_result=lambda item: results.update({item.apk_path: item}))
+
+    assert stats.samples == 3 and stats.failed == 2
+    assert results["ok.apk"].error is None
+    assert results["bad.apk"].error.startswith("Unpacking failed")
+    assert "detector crashed" in results["crash.apk"].error
+    assert "crash.apk_decoded" in stages.cleaned
+
+def test_pipeline_rejects_bad_worker_counts():
+    stages = FakeStages()
+    with pytest.raises(ValueError):
+        make_pipeline(stages, unpack_workers=0)
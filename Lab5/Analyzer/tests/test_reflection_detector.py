@@ -8,6 +8,7 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 from reflection_detector import detect_reflection, extract_class_name, ReflectionInfo
+from smali_walker import PackageFilter
 from unpacker import unpack_apk
 
 def test_detect_reflection_empty(tmp_path):
@@ -64,3 +65,13 @@ def test_extract_class_name_missing():
 def test_extract_class_name_with_flags():
     content = ".class public abstract interface Lorg/example/MyInterface;"
     assert extract_class_name(content) == "org.example.MyInterface"
+
+def test_detect_reflection_package_filter(tmp_path):
+    lib_dir = tmp_path / "smali" / "androidx" / "core"
+    lib_dir.mkdir(parents=True)
+    (lib_dir / "Loader.smali").write_text(
+        'new-instance v0, Ldalvik/system/DexClassLoader;\n'
+    )
+    info = detect_reflection(str(tmp_path), PackageFilter(deny=["androidx/**"]))
+    assert not info.has_dynamic_loading
+    assert detect_reflection(str(tmp_path)).has_dynamic_loading
@@ -0,0 +1,78 @@
+import sys
+import os
+import json
+import gzip
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import report_codec
+from report_codec import (
+    write_compact_report,
+    read_report,
+    to_pretty_json,
+    compact_extension,
+    encode_json,
+)
+from report_sink import NDJSONReportSink
+
+SAMPLE_REPORT = {
+    "apk_file": "app.apk",
+    "analysis_timestamp": "2025-01-01T00:00:00",
+    "manifest_info": {"package_name": "com.example", "permissions": [{"name": "android.permission.SEND_SMS"}]},
+    "native_library_usage": {"libfoo.so": 2},
+    "interesting_strings": ["https://c2.example.org", "ünïcode string"],
+}
+
+def test_compact_round_trip(tmp_path):
+    path = write_compact_report(SAMPLE_REPORT, str(tmp_path / "app_report"))
+    assert path.endswith(compact_extension())
+    assert read_report(path) == SAMPLE_REPORT
+
+def test_compact_is_smaller_than_pretty_json(tmp_path):
+    big = dict(SAMPLE_REPORT, interesting_strings=[f"string number {i}" for i in range(2000)])
+    path = write_compact_report(big, str(tmp_path / "big_report"))
+    assert os.path.getsize(path) < len(json.dumps(big, indent=2))
+
+def test_gzip_fallback_without_zstd(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_codec.codec, "zstandard", None)
+    path = write_compact_report(SAMPLE_REPORT, str(tmp_path / "app_report"))
+    assert path.endswith(".json.gz")
+    with open(path, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    assert read_report(path) == SAMPLE_REPORT
+
+def test_encode_without_orjson(monkeypatch):
+    monkeypatch.setattr(report_codec.codec, "orjson", None)
+    data = encode_json(SAMPLE_REPORT)
+    assert b"\n" not in data
+    assert json.loads(data) == SAMPLE_REPORT
+
+def test_read_plain_and_ndjson_reports(tmp_path):
+    plain = tmp_path / "app_report.json"
+    plain.write_text(json.dumps(SAMPLE_REPORT, indent=2), encoding="utf-8")
+    assert read_report(str(plain)) == SAMPLE_REPORT
+
+    streamed = str(tmp_path / "app_report.ndjson")
+    with NDJSONReportSink.open(streamed) as sink:
+        sink.write_header(SAMPLE_REPORT["apk_file"], SAMPLE_REPORT["analysis_timestamp"])
+        for section in ("manifest_info", "native_library_usage", "interesting_strings"):
+            sink.emit(section, SAMPLE_REPORT[section])
+    assert read_report(streamed) == SAMPLE_REPORT
+
+def test_to_pretty_json(tmp_path):
+    path = write_compact_report(SAMPLE_REPORT, str(tmp_path / "app_report"))
+    out_path = str(tmp_path / "pretty.json")
+    text = to_pretty_json(path, out_path)
+    assert text.startswith("{\n  ")
+    with open(out_path, encoding="utf-8") as f:
+        assert json.load(f) == SAMPLE_REPORT
+
+def test_read_report_invalid(tmp_path):
+    bad = tmp_path / "bad.json.gz"
+    bad.write_bytes(gzip.compress(b"not json"))
+    with pytest.raises(ValueError):
+        read_report(str(bad))
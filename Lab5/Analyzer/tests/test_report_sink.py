@@ -0,0 +1,69 @@
+import sys
+import os
+import io
+import json
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from report_sink import NDJSONReportSink, load_ndjson_report
+
+SAMPLE_SECTIONS = {
+    "manifest_info": {"package_name": "com.example", "permissions": [{"name": "android.permission.SEND_SMS"}]},
+    "native_library_usage": {"libfoo.so": 2},
+    "reflection_dynamic_loading": {
+        "reflection_calls": [],
+        "dynamic_loading": [{"type": "DexClassLoader", "class": "com.example.A", "file": "A.smali", "line": 3}],
+        "native_method_calls": [],
+    },
+    "interesting_strings": ["https://c2.example.org", "secret_token_value"],
+}
+
+def test_each_finding_is_one_record():
+    stream = io.StringIO()
+    sink = NDJSONReportSink(stream)
+    sink.write_header("app.apk", "2025-01-01T00:00:00")
+    sink.emit("interesting_strings", SAMPLE_SECTIONS["interesting_strings"])
+    sink.emit("reflection_dynamic_loading", SAMPLE_SECTIONS["reflection_dynamic_loading"])
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records[0] == {"record": "header", "apk_file": "app.apk", "analysis_timestamp": "2025-01-01T00:00:00"}
+    findings = [r for r in records if r["record"] == "finding"]
+    assert [f["finding"] for f in findings[:2]] == SAMPLE_SECTIONS["interesting_strings"]
+    assert findings[2]["category"] == "dynamic_loading"
+    assert findings[2]["finding"]["type"] == "DexClassLoader"
+    assert sink.records_written == len(records)
+
+def test_section_mode_writes_whole_sections():
+    stream = io.StringIO()
+    sink = NDJSONReportSink(stream, per_finding=False)
+    sink.emit("interesting_strings", SAMPLE_SECTIONS["interesting_strings"])
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records == [{"record": "section", "section": "interesting_strings",
+                        "data": SAMPLE_SECTIONS["interesting_strings"]}]
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "report.ndjson")
+    with NDJSONReportSink.open(path) as sink:
+        sink.write_header("app.apk", "2025-01-01T00:00:00")
+        for section, data in SAMPLE_SECTIONS.items():
+            sink.emit(section, data)
+        sink.emit("error", "Unpacking failed: boom")
+
+    report = load_ndjson_report(path)
+    assert report["apk_file"] == "app.apk"
+    assert report["error"] == "Unpacking failed: boom"
+    for section, data in SAMPLE_SECTIONS.items():
+        assert report[section] == data
+
+def test_load_skips_truncated_line(tmp_path):
+    path = tmp_path / "partial.ndjson"
+    path.write_text(
+        '{"record": "section", "section": "interesting_strings", "data": []}\n'
+        '{"record": "finding", "section": "interesting_strings", "finding": "abc"}\n'
+        '{"record": "finding", "sect'
+    )
+    assert load_ndjson_report(str(path)) == {"interesting_strings": ["abc"]}
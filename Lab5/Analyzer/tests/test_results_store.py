@@ -0,0 +1,118 @@
+import sys
+import os
+import sqlite3
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from results_store import SCHEMA_VERSION, ResultsStore, normalise_permission
+
+def make_report(sha256, apk_file, permissions, loaders, strings):
+    return {
+        "apk_file": apk_file,
+        "sha256": sha256,
+        "manifest_info": {
+            "package_name": "com." + apk_file.split(".")[0],
+            "permissions": [{"name": p, "protection_level": None} for p in permissions],
+        },
+        "reflection_dynamic_loading": {
+            "reflection_calls": [],
+            "dynamic_loading": [{"type": t, "class": "A", "file": "A.smali", "line": 1} for t in loaders],
+            "native_method_calls": [],
+        },
+        "interesting_strings": strings,
+    }
+
+def samples_with(conn, permission, api):
+    return [row[0] for row in conn.execute(
+        "SELECT s.sample FROM samples s "
+        "WHERE s.sha256 IN (SELECT sha256 FROM permissions WHERE permission = ?) "
+        "AND s.sha256 IN (SELECT sha256 FROM api_hits WHERE api = ?) ORDER BY s.sample",
+        (permission, api))]
+
+def test_normalise_permission():
+    assert normalise_permission("android.permission.SEND_SMS") == "SEND_SMS"
+    assert normalise_permission("com.example.CUSTOM") == "com.example.CUSTOM"
+
+def test_reports_are_indexed(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    with ResultsStore(db_path, batch_size=2) as store:
+        store.add_report(make_report("a" * 64, "dropper.apk", ["android.permission.SEND_SMS"],
+                                     ["DexClassLoader", "DexClassLoader"], ["https://c2.example.org"]))
+        store.add_report(make_report("b" * 64, "clean.apk", ["android.permission.INTERNET"], [], []))
+        store.add_report(make_report("c" * 64, "loader.apk", ["android.permission.INTERNET"], ["DexClassLoader"], []))
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert samples_with(conn, "SEND_SMS", "DexClassLoader") == ["dropper.apk"]
+    assert conn.execute("SELECT COUNT(*) FROM api_hits").fetchone()[0] == 2
+    assert conn.execute("SELECT package_name FROM samples WHERE sha256 = ?", ("a" * 64,)).fetchone()[0] == "com.dropper"
+    plan = " ".join(str(r) for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT sha256 FROM string_hits WHERE value = ?", ("x",)))
+    assert "idx_string_hits_value" in plan
+
+def test_error_sections_are_skipped(tmp_path):
+    report = {"apk_file": "broken.apk", "sha256": "d" * 64,
+              "manifest_info": {"error": "bad xml"}, "interesting_strings": {"error": "boom"}}
+    with ResultsStore(str(tmp_path / "results.db")) as store:
+        store.add_report(report)
+        store.flush()
+        assert store.conn.execute("SELECT sample FROM samples").fetchall() == [("broken.apk",)]
+
+def test_report_without_hash_is_rejected(tmp_path):
+    with ResultsStore(str(tmp_path / "results.db")) as store:
+        with pytest.raises(ValueError):
+            store.add_report({"apk_file": "x.apk"})
+
+def test_interesting_strings_are_indexed(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    with ResultsStore(db_path) as store:
+        store.add_report(make_report("a" * 64, "one.apk", [], [], ["https://c2.example.org/gate", "short"]))
+        store.add_report(make_report("b" * 64, "two.apk", [], [], ["https://c2.example.org/gate", "abc"]))
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT value, kind FROM ioc_strings ORDER BY value").fetchall() == [
+        ("https://c2.example.org/gate", "url"), ("short", "string")]
+    assert conn.execute("SELECT COUNT(*) FROM ioc_postings").fetchone()[0] == 3
+    string_id = conn.execute("SELECT string_id FROM ioc_trigrams WHERE gram = 'c2.'").fetchone()[0]
+    samples = conn.execute("SELECT sha256 FROM ioc_postings WHERE string_id = ?", (string_id,)).fetchall()
+    assert sorted(samples) == [("a" * 64,), ("b" * 64,)]
+
+def test_rerecording_replaces_own_evidence(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    with ResultsStore(db_path) as store:
+        store.add_report(make_report("a" * 64, "app.apk", ["android.permission.SEND_SMS"], ["DexClassLoader"],
+                                     ["https://old.example.org"]))
+    conn = sqlite3.connect(db_path)
+    with conn:  # a Lab 8 scanner recorded the same sample
+        conn.execute("INSERT INTO api_hits (sha256, api, source) VALUES (?, 'Runtime.exec', 'scan:ZNIU')", ("a" * 64,))
+
+    with ResultsStore(db_path) as store:
+        store.add_report(make_report("a" * 64, "app.apk", ["android.permission.INTERNET"], [], []))
+        store.add_report(make_report("a" * 64, "app.apk", ["android.permission.INTERNET"], ["PathClassLoader"], []))
+    assert conn.execute("SELECT permission FROM permissions").fetchall() == [("INTERNET",)]
+    assert sorted(conn.execute("SELECT api, source FROM api_hits").fetchall()) == [
+        ("PathClassLoader", "analyse_apk"), ("Runtime.exec", "scan:ZNIU")]
+    assert conn.execute("SELECT COUNT(*) FROM string_hits").fetchone()[0] == 0
+    # ... and its IOC index postings: the old string no longer finds the sample
+    assert conn.execute("SELECT COUNT(*) FROM ioc_postings").fetchone()[0] == 0
+
+def test_failures_are_recorded(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    with ResultsStore(db_path) as store:
+        store.add_failure("e" * 64, "/samples/broken.apk", "Unpacking failed: apktool exited with 1")
+        store.add_report(make_report("a" * 64, "app.apk", [], [], []))
+    conn = sqlite3.connect(db_path)
+    assert sorted(conn.execute("SELECT sample, source, status, error FROM sample_status").fetchall()) == [
+        ("app.apk", "analyse_apk", "ok", None),
+        ("broken.apk", "analyse_apk", "error", "Unpacking failed: apktool exited with 1")]
+    assert conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 1  # no evidence for the failed sample
+
+    # A later successful analysis clears the failure
+    with ResultsStore(db_path) as store:
+        store.add_report(make_report("e" * 64, "broken.apk", [], [], []))
+    assert conn.execute("SELECT COUNT(*) FROM sample_status WHERE status != 'ok'").fetchone()[0] == 0
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
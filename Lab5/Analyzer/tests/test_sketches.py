@@ -0,0 +1,52 @@
+import sys
+import os
+import pickle
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from sketches import BloomFilter, HyperLogLog
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    assert bloom.add("https://c2.example.com")
+    assert not bloom.add("https://c2.example.com")
+    assert "https://c2.example.com" in bloom
+    assert bloom.count == 1
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(capacity=20_000, error_rate=0.01)
+    for i in range(20_000):
+        bloom.add(f"member-{i}")
+    assert all(f"member-{i}" in bloom for i in range(0, 20_000, 97))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+    assert bloom.size_bytes < 30_000  # ~9.6 bits per item
+
+def test_bloom_filter_rejects_bad_parameters():
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=0)
+    with pytest.raises(ValueError):
+        BloomFilter(error_rate=1.5)
+
+@pytest.mark.parametrize("n", [100, 5_000, 200_000])
+def test_hyperloglog_estimate(n):
+    hll = HyperLogLog(precision=14)
+    for i in range(n):
+        hll.add(f"value-{i}")
+        hll.add(f"value-{i}")  # duplicates do not count
+    assert hll.count() == pytest.approx(n, rel=0.03)
+
+def test_hyperloglog_merge():
+    left, right = HyperLogLog(12), HyperLogLog(12)
+    for i in range(6_000):
+        left.add(f"v{i}")
+    for i in range(3_000, 9_000):
+        right.add(f"v{i}")
+    left.merge(pickle.loads(pickle.dumps(right)))
+    assert left.count() == pytest.approx(9_000, rel=0.05)
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(10))
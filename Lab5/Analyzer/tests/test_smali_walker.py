@@ -0,0 +1,142 @@
+import sys
+import os
+import logging
+import threading
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from smali_walker import PackageFilter, walk_smali, find_smali_dirs, map_smali_dirs, LIBRARY_PACKAGES
+from manifest_parser import ManifestData
+
+def make_tree(base):
+    """Create a small smali tree with app and library packages."""
+    for rel in (
+        "com/example/app/MainActivity.smali",
+        "com/example/app/net/Client.smali",
+        "com/other/Tracker.smali",
+        "androidx/core/Util.smali",
+        "kotlin/Unit.smali",
+        "RootClass.smali",
+    ):
+        path = base / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(".class public L" + rel[:-6] + ";\n")
+    return base
+
+def scanned(smali_dir, package_filter=None):
+    return sorted(
+        os.path.relpath(p, smali_dir).replace(os.sep, "/")
+        for p in walk_smali(str(smali_dir), package_filter)
+    )
+
+def test_walk_without_filter(tmp_path):
+    smali_dir = make_tree(tmp_path / "smali")
+    assert len(scanned(smali_dir)) == 6
+
+def test_deny_prunes_library_packages(tmp_path):
+    smali_dir = make_tree(tmp_path / "smali")
+    result = scanned(smali_dir, PackageFilter(deny=LIBRARY_PACKAGES))
+    assert "androidx/core/Util.smali" not in result
+    assert "kotlin/Unit.smali" not in result
+    assert "com/other/Tracker.smali" in result
+    assert "RootClass.smali" in result
+
+def test_allow_restricts_to_package(tmp_path):
+    smali_dir = make_tree(tmp_path / "smali")
+    result = scanned(smali_dir, PackageFilter(allow=["com.example.app"]))
+    assert result == ["com/example/app/MainActivity.smali", "com/example/app/net/Client.smali"]
+
+def test_deny_wins_over_allow(tmp_path):
+    smali_dir = make_tree(tmp_path / "smali")
+    package_filter = PackageFilter(allow=["com/example/**"], deny=["com/example/app/net/**"])
+    assert scanned(smali_dir, package_filter) == ["com/example/app/MainActivity.smali"]
+
+def test_excluded_dirs_are_never_listed(tmp_path, monkeypatch):
+    smali_dir = make_tree(tmp_path / "smali")
+    listed = []
+    real_walk = os.walk
+
+    def recording_walk(top, *args, **kwargs):
+        for root, dirnames, files in real_walk(top, *args, **kwargs):
+            listed.append(os.path.relpath(root, top).replace(os.sep, "/"))
+            yield root, dirnames, files
+
+    monkeypatch.setattr(os, "walk", recording_walk)
+    scanned(smali_dir, PackageFilter(deny=["androidx/**", "kotlin"]))
+    assert not any(d.startswith("androidx") or d.startswith("kotlin") for d in listed)
+
+def test_from_manifest_uses_package_name():
+    manifest = ManifestData(
+        package_name="com.example.app", version_code=1, version_name="1.0",
+        min_sdk=21, target_sdk=30, permissions=[], components=[],
+    )
+    package_filter = PackageFilter.from_manifest(manifest, deny=["com/example/app/ads"])
+    assert package_filter.includes_package("com/example/app/ui")
+    assert not package_filter.includes_package("com/example/app/ads/banner")
+    assert not package_filter.includes_package("com/example")
+    assert package_filter.should_descend("com/example")
+
+def test_restrict_to_keeps_deny_list():
+    package_filter = PackageFilter(deny=["kotlin"]).restrict_to("com.example.app")
+    assert package_filter.allow == ["com.example.app"]
+    assert package_filter.deny == ["kotlin"]
+    assert not package_filter.is_empty
+
+def test_restrict_to_intersects_allow_list():
+    # --include com.lib --app-only must not scan the library
+    package_filter = PackageFilter(allow=["com.lib"]).restrict_to("com.example.app")
+    assert not package_filter.includes_package("com/lib")
+    assert not package_filter.includes_package("com/example/app")
+
+    package_filter = PackageFilter(allow=["com", "com.example.app.net", "org.lib"]).restrict_to("com.example.app")
+    assert package_filter.allow == ["com.example.app", "com.example.app.net"]
+    assert not package_filter.includes_package("org/lib")
+    assert not package_filter.includes_package("com/other")
+
+    package_filter = PackageFilter(allow=["com.example.app.net"]).restrict_to("com.example.app")
+    assert package_filter.includes_package("com/example/app/net/http")
+    assert not package_filter.includes_package("com/example/app/ui")
+
+def test_find_smali_dirs_beyond_nine_dexes(tmp_path):
+    for name in ["smali", "smali_classes2", "smali_classes10", "smali_classes9", "smali_classes12", "smali_assets"]:
+        (tmp_path / name).mkdir()
+    (tmp_path / "smali_notes.txt").write_text("not a directory")
+    names = [os.path.basename(d) for d in find_smali_dirs(str(tmp_path))]
+    assert names == ["smali", "smali_classes2", "smali_classes9", "smali_classes10",
+                     "smali_classes12", "smali_assets"]
+
+def count_smali_files(smali_dir, package_filter=None):
+    return sum(1 for _ in walk_smali(smali_dir, package_filter))
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_map_smali_dirs_keeps_order(tmp_path, max_workers):
+    dirs = []
+    for i, name in enumerate(["smali", "smali_classes2", "smali_classes3"]):
+        smali_dir = tmp_path / name
+        smali_dir.mkdir()
+        for j in range(i + 1):
+            (smali_dir / f"C{j}.smali").write_text(".class public LC;\n")
+        dirs.append(str(smali_dir))
+    assert map_smali_dirs(count_smali_files, dirs, max_workers=max_workers) == [1, 2, 3]
+
+def test_map_smali_dirs_from_threads(tmp_path, caplog):
+    # The pipeline calls map_smali_dirs from several detector threads at once
+    dirs = []
+    for name in ["smali", "smali_classes2"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "C.smali").write_text(".class public LC;\n")
+        dirs.append(str(tmp_path / name))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(map_smali_dirs(count_smali_files, dirs, max_workers=2)))
+               for _ in range(3)]
+    with caplog.at_level(logging.WARNING, logger="smali_walker"):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+    assert results == [[1, 1]] * 3
+    assert "falling back" not in caplog.text
@@ -10,8 +10,11 @@ src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
+import zipfile
 import pytest
-from unpacker import unpack_apk, UnpackError
+import unpacker
+from unpacker import (unpack_apk, UnpackError, DecodeProfile, FULL, NO_RES, NO_SRC, MANIFEST_ONLY,
+                      choose_decode_profile)
 
 def test_unpack_invalid_apk_raises(tmp_path):
     """
@@ -44,3 +47,186 @@ def test_unpack_valid_apk_creates_dir(tmp_path):
     # Check that AndroidManifest.xml is present
     manifest_path = os.path.join(result_dir, "AndroidManifest.xml")
     assert os.path.isfile(manifest_path), "AndroidManifest.xml was not found in the decompiled output"
+
+
+def test_choose_decode_profile():
+    """Only the smali detectors need apktool; resources come from resources.arsc."""
+    assert choose_decode_profile() == NO_RES
+    assert choose_decode_profile(["manifest", "androguard"]) == MANIFEST_ONLY
+    assert choose_decode_profile(["manifest"], decode_resources=True) == NO_SRC
+    assert choose_decode_profile(["strings"], decode_resources=True) == FULL
+    main_only = choose_decode_profile(["reflection"], only_main_classes=True)
+    assert main_only.apktool_args() == ["--no-res", "--only-main-classes"]
+    with pytest.raises(ValueError):
+        choose_decode_profile(["manifest", "nonsense"])
+
+
+def test_unpack_passes_profile_flags(tmp_path, monkeypatch):
+    """The profile's flags end up on the apktool command line."""
+    calls = []
+
+    class FakeProcess:
+        returncode = 0
+
+        def __init__(self, cmd, **kwargs):
+            calls.append(cmd)
+            out_dir = cmd[cmd.index("-o") + 1]
+            os.makedirs(out_dir)
+            open(os.path.join(out_dir, "AndroidManifest.xml"), "wb").close()
+
+        def communicate(self, input=None, timeout=None):
+            return b"", b""
+
+    monkeypatch.setattr(unpacker.shutil, "which", lambda name: "/usr/bin/apktool")
+    monkeypatch.setattr(unpacker.subprocess, "Popen", FakeProcess)
+
+    unpack_apk("app.apk", out_dir=str(tmp_path / "full"))
+    unpack_apk("app.apk", out_dir=str(tmp_path / "nores"), profile=DecodeProfile("x", resources=False,
+                                                                                only_main_classes=True))
+    assert calls[0][:3] == ["/usr/bin/apktool", "d", "-f"] and "--no-res" not in calls[0]
+    assert "--no-res" in calls[1] and "--only-main-classes" in calls[1]
+
+
+def test_unpack_manifest_only_skips_apktool(tmp_path, monkeypatch):
+    """Manifest-only copies the binary manifest out of the zip without apktool."""
+    monkeypatch.setattr(unpacker.shutil, "which", lambda name: None)
+    apk_path = tmp_path / "app.apk"
+    with zipfile.ZipFile(apk_path, "w") as apk:
+        apk.writestr("AndroidManifest.xml", b"\x03\x00\x08\x00binary")
+        apk.writestr("classes.dex", b"dex")
+
+    out_dir = unpack_apk(str(apk_path), out_dir=str(tmp_path / "out"), profile=MANIFEST_ONLY)
+    assert os.listdir(out_dir) == ["AndroidManifest.xml"]
+    with pytest.raises(UnpackError):
+        unpack_apk(str(tmp_path / "out" / "AndroidManifest.xml"), out_dir=str(tmp_path / "bad"),
+                   profile=MANIFEST_ONLY)
+
+
+FAKE_APKTOOL = """#!{python}
+import os, sys, time
+out_dir, apk = sys.argv[sys.argv.index("-o") + 1], sys.argv[-1]
+running = os.path.join(os.path.dirname(apk), "running")
+os.makedirs(running, exist_ok=True)
+marker = os.path.join(running, str(os.getpid()))
+open(marker, "w").close()
+with open(os.path.join(os.path.dirname(apk), "concurrency.log"), "a") as log:
+    log.write(f"{{len(os.listdir(running))}}\\n")
+try:
+    if "slow" in apk:
+        time.sleep(30)
+    if "huge" in apk:  # keeps writing until it is killed
+        os.makedirs(out_dir)
+        for i in range(300):
+            with open(os.path.join(out_dir, f"blob{{i}}.bin"), "wb") as blob:
+                blob.write(bytes(256 * 1024))
+            time.sleep(0.1)
+    if "bad" in apk:
+        sys.stderr.write("W: something odd\\nbrut.androlib.AndrolibException: broken resources\\n")
+        sys.exit(1)
+    time.sleep(0.2)
+    os.makedirs(out_dir)
+    open(os.path.join(out_dir, "AndroidManifest.xml"), "w").close()
+finally:
+    os.remove(marker)
+"""
+
+
+@pytest.fixture
+def fake_apktool(tmp_path, monkeypatch):
+    """An executable standing in for apktool (POSIX only)."""
+    if os.name != "posix":
+        pytest.skip("fake apktool script needs a POSIX shebang")
+    script = tmp_path / "apktool"
+    script.write_text(FAKE_APKTOOL.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setattr(unpacker.shutil, "which", lambda name: str(script) if name == "apktool" else None)
+    return tmp_path
+
+
+def test_apktool_timeout_scales_with_size(tmp_path):
+    from unpacker import apktool_timeout, BASE_TIMEOUT, MAX_TIMEOUT
+    small, large = tmp_path / "small.apk", tmp_path / "large.apk"
+    small.write_bytes(b"x")
+    with open(large, "wb") as f:
+        f.truncate(50 * 1024 * 1024)
+    assert BASE_TIMEOUT <= apktool_timeout(str(small)) < apktool_timeout(str(large)) <= MAX_TIMEOUT
+    assert apktool_timeout(str(large), maximum=100) == 100
+
+
+def test_unpack_many_async_limits_concurrency(fake_apktool):
+    import asyncio
+    from async_unpacker import unpack_apk_async, unpack_many_async
+    jobs = []
+    for i in range(6):
+        name = "bad.apk" if i == 3 else f"app{i}.apk"
+        (fake_apktool / name).write_bytes(b"PK")
+        jobs.append((str(fake_apktool / name), str(fake_apktool / "out" / str(i))))
+
+    results = asyncio.run(unpack_many_async(jobs, max_concurrent=2))
+    assert [apk for apk, _ in results] == [apk for apk, _ in jobs]
+    assert isinstance(results[3][1], UnpackError) and "broken resources" in str(results[3][1])
+    assert all(os.path.isfile(os.path.join(result, "AndroidManifest.xml"))
+               for i, (_, result) in enumerate(results) if i != 3)
+    assert max(int(n) for n in (fake_apktool / "concurrency.log").read_text().split()) <= 2
+
+    lines = []
+    with pytest.raises(UnpackError):
+        asyncio.run(unpack_apk_async(jobs[3][0], str(fake_apktool / "out" / "again"), on_stderr=lines.append))
+    assert lines == ["W: something odd", "brut.androlib.AndrolibException: broken resources"]
+
+
+def test_unpack_apk_async_timeout_and_cancel(fake_apktool):
+    import asyncio
+    from async_unpacker import unpack_apk_async
+    apk = fake_apktool / "slow.apk"
+    apk.write_bytes(b"PK")
+
+    with pytest.raises(UnpackError, match="timed out"):
+        asyncio.run(unpack_apk_async(str(apk), str(fake_apktool / "out"), timeout=0.5))
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(unpack_apk_async(str(apk), str(fake_apktool / "out")))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task
+
+    assert asyncio.run(cancel_soon()).cancelled()
+    # Both apktool processes were killed (SIGKILL leaves their markers behind) and reaped
+    pids = [int(pid) for pid in os.listdir(fake_apktool / "running")]
+    assert len(pids) == 2
+    for pid in pids:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+def test_unpack_apk_uses_the_adaptive_timeout(fake_apktool, monkeypatch):
+    sizes = []
+    monkeypatch.setattr(unpacker, "apktool_timeout", lambda apk_path: sizes.append(os.path.getsize(apk_path)) or 0.5)
+    apk = fake_apktool / "slow.apk"
+    apk.write_bytes(b"PK")
+    with pytest.raises(UnpackError, match="timed out after 0 seconds"):
+        unpack_apk(str(apk), out_dir=str(fake_apktool / "out"))
+    assert sizes == [2]
+    with pytest.raises(UnpackError, match="timed out after 1 seconds"):
+        unpack_apk(str(apk), out_dir=str(fake_apktool / "out"), timeout=1.0)
+
+
+def test_unpack_apk_watch_stops_a_growing_decode(fake_apktool, monkeypatch):
+    from workspace import WorkspaceManager, WorkspaceQuotaError
+    monkeypatch.setattr(unpacker, "WATCH_INTERVAL", 0.2)
+    apk = fake_apktool / "huge.apk"
+    apk.write_bytes(b"PK")
+    (fake_apktool / "ws").mkdir()
+    manager = WorkspaceManager(str(fake_apktool / "ws"), quota_mb=1, reserve_mb=0)
+    out_dir = manager.acquire("huge")
+
+    with pytest.raises(WorkspaceQuotaError):
+        unpack_apk(str(apk), out_dir=out_dir, watch=manager.check_quota)
+    # Killed well before it wrote its 75 MB
+    assert sum(os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir)) < 5 * 1024 * 1024
+    (pid,) = [int(pid) for pid in os.listdir(fake_apktool / "running")]  # SIGKILL leaves the marker
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+    manager.release(out_dir)
+    manager.drain()
@@ -0,0 +1,100 @@
+import sys
+import os
+import pytest
+
+# Ensure src path is included
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from unpacker import UnpackError
+from workspace import (DECODE_FACTOR, MAX_WALK_INTERVAL, MIN_WALK_INTERVAL, TRASH_PREFIX, QuotaWatch, WorkspaceManager,
+                       WorkspaceQuotaError, expected_tree_size, tree_size)
+
+def write_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\x00" * size)
+
+def test_acquire_prefers_the_given_root_and_release_deletes(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), quota_mb=1, reserve_mb=0)
+    path = manager.acquire("repay_decompiled")
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).startswith("repay_decompiled_")
+    assert manager.active == {path: str(tmp_path)}
+
+    write_file(os.path.join(path, "smali", "a", "B.smali"), 100)
+    manager.release(path)
+    manager.drain()
+    assert not os.path.exists(path)
+    assert os.listdir(tmp_path) == []
+    assert manager.active == {}
+
+def test_falls_back_to_last_root_without_room(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), quota_mb=1 << 40)  # a quota no RAM disk can hold
+    path = manager.acquire()
+    assert os.path.dirname(path) == manager.roots[-1]
+    manager.release(path)
+    manager.drain()
+
+def test_quota_watch_walks_less_often_far_from_the_quota(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), quota_mb=1, reserve_mb=0)
+    path = manager.acquire()
+    now = [0.0]
+    watch = QuotaWatch(manager, clock=lambda: now[0])
+
+    def tick(seconds, grow=0):
+        now[0] += seconds
+        if grow:
+            write_file(os.path.join(path, "smali", f"f{now[0]}.smali"), grow)
+        return watch(path)
+
+    assert tick(0) == 0 and watch.walks == 1
+    assert tick(MIN_WALK_INTERVAL, grow=10 * 1024) == 10 * 1024  # 10 KB/s: about 50 s of headroom
+    assert watch.walks == 2
+    for _ in range(int(MAX_WALK_INTERVAL) - 1):
+        tick(1)
+    assert watch.walks == 2  # skipped until the capped interval has passed
+    tick(1, grow=900 * 1024)  # 30 KB/s with 114 KB left: next walk in about 2 s
+    assert watch.walks == 3
+    tick(1, grow=200 * 1024)
+    assert watch.walks == 3
+    with pytest.raises(WorkspaceQuotaError):
+        tick(1)
+    manager.release(path)
+    manager.drain()
+
+def test_check_quota(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), quota_mb=1, reserve_mb=0)
+    path = manager.acquire()
+    write_file(os.path.join(path, "res", "raw", "big.bin"), 600 * 1024)
+    assert manager.check_quota(path) == tree_size(path) == 600 * 1024
+
+    write_file(os.path.join(path, "res", "raw", "bigger.bin"), 600 * 1024)
+    with pytest.raises(WorkspaceQuotaError) as excinfo:
+        manager.check_quota(path)
+    assert isinstance(excinfo.value, UnpackError)
+    manager.release(path)
+    manager.drain()
+
+def test_jobs_expected_over_quota_skip_ram_roots(tmp_path):
+    apk = tmp_path / "big.apk"
+    write_file(str(apk), 256 * 1024)
+    assert expected_tree_size(str(apk)) == 256 * 1024 * DECODE_FACTOR
+    assert expected_tree_size(str(tmp_path / "missing.apk")) == 0
+
+    (tmp_path / "ram").mkdir()
+    manager = WorkspaceManager(str(tmp_path / "ram"), quota_mb=1, reserve_mb=0)
+    small = manager.acquire("small", expected_bytes=512 * 1024)
+    big = manager.acquire("big", expected_bytes=expected_tree_size(str(apk)))
+    assert manager.active == {small: str(tmp_path / "ram"), big: manager.roots[-1]}
+    manager.release(small)
+    manager.release(big)
+    manager.drain()
+
+def test_stale_trash_is_purged(tmp_path):
+    stale = tmp_path / (TRASH_PREFIX + "old_run")
+    write_file(str(stale / "apktool.yml"), 10)
+    manager = WorkspaceManager(str(tmp_path), use_ram_disk=False)
+    manager.drain()
+    assert not stale.exists()